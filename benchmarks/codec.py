@@ -0,0 +1,74 @@
+"""
+Time of encoding and decoding of realistic payloads by installed codecs. Also it compares decoding of non-JSON
+responses: trying to parse by json with catching of exception against choosing codec by Content-Type.
+
+    PYTHONPATH=. python benchmarks/codec.py
+"""
+import json
+import random
+import string
+import timeit
+
+from clients import codec
+
+
+def record(i):
+    rnd = random.Random(i)
+    return {
+        'id': i,
+        'name': ''.join(rnd.choices(string.ascii_letters, k=16)),
+        'email': f'user{i}@example.com',
+        'active': rnd.random() > 0.5,
+        'balance': round(rnd.uniform(0, 10000), 2),
+        'tags': [''.join(rnd.choices(string.ascii_lowercase, k=6)) for _ in range(3)],
+        'address': {'city': 'Moscow', 'street': ''.join(rnd.choices(string.ascii_letters, k=12)), 'house': i % 100},
+    }
+
+
+PAYLOADS = {
+    'small (~1KB)': [record(i) for i in range(4)],
+    'medium (~100KB)': [record(i) for i in range(400)],
+    'large (~10MB)': [record(i) for i in range(40000)],
+}
+
+
+def codecs():
+    yield codec.JsonCodec()
+    for cls, module in [(codec.OrjsonCodec, codec.orjson), (codec.UjsonCodec, codec.ujson),
+                        (codec.MsgpackCodec, codec.msgpack)]:
+        if module is not None:
+            yield cls()
+
+
+def measure(func):
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=3, number=number)) / number
+
+
+def main():
+    print(f'{"payload":>16}{"codec":>10}{"size, KB":>10}{"encode, us":>12}{"decode, us":>12}')
+    for name, payload in PAYLOADS.items():
+        for c in codecs():
+            data = c.dumps(payload)
+            data = data.encode() if isinstance(data, str) else data
+            encode = measure(lambda: c.dumps(payload))
+            decode = measure(lambda: c.loads(data))
+            print(f'{name:>16}{c.name:>10}{len(data) / 1024:>10.1f}{encode * 1e6:>12.1f}{decode * 1e6:>12.1f}')
+
+    html = b'<html>' + b'0' * 100 * 1024 + b'</html>'
+
+    def try_json():
+        try:
+            return json.loads(html)
+        except Exception:
+            return html
+
+    print()
+    print(f'non-JSON response (100KB), try json.loads: {measure(try_json) * 1e6:.1f} us')
+    print(f'non-JSON response (100KB), by Content-Type: '
+          f'{measure(lambda: codec.default.decode("text/html", html)) * 1e6:.1f} us')
+
+
+if __name__ == '__main__':
+    main()
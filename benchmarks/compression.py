@@ -0,0 +1,66 @@
+"""
+Bytes on the wire against CPU time of compression of realistic JSON bodies by installed content codings and levels.
+Break-even is bandwidth of link, below which compression of request saves time (saved bytes per second of compression
+and decompression):
+
+    PYTHONPATH=. python benchmarks/compression.py
+"""
+import json
+import random
+import string
+import timeit
+
+from clients import compression
+
+
+def record(i):
+    rnd = random.Random(i)
+    return {
+        'id': i,
+        'name': ''.join(rnd.choices(string.ascii_letters, k=16)),
+        'email': f'user{i}@example.com',
+        'active': rnd.random() > 0.5,
+        'balance': round(rnd.uniform(0, 10000), 2),
+        'tags': [''.join(rnd.choices(string.ascii_lowercase, k=6)) for _ in range(3)],
+        'address': {'city': 'Moscow', 'street': ''.join(rnd.choices(string.ascii_letters, k=12)), 'house': i % 100},
+    }
+
+
+PAYLOADS = {
+    'small (~1KB)': json.dumps([record(i) for i in range(4)]).encode(),
+    'medium (~100KB)': json.dumps([record(i) for i in range(400)]).encode(),
+    'large (~1MB)': json.dumps([record(i) for i in range(4000)]).encode(),
+}
+
+LEVELS = {
+    compression.GZIP: [1, 6, 9],
+    compression.DEFLATE: [6],
+    compression.BROTLI: [1, 4, 9],
+    compression.ZSTD: [1, 3, 9],
+}
+
+
+def measure(func):
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=3, number=number)) / number
+
+
+def main():
+    print(f'{"payload":>16}{"coding":>10}{"size, KB":>10}{"ratio":>8}{"compress, us":>14}{"decompress, us":>16}'
+          f'{"break-even, MB/s":>18}')
+    for name, data in PAYLOADS.items():
+        print(f'{name:>16}{"identity":>10}{len(data) / 1024:>10.1f}{1:>8.2f}')
+        for encoding in compression.available():
+            for level in LEVELS[encoding]:
+                compressed = compression.compress(encoding, data, level)
+                compress = measure(lambda: compression.compress(encoding, data, level))
+                decompress = measure(lambda: compression.decompress(encoding, compressed))
+                saved = (len(data) - len(compressed)) / (compress + decompress) / 1e6
+                print(f'{name:>16}{f"{encoding}-{level}":>10}{len(compressed) / 1024:>10.1f}'
+                      f'{len(data) / len(compressed):>8.2f}{compress * 1e6:>14.1f}{decompress * 1e6:>16.1f}'
+                      f'{saved:>18.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+HTTP/1.1 vs HTTP/2 transports of AsyncClient against mock server, which is served by hypercorn (it speaks HTTP/1.1
+and h2c on the same port). Benchmark starts server itself on free port:
+
+    pip install httpx[http2] hypercorn
+    PYTHONPATH=. python benchmarks/http2.py
+
+Cases:
+    aiohttp: default transport, pool is limited by concurrency (one connection per concurrent request)
+    aiohttp-1: default transport with one connection (requests wait connection)
+    httpx-h1: Http2AsyncTransport without prior knowledge (HTTP/1.1 over httpx), pool is limited by concurrency
+    httpx-h2: Http2AsyncTransport with prior knowledge (h2c) and one connection (requests are multiplexed)
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from clients import http, transport
+from tests.server import client
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port, config, timeout=30.):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.getcwd(), os.environ.get('PYTHONPATH')])))
+    process = subprocess.Popen([sys.executable, '-m', 'hypercorn', 'tests.server.mock_server:app', '--bind',
+                                f'127.0.0.1:{port}', '--config', f'file:{config}'], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError('mock server is not started')
+
+
+def make_client(case, endpoint, concurrency):
+    if case == 'aiohttp':
+        return http.AsyncClient(endpoint, limit=concurrency)
+    if case == 'aiohttp-1':
+        return http.AsyncClient(endpoint, limit=1)
+    if case == 'httpx-h1':
+        return http.AsyncClient(endpoint, transport=transport.Http2AsyncTransport(max_connections=concurrency))
+    return http.AsyncClient(endpoint, transport=transport.Http2AsyncTransport(prior_knowledge=True,
+                                                                              max_connections=1))
+
+
+async def run(case, endpoint, n, concurrency, count):
+    client_ = make_client(case, endpoint, concurrency)
+    latencies = []
+
+    async def worker(requests):
+        for _ in range(requests):
+            start = time.perf_counter()
+            resp, status_code = await client_.request(client.Json(count))
+            assert status_code == 200, status_code
+            latencies.append(time.perf_counter() - start)
+
+    await worker(2)
+    latencies.clear()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(n // concurrency) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    await client_.resolve()
+    latencies.sort()
+    return len(latencies) / elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=1024, help='count of requests of each case')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32, 128])
+    parser.add_argument('--count', type=int, default=10, help='count of objects of json response')
+    args = parser.parse_args()
+
+    port = free_port()
+    # by default hypercorn sends GOAWAY after 1000 requests of connection and limits streams of connection by 100
+    config = tempfile.NamedTemporaryFile('w', suffix='.py', delete=False)
+    config.write(f'keep_alive_max_requests = {10 ** 9}\nh2_max_concurrent_streams = 1000\n')
+    config.close()
+    server = start_server(port, config.name)
+    endpoint = f'http://127.0.0.1:{port}'
+    try:
+        print(f'{"case":>24}{"rps":>10}{"p50, ms":>10}{"p99, ms":>10}')
+        for concurrency in args.concurrency:
+            for case in ['aiohttp', 'aiohttp-1', 'httpx-h1', 'httpx-h2']:
+                rps, p50, p99 = asyncio.run(run(case, endpoint, args.n, concurrency, args.count))
+                print(f'{f"{case}/c{concurrency}":>24}{rps:>10.0f}{p50 * 1e3:>10.2f}{p99 * 1e3:>10.2f}')
+    finally:
+        server.terminate()
+        server.wait()
+        os.unlink(config.name)
+
+
+if __name__ == '__main__':
+    main()
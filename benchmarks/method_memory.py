@@ -0,0 +1,65 @@
+"""
+Memory of objects of methods: Method (attributes into __dict__) against CompactMethod (__slots__ and shared table of
+defaults). It measures size of object and count of allocated blocks by tracemalloc, and time of creation.
+
+    PYTHONPATH=. python benchmarks/method_memory.py
+"""
+import time
+import tracemalloc
+
+from clients import http
+
+
+class Get(http.Method):
+    url_ = '/users/%s'
+    m_type = 'GET'
+    count = 1
+    headers = {'accept': 'application/json'}
+
+    def __init__(self, user):
+        http.Method.__init__(self, user)
+        self.params = {'fields': 'id'}
+
+
+class CompactGet(http.CompactMethod):
+    url_ = '/users/%s'
+    m_type = 'GET'
+    count = 1
+    headers = {'accept': 'application/json'}
+
+    def __init__(self, user):
+        http.CompactMethod.__init__(self, user)
+        self.params = {'fields': 'id'}
+
+
+def measure(cls, n):
+    params = {'fields': 'id'}
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    objects = []
+    for i in range(n):
+        m = cls(i)
+        m.params = params  # params are shared, only object itself is measured
+        m.url  # noqa: url is cached into object of Method
+        objects.append(m)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, 'filename')
+    size = sum(s.size_diff for s in stats) - objects.__sizeof__()
+    blocks = sum(s.count_diff for s in stats)
+    start = time.perf_counter()
+    for i in range(n):
+        cls(i).url
+    elapsed = time.perf_counter() - start
+    return size / n, blocks / n, elapsed / n
+
+
+def main(n=100000):
+    print(f'{"class":>12}{"bytes/object":>14}{"blocks/object":>15}{"create, us":>12}')
+    for cls in [Get, CompactGet]:
+        size, blocks, elapsed = measure(cls, n)
+        print(f'{cls.__name__:>12}{size:>14.1f}{blocks:>15.2f}{elapsed * 1e6:>12.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Overhead of metrics: throughput of clients with and without metrics against mock server. Runs are interleaved, the
+best run of each case is taken.
+
+Before benchmark, you need to start mock server:
+
+    PYTHONPATH=. python tests/server/mock_server.py
+
+After that, you can run benchmark:
+
+    PYTHONPATH=. python benchmarks/metrics.py
+"""
+import argparse
+import asyncio
+import time
+
+import tests
+from clients import http, metrics
+from tests.server import client
+
+ENDPOINT = f'http://localhost:{tests.port}'
+
+
+def run_sync(metrics_, n):
+    client_ = http.Client(ENDPOINT, metrics=metrics_)
+    client_.request(client.Get())
+    start = time.perf_counter()
+    for _ in range(n):
+        client_.request(client.Get())
+    elapsed = time.perf_counter() - start
+    client_.close()
+    return n / elapsed
+
+
+async def run_async(metrics_, n, concurrency):
+    client_ = http.AsyncClient(ENDPOINT, metrics=metrics_)
+    await client_.request(client.Get())
+    start = time.perf_counter()
+    await client_.request_many((client.Get() for _ in range(n)), concurrency=concurrency)
+    elapsed = time.perf_counter() - start
+    await client_.resolve()
+    return n / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=2000, help='count of requests of run')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+    cases = {
+        'Client': lambda m: run_sync(m, args.n),
+        'AsyncClient, 1': lambda m: asyncio.run(run_async(m, args.n, 1)),
+        'AsyncClient, 32': lambda m: asyncio.run(run_async(m, args.n, 32)),
+    }
+    print(f'{"client, concurrency":>20}{"rps":>10}{"rps, metrics":>14}{"overhead, %":>13}')
+    for name, run in cases.items():
+        plain, measured = 0, 0
+        for _ in range(args.runs):
+            plain = max(plain, run(None))
+            measured = max(measured, run(metrics.Metrics()))
+        print(f'{name:>20}{plain:>10.0f}{measured:>14.0f}{(plain / measured - 1) * 100:>13.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Per-request overhead of clients: time of request without network. Transport returns prepared response at once, so
+only work of client is measured (middlewares, plan of request, serialization of body, decoding of response).
+Requests with cached plans are compared with requests, which compile plan on each request (as m_type, url and headers
+were processed by clients per request before plans).
+
+    PYTHONPATH=. python benchmarks/overhead.py
+"""
+import asyncio
+import contextlib
+import json
+import time
+import typing
+
+from clients import http
+
+
+class PathArgs(http.Method):
+    url_ = '/users/%s/orders/%s'
+    m_type = 'GET'
+    count = 2
+
+    def __init__(self, user, order):
+        http.Method.__init__(self, user, order)
+        self.params = {'fields': 'id,name'}
+
+
+class PostBody(http.Method):
+    url_ = '/users'
+    m_type = 'POST'
+    headers = {'Content-Type': 'application/json'}
+
+    def __init__(self, body: typing.Dict):
+        http.Method.__init__(self)
+        self.body = body
+
+
+BODY = {'name': 'user', 'email': 'user@example.com', 'tags': ['a', 'b', 'c'], 'active': True}
+CONTENT = json.dumps({'success': True}).encode()
+
+
+class Response:
+    status_code = status = 200
+    headers = {'Content-Type': 'application/json'}
+    content = CONTENT
+
+    async def read(self):
+        return CONTENT
+
+
+class SyncTransport:
+    def __getattr__(self, item):
+        return lambda **kwargs: Response()
+
+
+class AsyncTransport:
+    async def request(self, **kwargs):
+        return Response()
+
+
+@contextlib.contextmanager
+def plan_per_request():
+    plan = http.BaseMethod.plan
+    http.BaseMethod.plan = property(lambda m: http.compile_plan(m.m_type, m.url_, m.headers))
+    try:
+        yield
+    finally:
+        http.BaseMethod.plan = plan
+
+
+def measure_sync(client, make, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        client.request(make())
+    return (time.perf_counter() - start) / n
+
+
+async def measure_async(client, make, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        await client.request(make())
+    return (time.perf_counter() - start) / n
+
+
+def main(n=100000):
+    sync_client = http.Client('http://localhost')
+    sync_client._Client__session = SyncTransport()
+    async_client = http.AsyncClient('http://localhost')
+    async_client._AsyncClient__session = AsyncTransport()
+    methods = {
+        'GET with path args': lambda: PathArgs(1, 2),
+        'POST with json body': lambda: PostBody(BODY),
+    }
+    print(f'{"method":>22}{"plan":>14}{"Client, us":>12}{"AsyncClient, us":>17}')
+    for name, make in methods.items():
+        for plan, context in [('per request', plan_per_request), ('cached', contextlib.nullcontext)]:
+            with context():
+                sync = min(measure_sync(sync_client, make, n) for _ in range(3))
+                async_ = min(asyncio.run(measure_async(async_client, make, n)) for _ in range(3))
+            print(f'{name:>22}{plan:>14}{sync * 1e6:>12.2f}{async_ * 1e6:>17.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+"""
+Benchmark suite of clients against mock server: throughput and percentiles of latencies of Client and AsyncClient for
+small json, large json, multipart uploads (/file:request) and streaming downloads (/file:response) at several levels of
+concurrency. Mock server is started by suite on free port.
+
+Results can be saved as baseline, the next run is compared with baseline: throughput lower or p99 higher than baseline
+by more than tolerance is regression (exit code 1):
+
+    PYTHONPATH=. python benchmarks/suite.py --save benchmarks/baseline.json
+    PYTHONPATH=. python benchmarks/suite.py --baseline benchmarks/baseline.json --tolerance 0.2
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import io
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+
+from clients import http
+from tests.server import client
+
+UPLOAD = b'0' * 64 * 1024
+DOWNLOAD = '0' * 256 * 1024
+
+
+class SmallJson(client.Json):
+    def __init__(self):
+        client.Json.__init__(self, 1)
+
+
+class LargeJson(client.Json):
+    def __init__(self):
+        client.Json.__init__(self, 1000)
+
+
+class SyncUpload(client.SyncFileRequest):
+    def __init__(self):
+        client.SyncFileRequest.__init__(self, UPLOAD)
+
+
+class AsyncUpload(client.AsyncFileRequest):
+    def __init__(self):
+        client.AsyncFileRequest.__init__(self, UPLOAD)
+
+
+class SyncDownload(client.SyncFileResponse):
+    stream = True
+
+    def __init__(self):
+        client.SyncFileResponse.__init__(self, io.StringIO(DOWNLOAD))
+
+
+class AsyncDownload(client.AsyncFileResponse):
+    stream = True
+
+    def __init__(self):
+        client.AsyncFileResponse.__init__(self, io.StringIO(DOWNLOAD))
+
+
+SCENARIOS = {
+    'small_json': (SmallJson, SmallJson),
+    'large_json': (LargeJson, LargeJson),
+    'upload': (SyncUpload, AsyncUpload),
+    'download': (SyncDownload, AsyncDownload),
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port, timeout=30.):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.getcwd(), os.environ.get('PYTHONPATH')])))
+    process = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'tests.server.mock_server:app', '--port', str(port),
+                                '--log-level', 'warning'], env=env, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError('mock server is not started')
+
+
+def percentile(latencies, p):
+    return latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))]
+
+
+def summary(latencies, elapsed):
+    latencies = sorted(latencies)
+    return {'rps': len(latencies) / elapsed, 'p50': percentile(latencies, 50), 'p90': percentile(latencies, 90),
+            'p99': percentile(latencies, 99)}
+
+
+def run_sync(endpoint, make, n, concurrency):
+    client_ = http.Client(endpoint, pool_maxsize=concurrency, thread_safe=True)
+
+    def request():
+        start = time.perf_counter()
+        resp, status_code = client_.request(make())
+        if isinstance(resp, http.StreamResponse):
+            with resp:
+                for _ in resp.iter_content(64 * 1024):
+                    pass
+        assert status_code == 200, status_code
+        return time.perf_counter() - start
+
+    def worker(count):
+        return [request() for _ in range(count)]
+
+    worker(1)
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        parts = executor.map(worker, [n // concurrency] * concurrency)
+        latencies = [latency for part in parts for latency in part]
+    elapsed = time.perf_counter() - start
+    client_.close()
+    return summary(latencies, elapsed)
+
+
+async def run_async(endpoint, make, n, concurrency):
+    client_ = http.AsyncClient(endpoint, limit=concurrency)
+
+    async def request():
+        start = time.perf_counter()
+        resp, status_code = await client_.request(make())
+        if isinstance(resp, http.AsyncStreamResponse):
+            async with resp:
+                async for _ in resp:
+                    pass
+        assert status_code == 200, status_code
+        return time.perf_counter() - start
+
+    async def worker(count):
+        return [await request() for _ in range(count)]
+
+    await worker(1)
+    start = time.perf_counter()
+    parts = await asyncio.gather(*(worker(n // concurrency) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    await client_.resolve()
+    return summary([latency for part in parts for latency in part], elapsed)
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get('results', {}).get(name)
+        if base is None:
+            continue
+        if result['rps'] < base['rps'] * (1 - tolerance):
+            regressions.append(f'{name}: rps {result["rps"]:.0f} < baseline {base["rps"]:.0f}')
+        if result['p99'] > base['p99'] * (1 + tolerance):
+            regressions.append(f'{name}: p99 {result["p99"] * 1e3:.2f}ms > baseline {base["p99"] * 1e3:.2f}ms')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=512, help='count of requests of each case')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--scenarios', nargs='+', default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument('--clients', nargs='+', default=['Client', 'AsyncClient'], choices=['Client', 'AsyncClient'])
+    parser.add_argument('--save', help='path of file to save results as baseline')
+    parser.add_argument('--baseline', help='path of file of baseline to compare results')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression')
+    args = parser.parse_args()
+
+    port = free_port()
+    server = start_server(port)
+    endpoint = f'http://127.0.0.1:{port}'
+    results = {}
+    try:
+        print(f'{"case":>32}{"rps":>10}{"p50, ms":>10}{"p90, ms":>10}{"p99, ms":>10}')
+        for scenario in args.scenarios:
+            make_sync, make_async = SCENARIOS[scenario]
+            for client_name in args.clients:
+                for concurrency in args.concurrency:
+                    if client_name == 'Client':
+                        result = run_sync(endpoint, make_sync, args.n, concurrency)
+                    else:
+                        result = asyncio.run(run_async(endpoint, make_async, args.n, concurrency))
+                    name = f'{client_name}/{scenario}/c{concurrency}'
+                    results[name] = result
+                    print(f'{name:>32}{result["rps"]:>10.0f}{result["p50"] * 1e3:>10.2f}{result["p90"] * 1e3:>10.2f}'
+                          f'{result["p99"] * 1e3:>10.2f}')
+    finally:
+        server.terminate()
+        server.wait()
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'python': platform.python_version(), 'machine': platform.machine(), 'n': args.n,
+                       'results': results}, f, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
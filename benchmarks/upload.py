@@ -0,0 +1,71 @@
+"""
+Peak RSS of streaming uploads of files of different sizes. Each upload is run into separate process, so peak RSS of
+process is peak RSS of one upload. Peak RSS must not grow with size of file.
+
+Before benchmark, you need to start mock server:
+
+    PYTHONPATH=. python tests/server/mock_server.py
+
+After that, you can run benchmark:
+
+    PYTHONPATH=. python benchmarks/upload.py --sizes 16 64 256
+"""
+import argparse
+import asyncio
+import os
+import pathlib
+import resource
+import subprocess
+import sys
+import tempfile
+
+import tests
+from clients import http
+from tests.server import client
+
+
+def upload(kind, path, field):
+    endpoint = f'http://localhost:{tests.port}'
+    if kind == 'sync':
+        method = client.SyncFileRequest(path) if field else client.Upload(path)
+        resp, status_code = http.Client(endpoint).request(method)
+    else:
+        method = client.AsyncFileRequest(path) if field else client.Upload(path)
+
+        async def run():
+            client_ = http.AsyncClient(endpoint)
+            try:
+                return await client_.request(method)
+            finally:
+                await client_.resolve()
+        resp, status_code = asyncio.run(run())
+    assert status_code == 200, resp
+    # ru_maxrss is KB on linux
+    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[16, 64, 256], help='sizes of files (MB)')
+    parser.add_argument('--child', nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child is not None:
+        kind, path, field = args.child
+        upload(kind, pathlib.Path(path), field == 'file')
+        return
+    print(f'{"size, MB":>10}{"client":>8}{"body":>6}{"peak RSS, MB":>14}')
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            path = os.path.join(directory, f'{size}.bin')
+            with open(path, 'wb') as f:
+                f.truncate(size * 1024 * 1024)
+            for kind in ['sync', 'async']:
+                for field in ['raw', 'file']:
+                    out = subprocess.run([sys.executable, __file__, '--child', kind, path, field], check=True,
+                                         stdout=subprocess.PIPE, text=True).stdout
+                    print(f'{size:>10}{kind:>8}{field:>6}{out.strip():>14}')
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
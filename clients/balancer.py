@@ -0,0 +1,173 @@
+import collections
+import math
+import random
+import threading
+import time
+import typing
+
+LEAST_OUTSTANDING = 'least_outstanding'
+PEAK_EWMA = 'peak_ewma'
+
+EndpointStats = collections.namedtuple('EndpointStats', ['outstanding', 'requests', 'failures', 'consecutive_failures',
+                                                         'latency', 'ejected', 'ejections'])
+
+
+class Endpoint:
+    __slots__ = ('url', 'outstanding', 'requests', 'failures', 'consecutive_failures', 'ewma', 'stamp',
+                 'ejected_until', 'ejections')
+
+    def __init__(self, url: str):
+        """
+        State of one endpoint of Balancer. It is changed by Balancer under lock
+        """
+        self.url = url
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ewma = 0.
+        self.stamp = time.monotonic()
+        self.ejected_until = 0.
+        self.ejections = 0
+
+
+class Balancer:
+    def __init__(self, endpoints: typing.Sequence[str], policy: str = PEAK_EWMA, decay: float = 10.,
+                 max_failures: int = 5, ejection_time: float = 30., max_ejected: float = 0.5,
+                 failure_statuses: typing.Callable[[int], bool] = None, probe: str = None,
+                 probe_interval: float = 5., probe_timeout: float = 1., name: str = None):
+        """
+        Balancer of requests between endpoints (replicas of service). Endpoint is picked for each attempt of request:
+
+        LEAST_OUTSTANDING: endpoint with the least count of requests in flight (random of equal ones)
+        PEAK_EWMA: the best of two random endpoints by cost: peak EWMA of latencies multiplied by count of requests in
+                   flight plus one. Latency above average replaces average at once, latency below average decays it
+                   smoothly, and cost of idle endpoint decays to zero, so slow endpoint is tried again later
+
+        Passive health checks: endpoint is ejected after max_failures consecutive failures (errors of connection and
+        failure status codes) for ejection_time. Not more than share max_ejected of endpoints is ejected passively. If
+        probe is set, clients send GET request to endpoint + probe each probe_interval: failed probe ejects endpoint
+        until successful probe. If all endpoints are ejected, all of them are used
+
+        :param endpoints: base urls of replicas
+        :param policy: LEAST_OUTSTANDING or PEAK_EWMA
+        :param decay: time (seconds) of decay of peak EWMA
+        :param max_failures: count of consecutive failures, which ejects endpoint
+        :param ejection_time: time (seconds) of passive ejection
+        :param max_ejected: max share of passively ejected endpoints
+        :param failure_statuses: function, which checks, that status code of response is failure. None is status codes
+                                 5xx
+        :param probe: path of health check (for example, /health). None is without active probes
+        :param probe_interval: time (seconds) between probes of endpoint
+        :param probe_timeout: timeout (seconds) of probe
+        :param name: name of balancer, it is used as endpoint of client for keys of cache and labels of metrics of
+                     errors. None is endpoints, which are joined by comma
+        """
+        assert endpoints, 'endpoints must not be empty'
+        assert policy in (LEAST_OUTSTANDING, PEAK_EWMA), f'policy must be {LEAST_OUTSTANDING} or {PEAK_EWMA}'
+        self.endpoints = [Endpoint(url) for url in endpoints]
+        self.policy = policy
+        self.decay = decay
+        self.max_failures = max_failures
+        self.ejection_time = ejection_time
+        self.max_ejected = max_ejected
+        self.failure_statuses = failure_statuses if failure_statuses is not None else lambda status: status >= 500
+        self.probe = probe
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.name = name if name is not None else ','.join(endpoints)
+        self.__lock = threading.Lock()
+
+    def __cost(self, endpoint: Endpoint, now: float) -> float:
+        ewma = endpoint.ewma * math.exp(-(now - endpoint.stamp) / self.decay)
+        return ewma * (endpoint.outstanding + 1)
+
+    def pick(self) -> Endpoint:
+        """
+        Pick endpoint for request. Request must be finished by record or release
+        """
+        now = time.monotonic()
+        with self.__lock:
+            endpoints = [e for e in self.endpoints if e.ejected_until <= now] or self.endpoints
+            if len(endpoints) == 1:
+                endpoint = endpoints[0]
+            elif self.policy == LEAST_OUTSTANDING:
+                least = min(e.outstanding for e in endpoints)
+                endpoint = random.choice([e for e in endpoints if e.outstanding == least])
+            else:
+                a, b = random.sample(endpoints, 2)
+                endpoint = a if self.__cost(a, now) <= self.__cost(b, now) else b
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def record(self, endpoint: Endpoint, failed: bool, elapsed: float):
+        """
+        Record outcome of request
+
+        :param endpoint: picked endpoint
+        :param failed: request is failed
+        :param elapsed: time (seconds) of request
+        """
+        now = time.monotonic()
+        with self.__lock:
+            endpoint.outstanding -= 1
+            if elapsed > endpoint.ewma:
+                endpoint.ewma = elapsed
+            else:
+                w = math.exp(-(now - endpoint.stamp) / self.decay)
+                endpoint.ewma = endpoint.ewma * w + elapsed * (1 - w)
+            endpoint.stamp = now
+            if not failed:
+                endpoint.consecutive_failures = 0
+                return
+            endpoint.failures += 1
+            endpoint.consecutive_failures += 1
+            if endpoint.consecutive_failures < self.max_failures or endpoint.ejected_until > now:
+                return
+            ejected = sum(1 for e in self.endpoints if e.ejected_until > now)
+            if ejected + 1 <= self.max_ejected * len(self.endpoints):
+                endpoint.ejected_until = now + self.ejection_time
+                endpoint.ejections += 1
+                endpoint.consecutive_failures = 0
+
+    def release(self, endpoint: Endpoint):
+        """
+        Finish request without outcome (request is cancelled)
+        """
+        with self.__lock:
+            endpoint.outstanding -= 1
+
+    def probed(self, endpoint: Endpoint, healthy: bool):
+        """
+        Record result of active probe: unhealthy endpoint is ejected until healthy probe
+        """
+        with self.__lock:
+            if healthy:
+                if endpoint.ejected_until == math.inf:
+                    endpoint.ejected_until = 0.
+                endpoint.consecutive_failures = 0
+            elif endpoint.ejected_until != math.inf:
+                endpoint.ejected_until = math.inf
+                endpoint.ejections += 1
+
+    @property
+    def stats(self) -> typing.Dict[str, EndpointStats]:
+        """
+        Stats of endpoints by url: outstanding (requests in flight), requests, failures, consecutive_failures, latency
+        (peak EWMA, seconds), ejected and ejections (count)
+        """
+        now = time.monotonic()
+        with self.__lock:
+            return {e.url: EndpointStats(outstanding=e.outstanding, requests=e.requests, failures=e.failures,
+                                         consecutive_failures=e.consecutive_failures, latency=e.ewma,
+                                         ejected=e.ejected_until > now, ejections=e.ejections)
+                    for e in self.endpoints}
+
+    def gauges(self):
+        """
+        Collector of gauges for clients.metrics.Metrics: requests in flight and ejection of each endpoint
+        """
+        for url, stats in self.stats.items():
+            yield ('endpoint_outstanding', 'Requests in flight by endpoint', {'endpoint': url}, stats.outstanding)
+            yield ('endpoint_ejected', 'Endpoint is ejected by health checks', {'endpoint': url}, int(stats.ejected))
@@ -0,0 +1,165 @@
+import collections
+import threading
+import time
+import typing
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+BreakerState = collections.namedtuple('BreakerState', ['state', 'calls', 'failures', 'slow_calls', 'rejected',
+                                                       'opened'])
+
+
+class CircuitOpenException(Exception):
+    """
+    Request is rejected, because circuit breaker of endpoint and method is open
+    """
+
+
+class CircuitBreaker:
+    def __init__(self, window: float = 10., min_calls: int = 10, error_rate: float = 0.5,
+                 slow_call_duration: float = None, slow_call_rate: float = 1., open_timeout: float = 30.,
+                 half_open_calls: int = 1):
+        """
+        Circuit breaker of one endpoint and method. Closed breaker passes requests and counts outcomes over sliding
+        window. It is opened, when share of failures or slow calls reaches threshold. Open breaker rejects requests by
+        CircuitOpenException during open_timeout, after that it is half-open: half_open_calls trial requests are passed.
+        If they succeed, breaker is closed, otherwise it is opened again
+
+        :param window: time (seconds) of sliding window of outcomes
+        :param min_calls: min count of calls into window to calculate rates
+        :param error_rate: share of failed calls, which opens breaker
+        :param slow_call_duration: duration (seconds) of slow call. None is slow calls are not counted
+        :param slow_call_rate: share of slow calls, which opens breaker
+        :param open_timeout: time (seconds), while breaker is open
+        :param half_open_calls: count of trial calls into half-open state
+        """
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_duration = slow_call_duration
+        self.slow_call_rate = slow_call_rate
+        self.open_timeout = open_timeout
+        self.half_open_calls = half_open_calls
+        self.__lock = threading.Lock()
+        self.__state = CLOSED
+        self.__calls = collections.deque()
+        self.__failures = 0
+        self.__slow_calls = 0
+        self.__rejected = 0
+        self.__opened = None
+        self.__trials = 0
+        self.__successes = 0
+
+    @property
+    def state(self) -> BreakerState:
+        with self.__lock:
+            self.__trim(time.monotonic())
+            return BreakerState(state=self.__current(), calls=len(self.__calls), failures=self.__failures,
+                                slow_calls=self.__slow_calls, rejected=self.__rejected, opened=self.__opened)
+
+    def __current(self):
+        if self.__state == OPEN and time.monotonic() - self.__opened >= self.open_timeout:
+            return HALF_OPEN
+        return self.__state
+
+    def allow(self):
+        """
+        Take permission for call. It raises CircuitOpenException, if breaker is open or all trial calls of half-open
+        breaker are in progress
+        """
+        with self.__lock:
+            state = self.__current()
+            if state == HALF_OPEN and self.__state == OPEN:
+                self.__state, self.__trials, self.__successes = HALF_OPEN, 0, 0
+            if state == OPEN or state == HALF_OPEN and self.__trials >= self.half_open_calls:
+                self.__rejected += 1
+                raise CircuitOpenException(f'circuit breaker is {state}')
+            if state == HALF_OPEN:
+                self.__trials += 1
+
+    def release(self):
+        """
+        Return permission of call without outcome (call is cancelled)
+        """
+        with self.__lock:
+            if self.__state == HALF_OPEN:
+                self.__trials = max(0, self.__trials - 1)
+
+    def record(self, failed: bool, elapsed: float):
+        """
+        Record outcome of permitted call
+
+        :param failed: call is failed (error or status of failure)
+        :param elapsed: duration of call (seconds)
+        """
+        slow = self.slow_call_duration is not None and elapsed >= self.slow_call_duration
+        with self.__lock:
+            now = time.monotonic()
+            if self.__state == HALF_OPEN:
+                self.__trials = max(0, self.__trials - 1)
+                if failed or slow:
+                    self.__open(now)
+                    return
+                self.__successes += 1
+                if self.__successes >= self.half_open_calls:
+                    self.__state = CLOSED
+                    self.__calls.clear()
+                    self.__failures = self.__slow_calls = 0
+                return
+            if self.__state == OPEN:
+                return
+            self.__calls.append((now, failed, slow))
+            self.__failures += failed
+            self.__slow_calls += slow
+            self.__trim(now)
+            calls = len(self.__calls)
+            if calls < self.min_calls:
+                return
+            if self.__failures / calls >= self.error_rate or \
+                    self.slow_call_duration is not None and self.__slow_calls / calls >= self.slow_call_rate:
+                self.__open(now)
+
+    def __open(self, now):
+        self.__state = OPEN
+        self.__opened = now
+        self.__calls.clear()
+        self.__failures = self.__slow_calls = 0
+
+    def __trim(self, now):
+        calls = self.__calls
+        while calls and calls[0][0] <= now - self.window:
+            _, failed, slow = calls.popleft()
+            self.__failures -= failed
+            self.__slow_calls -= slow
+
+
+class Breakers:
+    def __init__(self, failure_statuses: typing.Callable[[int], bool] = None, **options):
+        """
+        Circuit breakers of client, which are keyed by endpoint and class of method. Breakers are created at first call
+
+        :param failure_statuses: function, which checks, that status code of response is failure. None is status codes
+                                 5xx
+        :param options: arguments of CircuitBreaker
+        """
+        self.failure_statuses = failure_statuses if failure_statuses is not None else lambda status: status >= 500
+        self.options = options
+        self.__breakers = {}
+        self.__lock = threading.Lock()
+
+    def get(self, endpoint: str, m_class: type) -> CircuitBreaker:
+        key = (endpoint, m_class)
+        breaker = self.__breakers.get(key)
+        if breaker is None:
+            with self.__lock:
+                breaker = self.__breakers.setdefault(key, CircuitBreaker(**self.options))
+        return breaker
+
+    @property
+    def states(self) -> typing.Dict[typing.Tuple[str, type], BreakerState]:
+        """
+        States of breakers by endpoint and class of method
+        """
+        return {key: breaker.state for key, breaker in list(self.__breakers.items())}
@@ -0,0 +1,257 @@
+import asyncio
+import collections
+import datetime
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import typing
+
+from cachecontrol import CacheControlAdapter
+from cachecontrol.cache import BaseCache
+
+CacheStats = collections.namedtuple('CacheStats', ['hits', 'misses', 'revalidations'])
+
+
+class LRUCache(BaseCache):
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        """
+        In-process storage of responses. The least recently used responses are evicted, when size of storage is more
+        than max_bytes
+
+        :param max_bytes: budget of storage (sum of sizes of serialized responses)
+        """
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.__data = collections.OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.__data)
+
+    def get(self, key):
+        with self.__lock:
+            item = self.__data.get(key)
+            if item is None:
+                return None
+            value, deadline = item
+            if deadline is not None and deadline < time.monotonic():
+                self.__pop(key)
+                return None
+            self.__data.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires=None):
+        if isinstance(expires, datetime.datetime):
+            expires = (expires - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+        deadline = time.monotonic() + expires if expires is not None else None
+        with self.__lock:
+            self.__pop(key)
+            if len(value) > self.max_bytes:
+                return
+            self.__data[key] = (value, deadline)
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                self.__pop(next(iter(self.__data)))
+
+    def delete(self, key):
+        with self.__lock:
+            self.__pop(key)
+
+    def __pop(self, key):
+        item = self.__data.pop(key, None)
+        if item is not None:
+            self.size -= len(item[0])
+
+
+class FileCache(BaseCache):
+    def __init__(self, directory: str):
+        """
+        File storage of responses. Each response is stored into separate file. It can be shared between processes
+
+        :param directory: path to directory of storage. It is created, if it doesn't exist
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def __path(self, key):
+        name = hashlib.sha224(key.encode()).hexdigest()
+        return os.path.join(self.directory, name[:2], name)
+
+    def get(self, key):
+        try:
+            with open(self.__path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def set(self, key, value, expires=None):
+        path = self.__path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(value)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+    def delete(self, key):
+        try:
+            os.remove(self.__path(key))
+        except FileNotFoundError:
+            pass
+
+
+class CacheAdapter(CacheControlAdapter):
+    """
+    Adapter of requests, which caches responses by HTTP semantics (Cache-Control, ETag, Last-Modified, Vary) and
+    counts hits, misses and revalidations (304 responses of server)
+    """
+
+    def __init__(self, *args, **kwargs):
+        CacheControlAdapter.__init__(self, *args, **kwargs)
+        self.__lock = threading.Lock()
+        self.__hits = 0
+        self.__misses = 0
+        self.__revalidations = 0
+
+    @property
+    def stats(self) -> CacheStats:
+        return CacheStats(hits=self.__hits, misses=self.__misses, revalidations=self.__revalidations)
+
+    def build_response(self, request, response, from_cache=False, cacheable_methods=None):
+        revalidation = not from_cache and response.status == 304
+        resp = CacheControlAdapter.build_response(self, request, response, from_cache=from_cache,
+                                                  cacheable_methods=cacheable_methods)
+        if request.method not in (cacheable_methods or self.cacheable_methods):
+            return resp
+        with self.__lock:
+            if from_cache:
+                self.__hits += 1
+            elif revalidation and resp.from_cache:
+                self.__revalidations += 1
+            else:
+                self.__misses += 1
+        return resp
+
+
+AsyncCacheStats = collections.namedtuple('AsyncCacheStats', ['hits', 'stale_hits', 'misses', 'revalidations',
+                                                             'refresh_errors'])
+CacheEntry = collections.namedtuple('CacheEntry', ['response', 'status', 'etag', 'expires', 'size'])
+
+
+class AsyncCache:
+    def __init__(self, ttl: float = 60., stale_while_revalidate: float = 0., max_entries: int = 1024,
+                 max_bytes: int = 64 * 1024 * 1024):
+        """
+        In-memory cache of responses for AsyncClient. Responses are keyed on type of method, url, query params and
+        body, but not on credentials, so requests with auth or Authorization header are not cached by default. Requests
+        with streamed bodies (files, iterators) are not cached. Cached responses are shared between callers,
+        response_process must not change them
+
+        :param ttl: time (seconds), while response is fresh. Method.cache_ttl overrides it
+        :param stale_while_revalidate: time (seconds) after ttl, while stale response is returned at once and
+                                       response is refreshed into background task
+        :param max_entries: max count of responses into cache. The least recently used responses are evicted
+        :param max_bytes: max sum of sizes of bodies of responses
+        """
+        self.ttl = ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.__entries = collections.OrderedDict()
+        self.__refreshes = {}
+        self.__hits = 0
+        self.__stale_hits = 0
+        self.__misses = 0
+        self.__revalidations = 0
+        self.__refresh_errors = 0
+
+    def __len__(self):
+        return len(self.__entries)
+
+    @property
+    def stats(self) -> AsyncCacheStats:
+        return AsyncCacheStats(hits=self.__hits, stale_hits=self.__stale_hits, misses=self.__misses,
+                               revalidations=self.__revalidations, refresh_errors=self.__refresh_errors)
+
+    @staticmethod
+    def key(m_type: str, url: str, params, body: typing.Union[str, bytes] = None) -> typing.Hashable:
+        """
+        Key of response: type of method, url, query params and digest of serialized body
+        """
+        items = () if params is None else params.items() if isinstance(params, dict) else params
+        key = m_type, url, tuple(sorted((str(k), str(v)) for k, v in items))
+        if body is None:
+            return key
+        return key + (hashlib.sha256(body.encode() if isinstance(body, str) else body).hexdigest(),)
+
+    async def request(self, key: typing.Hashable, fetch: typing.Callable, ttl: float = None):
+        """
+        Take response from cache or fetch it
+
+        :param key: key of response (see AsyncCache.key)
+        :param fetch: coroutine function, which takes etag of cached response (or None) and returns tuple: response,
+                      status code, etag of response and size of response
+        :param ttl: time (seconds), while response is fresh. If it is None, ttl of cache is used
+        :return: response and status code
+        """
+        ttl = self.ttl if ttl is None else ttl
+        entry = self.__entries.get(key)
+        now = time.monotonic()
+        if entry is not None and now < entry.expires:
+            self.__entries.move_to_end(key)
+            self.__hits += 1
+            return entry.response, entry.status
+        if entry is not None and now < entry.expires + self.stale_while_revalidate:
+            self.__entries.move_to_end(key)
+            self.__stale_hits += 1
+            if key not in self.__refreshes:
+                task = asyncio.ensure_future(self.__refresh(key, fetch, ttl, entry))
+                self.__refreshes[key] = task
+                task.add_done_callback(lambda _: self.__refreshes.pop(key, None))
+            return entry.response, entry.status
+        return await self.__fetch(key, fetch, ttl, entry)
+
+    async def __refresh(self, key, fetch, ttl, entry):
+        try:
+            await self.__fetch(key, fetch, ttl, entry)
+        except Exception:
+            self.__refresh_errors += 1
+
+    async def __fetch(self, key, fetch, ttl, entry):
+        response, status, etag, size = await fetch(entry.etag if entry is not None else None)
+        if status == 304 and entry is not None:
+            self.__revalidations += 1
+            self.__set(key, entry._replace(expires=time.monotonic() + ttl))
+            return entry.response, entry.status
+        self.__misses += 1
+        if 200 <= status < 300:
+            self.__set(key, CacheEntry(response=response, status=status, etag=etag, expires=time.monotonic() + ttl,
+                                       size=size))
+        return response, status
+
+    def __set(self, key, entry):
+        self.delete(key)
+        if entry.size > self.max_bytes:
+            return
+        self.__entries[key] = entry
+        self.size += entry.size
+        while self.size > self.max_bytes or len(self.__entries) > self.max_entries:
+            self.delete(next(iter(self.__entries)))
+
+    def delete(self, key: typing.Hashable):
+        entry = self.__entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry.size
+
+    def cancel(self):
+        """
+        Cancel all background refreshes of responses
+        """
+        for task in list(self.__refreshes.values()):
+            task.cancel()
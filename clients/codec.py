@@ -0,0 +1,174 @@
+import json
+import typing
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import ujson
+except ImportError:
+    ujson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+
+
+class Codec:
+    """
+    Serializer of bodies of requests and responses
+    """
+    name: str = '???'
+
+    def dumps(self, obj) -> typing.Union[bytes, str]:
+        raise NotImplementedError()
+
+    def loads(self, data: bytes):
+        raise NotImplementedError()
+
+
+class JsonCodec(Codec):
+    name = 'json'
+
+    def dumps(self, obj):
+        return json.dumps(obj)
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonCodec(Codec):
+    name = 'orjson'
+
+    def __init__(self):
+        assert orjson is not None, 'orjson is not installed'
+
+    def dumps(self, obj):
+        return orjson.dumps(obj)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+class UjsonCodec(Codec):
+    name = 'ujson'
+
+    def __init__(self):
+        assert ujson is not None, 'ujson is not installed'
+
+    def dumps(self, obj):
+        return ujson.dumps(obj)
+
+    def loads(self, data):
+        return ujson.loads(data)
+
+
+class MsgpackCodec(Codec):
+    name = 'msgpack'
+
+    def __init__(self):
+        assert msgpack is not None, 'msgpack is not installed'
+
+    def dumps(self, obj):
+        return msgpack.packb(obj)
+
+    def loads(self, data):
+        return msgpack.unpackb(data, raw=False)
+
+
+def fastest_json() -> Codec:
+    """
+    The fastest of installed json codecs: orjson, ujson or json from stdlib
+    """
+    if orjson is not None:
+        return OrjsonCodec()
+    if ujson is not None:
+        return UjsonCodec()
+    return JsonCodec()
+
+
+def media_type(content_type: typing.Optional[str]) -> typing.Optional[str]:
+    """
+    Media type of Content-Type header without parameters: 'application/json; charset=utf-8' -> 'application/json'
+    """
+    if not content_type:
+        return None
+    return content_type.split(';', 1)[0].strip().lower()
+
+
+class Codecs:
+    def __init__(self, codecs: typing.Dict[str, Codec] = None, default: str = JSON):
+        """
+        Registry of codecs by media type. Responses are decoded by codec of Content-Type header. Responses without
+        codec are returned as bytes
+
+        :param codecs: codecs by media types. Media types with suffix +json (application/problem+json) are decoded by
+                       codec of application/json
+        :param default: media type of bodies of requests, which have not Content-Type header
+        """
+        self.codecs = {JSON: JsonCodec()} if codecs is None else dict(codecs)
+        self.default = default
+        self.__found = {}
+
+    @classmethod
+    def fastest(cls) -> 'Codecs':
+        """
+        Registry with the fastest of installed json codecs and msgpack (if it is installed)
+        """
+        codecs = {JSON: fastest_json()}
+        if msgpack is not None:
+            codecs[MSGPACK] = MsgpackCodec()
+        return cls(codecs)
+
+    def register(self, media_type_: str, codec: Codec):
+        self.codecs[media_type_.lower()] = codec
+        self.__found = {}
+
+    def find(self, content_type: typing.Optional[str]) -> typing.Optional[Codec]:
+        try:
+            return self.__found[content_type]
+        except KeyError:
+            pass
+        codec = self.__find(content_type)
+        if len(self.__found) < 1024:
+            self.__found[content_type] = codec
+        return codec
+
+    def __find(self, content_type):
+        media_type_ = media_type(content_type)
+        if media_type_ is None:
+            return None
+        codec = self.codecs.get(media_type_)
+        if codec is None and media_type_.endswith('+json'):
+            codec = self.codecs.get(JSON)
+        return codec
+
+    def encode(self, content_type: typing.Optional[str], obj):
+        """
+        Serialize body of request by codec of content type (or default media type, if content type is None). Body of
+        content type without codec (text/plain, for example) is serialized by codec of application/json
+        """
+        codec = self.find(content_type or self.default)
+        if codec is None:
+            codec = self.codecs.get(JSON) or JsonCodec()
+        return codec.dumps(obj)
+
+    def decode(self, content_type: typing.Optional[str], data: bytes):
+        """
+        Deserialize body of response by codec of content type. Body is returned as is, if there is not codec or body
+        is not valid
+        """
+        codec = self.find(content_type)
+        if codec is None:
+            return data
+        try:
+            return codec.loads(data)
+        except Exception:
+            return data
+
+
+default = Codecs()
@@ -0,0 +1,152 @@
+import gzip
+import typing
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+GZIP = 'gzip'
+DEFLATE = 'deflate'
+BROTLI = 'br'
+ZSTD = 'zstd'
+
+# order of preference of Accept-Encoding
+PREFERENCE = (ZSTD, BROTLI, GZIP, DEFLATE)
+
+
+def available() -> typing.List[str]:
+    """
+    Content codings, which are installed, in order of preference
+    """
+    installed = {GZIP, DEFLATE}
+    if zstandard is not None:
+        installed.add(ZSTD)
+    if brotli is not None:
+        installed.add(BROTLI)
+    return [e for e in PREFERENCE if e in installed]
+
+
+def compress(encoding: str, data: bytes, level: int = None) -> bytes:
+    """
+    Compress data by content coding
+
+    :param encoding: gzip, deflate, br or zstd
+    :param level: level of compression. None is default of coding
+    """
+    if encoding == GZIP:
+        return gzip.compress(data, compresslevel=level if level is not None else 6, mtime=0)
+    if encoding == DEFLATE:
+        return zlib.compress(data, level if level is not None else 6)
+    if encoding == ZSTD:
+        assert zstandard is not None, 'zstandard is not installed'
+        return zstandard.ZstdCompressor(level=level if level is not None else 3).compress(data)
+    if encoding == BROTLI:
+        assert brotli is not None, 'brotli is not installed'
+        return brotli.compress(data, quality=level if level is not None else 4)
+    raise ValueError(f'unknown content coding {encoding}')
+
+
+def decompress(encoding: str, data: bytes) -> bytes:
+    """
+    Decompress data by content coding
+    """
+    if encoding == GZIP:
+        return gzip.decompress(data)
+    if encoding == DEFLATE:
+        return zlib.decompress(data)
+    if encoding == ZSTD:
+        assert zstandard is not None, 'zstandard is not installed'
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    if encoding == BROTLI:
+        assert brotli is not None, 'brotli is not installed'
+        return brotli.decompress(data)
+    raise ValueError(f'unknown content coding {encoding}')
+
+
+def aiohttp_encodings() -> typing.List[str]:
+    """
+    Content codings, which are decompressed by aiohttp
+    """
+    try:
+        from aiohttp import compression_utils
+    except ImportError:
+        return [GZIP, DEFLATE]
+    decoded = {GZIP, DEFLATE}
+    if getattr(compression_utils, 'HAS_BROTLI', False):
+        decoded.add(BROTLI)
+    if getattr(compression_utils, 'HAS_ZSTD', False):
+        decoded.add(ZSTD)
+    return [e for e in PREFERENCE if e in decoded]
+
+
+def requests_encodings() -> typing.List[str]:
+    """
+    Content codings, which are decompressed by requests (urllib3)
+    """
+    from urllib3.util import request
+    decoded = {e.strip() for e in request.ACCEPT_ENCODING.split(',')}
+    return [e for e in PREFERENCE if e in decoded]
+
+
+class Compression:
+    def __init__(self, encoding: str = GZIP, threshold: int = 1024, level: int = None,
+                 accept: typing.Sequence[str] = None):
+        """
+        Compression of bodies of requests and negotiation of compression of responses. Bodies (bytes or str), which are
+        not smaller than threshold, are compressed and sent with Content-Encoding. Streams, files and multipart bodies
+        are sent as is. Accept-Encoding of requests lists codings, which are decompressed by transport of client.
+        Responses are decompressed by transport while they are read, so streams are decompressed chunk by chunk
+
+        :param encoding: content coding of requests: gzip, deflate, br (brotli must be installed) or zstd (zstandard
+                         must be installed)
+        :param threshold: min size of body (bytes), which is compressed
+        :param level: level of compression. None is default of coding
+        :param accept: content codings of Accept-Encoding in order of preference. Codings, which are not decompressed
+                       by transport, are skipped. None is all codings of transport
+        """
+        assert encoding in available(), f'content coding {encoding} is not installed'
+        self.encoding = encoding
+        self.threshold = threshold
+        self.level = level
+        self.accept = accept
+
+    def accept_encoding(self, decoded: typing.Sequence[str]) -> str:
+        """
+        Value of Accept-Encoding header
+
+        :param decoded: codings, which are decompressed by transport
+        """
+        return ', '.join(e for e in (self.accept or decoded) if e in decoded)
+
+    def apply(self, body, headers: typing.Optional[typing.Dict], accept_encoding: str,
+              enabled: bool = True) -> typing.Tuple[typing.Any, typing.Dict]:
+        """
+        Compress body of request and set Accept-Encoding. Headers of method are not changed, headers of method
+        override Accept-Encoding and Content-Encoding
+
+        :param body: encoded body of request
+        :param headers: headers of request
+        :param accept_encoding: value of Accept-Encoding
+        :param enabled: compress body (Method.compress)
+        :return: body and headers
+        """
+        headers = dict(headers) if headers is not None else {}
+        names = {key.lower() for key in headers}
+        if 'accept-encoding' not in names:
+            headers['Accept-Encoding'] = accept_encoding
+        if not enabled or 'content-encoding' in names or not isinstance(body, (str, bytes)):
+            return body, headers
+        data = body.encode() if isinstance(body, str) else body
+        if len(data) < self.threshold:
+            return body, headers
+        headers['Content-Encoding'] = self.encoding
+        return compress(self.encoding, data, self.level), headers
@@ -0,0 +1,60 @@
+import collections
+import contextlib
+import contextvars
+import time
+import typing
+
+Timeout = collections.namedtuple('Timeout', ['connect', 'read', 'total'], defaults=[None, None, None])
+Timeout.__doc__ = """
+Timeouts of request (seconds): connect (connection to server), read (waiting of data from server) and total (whole
+request). None is without timeout
+"""
+
+_deadline = contextvars.ContextVar('deadline', default=None)
+
+
+@contextlib.contextmanager
+def deadline(timeout: float):
+    """
+    Deadline of all requests into context (including nested calls and tasks, which are created into context). Timeouts
+    of requests are shrunk to remaining time. Nested deadline cannot be later than outer deadline
+
+        with deadline.deadline(2.):
+            await client.request(m)
+
+    :param timeout: time (seconds) since now
+    """
+    value = time.monotonic() + timeout
+    outer = _deadline.get()
+    if outer is not None:
+        value = min(value, outer)
+    token = _deadline.set(value)
+    try:
+        yield value
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> typing.Optional[float]:
+    """
+    Remaining time (seconds) of deadline of context. None, if deadline is not set
+    """
+    value = _deadline.get()
+    if value is None:
+        return None
+    return value - time.monotonic()
+
+
+def merge(*timeouts: typing.Optional[Timeout]) -> Timeout:
+    """
+    Merge timeouts: each field is taken from the first timeout, where it is not None. Total timeout is shrunk to
+    remaining time of deadline of context
+    """
+    fields = [None, None, None]
+    for timeout in timeouts:
+        if timeout is not None:
+            fields = [f if f is not None else t for f, t in zip(fields, timeout)]
+    left = remaining()
+    if left is not None:
+        fields[2] = left if fields[2] is None else min(fields[2], left)
+    return Timeout(*fields)
@@ -0,0 +1,468 @@
+import asyncio
+import collections
+import concurrent.futures
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import typing
+
+import aiohttp
+import requests
+
+from clients import http
+from clients.middleware import Overlay
+
+DownloadStats = collections.namedtuple('DownloadStats', ['size', 'downloaded', 'resumed', 'segments', 'retries',
+                                                         'elapsed'])
+
+CONTENT_RANGE = re.compile(r'bytes (\d+)-(\d+)/(\d+|\*)')
+RANGES = 'ranges'
+WHOLE = 'whole'
+EMPTY = 'empty'
+
+
+class ChecksumException(Exception):
+    """
+    Checksum of downloaded file does not match. Partial file is removed, so the next download starts from scratch
+    """
+
+
+class ResourceChangedException(http.RequestException):
+    """
+    Resource is changed since partial file was started (server ignores If-Range and returns the whole resource)
+    """
+
+
+def validator_of(headers) -> typing.Optional[str]:
+    """
+    Validator of resource for If-Range: strong ETag or Last-Modified
+    """
+    etag = headers.get('ETag')
+    if etag is not None and not etag.startswith('W/'):
+        return etag
+    return headers.get('Last-Modified')
+
+
+def check_range(resp, status: int, start: int) -> typing.Optional[int]:
+    """
+    Check response of range request
+
+    :param start: the first byte of range
+    :return: size of resource. None is unknown size
+    """
+    if status == 200:
+        raise ResourceChangedException('server returned the whole resource instead of range')
+    if status != 206:
+        raise http.RequestException(f'unexpected status {status} of range request')
+    match = CONTENT_RANGE.fullmatch(resp.headers.get('Content-Range', ''))
+    if match is None or int(match.group(1)) != start:
+        raise http.RequestException(f'unexpected Content-Range {resp.headers.get("Content-Range")}')
+    return int(match.group(3)) if match.group(3) != '*' else None
+
+
+class Part:
+    def __init__(self, path: typing.Union[str, os.PathLike], segment_size: int):
+        """
+        Partial file of download (path.part) and its state (path.part.json): size, validator of resource and count of
+        written bytes of each segment. Each segment is written by one worker at its offsets, so workers do not share
+        position of file. State is saved after data is flushed to disk, so resumed download trusts written bytes only
+        """
+        self.path = os.fspath(path)
+        self.part = self.path + '.part'
+        self.state = self.part + '.json'
+        self.segment_size = segment_size
+        self.size = None
+        self.validator = None
+        self.done = []
+        self.__fd = None
+        self.__lock = threading.Lock()
+
+    @property
+    def written(self) -> int:
+        return sum(self.done)
+
+    def load(self) -> bool:
+        """
+        Load state of partial file. Segment size of state is used instead of segment size of download. Partial file
+        without validator is not resumed: If-Range cannot be sent, so a changed resource would be mixed into the file
+        """
+        try:
+            with open(self.state) as f:
+                state = json.load(f)
+            size, validator, segment_size, done = (state['size'], state['validator'], state['segment_size'],
+                                                   state['done'])
+            if validator is None or os.path.getsize(self.part) != size:
+                return False
+        except (OSError, ValueError, KeyError):
+            return False
+        self.size, self.validator, self.segment_size, self.done = size, validator, segment_size, done
+        self.__open()
+        return True
+
+    def create(self, size: int, validator: typing.Optional[str]):
+        """
+        Create partial file of size and preallocate it
+        """
+        self.size, self.validator = size, validator
+        self.done = [0] * max(1, -(-size // self.segment_size))
+        self.__open(truncate=True)
+        os.ftruncate(self.__fd, size)
+        if hasattr(os, 'posix_fallocate') and size > 0:
+            try:
+                os.posix_fallocate(self.__fd, 0, size)
+            except OSError:
+                pass  # file system does not support preallocation, file is sparse
+        self.save()
+
+    def create_whole(self):
+        """
+        Create partial file of unknown size, which is written sequentially. It cannot be resumed
+        """
+        self.size, self.validator, self.done = None, None, [0]
+        self.__open(truncate=True)
+
+    def __open(self, truncate: bool = False):
+        flags = os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0) | (os.O_TRUNC if truncate else 0)
+        self.__fd = os.open(self.part, flags, 0o644)
+
+    def range(self, segment: int) -> typing.Tuple[int, int]:
+        """
+        The first and the last bytes of segment, which are not written yet. The first byte is greater than the last
+        one, if segment is written
+        """
+        start = segment * self.segment_size
+        return start + self.done[segment], min(start + self.segment_size, self.size) - 1
+
+    def pending(self) -> typing.List[int]:
+        return [i for i in range(len(self.done)) if self.size is None or self.range(i)[0] <= self.range(i)[1]]
+
+    def write(self, segment: int, data: bytes):
+        """
+        Write next chunk of segment at its offset
+        """
+        offset = segment * self.segment_size + self.done[segment]
+        if self.size is not None and offset + len(data) > min((segment + 1) * self.segment_size, self.size):
+            raise http.RequestException('response is longer than range')
+        view = memoryview(data)
+        while view:
+            if hasattr(os, 'pwrite'):
+                n = os.pwrite(self.__fd, view, offset)
+            else:
+                with self.__lock:
+                    os.lseek(self.__fd, offset, os.SEEK_SET)
+                    n = os.write(self.__fd, view)
+            view = view[n:]
+            offset += n
+        self.done[segment] += len(data)
+
+    def save(self):
+        """
+        Flush data and save state atomically
+        """
+        if self.size is None or self.__fd is None:
+            return
+        with self.__lock:
+            os.fsync(self.__fd)
+            state = {'size': self.size, 'validator': self.validator, 'segment_size': self.segment_size,
+                     'done': list(self.done)}
+            with open(self.state + '.tmp', 'w') as f:
+                json.dump(state, f)
+            os.replace(self.state + '.tmp', self.state)
+
+    def close(self):
+        if self.__fd is not None:
+            fd, self.__fd = self.__fd, None
+            os.close(fd)
+
+    def digest(self, algorithm: str) -> str:
+        h = hashlib.new(algorithm)
+        with open(self.part, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                h.update(block)
+        return h.hexdigest()
+
+    def finish(self, checksum: typing.Optional[str], algorithm: str):
+        """
+        Verify checksum and move partial file to path
+        """
+        self.close()
+        if checksum is not None:
+            digest = self.digest(algorithm)
+            if digest != checksum.lower():
+                self.discard()
+                raise ChecksumException(f'{algorithm} of {self.path} is {digest}, expected {checksum}')
+        os.replace(self.part, self.path)
+        self.remove(self.state)
+
+    def discard(self):
+        self.close()
+        self.remove(self.part)
+        self.remove(self.state)
+
+    @staticmethod
+    def remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class Downloader:
+    def __init__(self, connections: int = 4, segment_size: int = 8 * 1024 * 1024, attempts: int = 3,
+                 chunk_size: int = 64 * 1024):
+        """
+        Parallel download of large resources by Range requests. The first request takes the first segment and size of
+        resource (Content-Range), then segments are downloaded over connections in parallel straight into preallocated
+        partial file (path.part). Partial file and its state (path.part.json) are kept after failure, so the next
+        download of the same path resumes it (If-Range checks, that resource is not changed). If server does not
+        support ranges, resource is downloaded by one request. Requests are sent by client, so middlewares, retries,
+        rate limits, balancer and metrics of client are applied to each segment. Client must have connection pool for
+        connections (pool_maxsize of Client, limit of AsyncClient)
+
+        :param connections: count of parallel requests
+        :param segment_size: size of segment (bytes). Segment is retried from the last written byte
+        :param attempts: count of attempts of each segment, if body is broken
+        :param chunk_size: size of chunk of body, which is written at once
+        """
+        assert connections > 0, 'connections must be positive'
+        assert segment_size > 0, 'segment_size must be positive'
+        self.connections = connections
+        self.segment_size = segment_size
+        self.attempts = attempts
+        self.chunk_size = chunk_size
+
+    @staticmethod
+    def segment(method, start: int, end: int = None, validator: str = None):
+        """
+        Copy of method with Range of bytes from start till end
+        """
+        overlay = Overlay(method)
+        overlay.headers['Range'] = f'bytes={start}-{end if end is not None else ""}'
+        # offsets of ranges are offsets of identity representation
+        overlay.headers['Accept-Encoding'] = 'identity'
+        if validator is not None:
+            overlay.headers['If-Range'] = validator
+        return overlay.apply()
+
+    def open(self, part: Part, resp, status: int) -> str:
+        """
+        Create partial file by response of the first range. Response is closed, if error is raised
+
+        :return: RANGES (response is the first segment), WHOLE (response is the whole resource) or EMPTY
+        """
+        try:
+            if status == 200:
+                part.create_whole()
+                return WHOLE
+            if status == 416 and resp.headers.get('Content-Range') == 'bytes */0':
+                part.create(0, None)
+                return EMPTY
+            size = check_range(resp, status, 0)
+            if size is None:
+                raise http.RequestException('size of resource is unknown')
+            part.create(size, validator_of(resp.headers))
+            return RANGES
+        except BaseException:
+            resp.close()
+            raise
+
+    def download(self, client: http.Client, method: http.BaseMethod, path: typing.Union[str, os.PathLike],
+                 checksum: str = None, algorithm: str = 'sha256') -> DownloadStats:
+        """
+        Download resource of GET method into file by Client
+
+        :param path: path of file. Partial file is path.part
+        :param checksum: hex digest of file. ChecksumException is raised, if digest of downloaded file is different
+        :param algorithm: algorithm of checksum (see hashlib.new)
+        """
+        start = time.perf_counter()
+        part = Part(path, self.segment_size)
+        loaded = part.load()
+        resumed = part.written
+        try:
+            first = None
+            if not loaded:
+                resp, status = client.request(self.segment(method, 0, self.segment_size - 1), stream=True,
+                                              process=False)
+                mode = self.open(part, resp, status)
+                if mode == EMPTY:
+                    resp.close()
+                else:
+                    first = resp
+            retries = self.__fetch_all(client, method, part, first)
+        except ResourceChangedException:
+            part.discard()
+            if not loaded:
+                raise
+            return self.download(client, method, path, checksum, algorithm)
+        except BaseException:
+            part.save()
+            part.close()
+            raise
+        part.finish(checksum, algorithm)
+        return DownloadStats(size=part.written, downloaded=part.written - resumed, resumed=resumed,
+                             segments=len(part.done), retries=retries, elapsed=time.perf_counter() - start)
+
+    def __fetch_all(self, client, method, part: Part, first) -> int:
+        if part.size is None:
+            return self.__fetch(client, method, part, 0, first, threading.Event())
+        pending = part.pending()
+        stopped = threading.Event()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.connections) as executor:
+            futures = [executor.submit(self.__fetch, client, method, part, i, first if i == 0 else None, stopped)
+                       for i in pending]
+            if first is not None and 0 not in pending:
+                first.close()
+            try:
+                return sum(f.result() for f in futures)
+            except BaseException:
+                stopped.set()
+                for f in futures:
+                    f.cancel()
+                raise
+
+    def __fetch(self, client, method, part: Part, segment: int, resp, stopped: threading.Event) -> int:
+        """
+        Download segment. Response of the first range is passed by caller
+
+        :return: count of retries
+        """
+        for attempt in range(self.attempts):
+            if stopped.is_set():
+                return attempt
+            start, end = part.range(segment) if part.size is not None else (0, None)
+            try:
+                if resp is None:
+                    resp, status = client.request(self.segment(method, start, end, part.validator), stream=True,
+                                                  process=False)
+                    try:
+                        check_range(resp, status, start)
+                    except BaseException:
+                        resp.close()
+                        raise
+                with resp:
+                    for chunk in resp.iter_content(self.chunk_size):
+                        if stopped.is_set():
+                            return attempt
+                        part.write(segment, chunk)
+            except (requests.RequestException, http.RequestException) as e:
+                # the whole resource cannot be resumed
+                if isinstance(e, ResourceChangedException) or part.size is None or attempt == self.attempts - 1:
+                    raise
+                continue
+            finally:
+                resp = None
+            if part.size is None:
+                return attempt
+            start, end = part.range(segment)
+            if start > end:
+                part.save()
+                return attempt
+            if attempt == self.attempts - 1:
+                raise http.RequestException(f'segment {segment} is truncated')
+        return self.attempts - 1
+
+    async def download_async(self, client: http.AsyncClient, method: http.BaseMethod,
+                             path: typing.Union[str, os.PathLike], checksum: str = None,
+                             algorithm: str = 'sha256') -> DownloadStats:
+        """
+        Download resource of GET method into file by AsyncClient. Chunks are written to page cache without executor,
+        checksum is computed by executor
+
+        :param path: path of file. Partial file is path.part
+        :param checksum: hex digest of file. ChecksumException is raised, if digest of downloaded file is different
+        :param algorithm: algorithm of checksum (see hashlib.new)
+        """
+        start = time.perf_counter()
+        part = Part(path, self.segment_size)
+        loaded = part.load()
+        resumed = part.written
+        try:
+            first = None
+            if not loaded:
+                resp, status = await client.request(self.segment(method, 0, self.segment_size - 1), stream=True,
+                                                    process=False)
+                mode = self.open(part, resp, status)
+                if mode == EMPTY:
+                    resp.close()
+                else:
+                    first = resp
+            retries = await self.__fetch_all_async(client, method, part, first)
+        except ResourceChangedException:
+            part.discard()
+            if not loaded:
+                raise
+            return await self.download_async(client, method, path, checksum, algorithm)
+        except BaseException:
+            part.save()
+            part.close()
+            raise
+        await asyncio.get_event_loop().run_in_executor(None, part.finish, checksum, algorithm)
+        return DownloadStats(size=part.written, downloaded=part.written - resumed, resumed=resumed,
+                             segments=len(part.done), retries=retries, elapsed=time.perf_counter() - start)
+
+    async def __fetch_all_async(self, client, method, part: Part, first) -> int:
+        if part.size is None:
+            return await self.__fetch_async(client, method, part, 0, first)
+        pending = collections.deque(part.pending())
+        if first is not None and (not pending or pending[0] != 0):
+            first.close()
+            first = None
+
+        async def worker(resp):
+            retries = 0
+            while pending:
+                segment = pending.popleft()
+                retries += await self.__fetch_async(client, method, part, segment, resp if segment == 0 else None)
+                resp = None
+            return retries
+
+        tasks = [asyncio.ensure_future(worker(first if i == 0 else None))
+                 for i in range(min(self.connections, len(pending)))]
+        if not tasks:
+            return 0
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if task.exception() is not None:
+                    raise task.exception()
+            return sum(task.result() for task in tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def __fetch_async(self, client, method, part: Part, segment: int, resp) -> int:
+        for attempt in range(self.attempts):
+            start, end = part.range(segment) if part.size is not None else (0, None)
+            try:
+                if resp is None:
+                    resp, status = await client.request(self.segment(method, start, end, part.validator),
+                                                        stream=True, process=False)
+                    try:
+                        check_range(resp, status, start)
+                    except BaseException:
+                        resp.close()
+                        raise
+                async with resp:
+                    async for chunk in resp.iter_chunked(self.chunk_size):
+                        part.write(segment, chunk)
+            except (aiohttp.ClientError, asyncio.TimeoutError, http.RequestException) as e:
+                # the whole resource cannot be resumed
+                if isinstance(e, ResourceChangedException) or part.size is None or attempt == self.attempts - 1:
+                    raise
+                continue
+            finally:
+                resp = None
+            if part.size is None:
+                return attempt
+            start, end = part.range(segment)
+            if start > end:
+                part.save()
+                return attempt
+            if attempt == self.attempts - 1:
+                raise http.RequestException(f'segment {segment} is truncated')
+        return self.attempts - 1
@@ -0,0 +1,66 @@
+import asyncio
+import collections
+import typing
+
+FlightStats = collections.namedtuple('FlightStats', ['calls', 'coalesced'])
+
+
+class SingleFlight:
+    def __init__(self):
+        """
+        Coalescing of identical concurrent requests: the first request is sent, other requests wait its result. Results
+        are shared between callers, response_process must not change them
+        """
+        self.__flights = {}
+        self.__calls = 0
+        self.__coalesced = 0
+
+    def __len__(self):
+        return len(self.__flights)
+
+    @property
+    def stats(self) -> FlightStats:
+        """
+        Counters: calls (all requests) and coalesced (requests, which waited result of other request)
+        """
+        return FlightStats(calls=self.__calls, coalesced=self.__coalesced)
+
+    @staticmethod
+    def key(m_type: str, url: str, params, headers, auth=None, proxy: str = None) -> typing.Hashable:
+        """
+        Key of request. Requests with different credentials (auth) or proxies are not coalesced
+        """
+        items = params.items() if isinstance(params, dict) else params or ()
+        return (m_type, url, tuple(sorted((str(k), str(v)) for k, v in items)),
+                tuple(sorted((str(k).lower(), str(v)) for k, v in (headers or {}).items())), auth, proxy)
+
+    async def request(self, key: typing.Hashable, call: typing.Callable[[], typing.Awaitable]):
+        """
+        Call coroutine function or wait result of the same call in flight. Cancelling of caller doesn't cancel call,
+        while other callers wait it
+
+        :param key: key of request (see SingleFlight.key)
+        :param call: coroutine function, which takes request
+        """
+        self.__calls += 1
+        flight = self.__flights.get(key)
+        if flight is None:
+            flight = [asyncio.ensure_future(call()), 0]
+            self.__flights[key] = flight
+            flight[0].add_done_callback(lambda _: self.__done(key, flight))
+        else:
+            self.__coalesced += 1
+        task = flight[0]
+        flight[1] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done() and flight[1] == 1:
+                task.cancel()
+            raise
+        finally:
+            flight[1] -= 1
+
+    def __done(self, key, flight):
+        if self.__flights.get(key) is flight:
+            del self.__flights[key]
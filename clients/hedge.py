@@ -0,0 +1,111 @@
+import asyncio
+import collections
+import math
+import time
+import typing
+
+from clients.retry import IDEMPOTENT
+
+HedgeStats = collections.namedtuple('HedgeStats', ['requests', 'hedged', 'won', 'capped'])
+
+
+class Hedge:
+    def __init__(self, delay: float = None, percentile: float = 95., window: int = 1000, min_samples: int = 100,
+                 max_rate: float = 0.1, methods: typing.Iterable[str] = IDEMPOTENT):
+        """
+        Hedged requests of AsyncClient: if response is not received during delay, the second identical request is sent.
+        The first received response is used, the other request is cancelled
+
+        :param delay: fixed delay (seconds) before hedged request. None is percentile of latencies of recent requests
+        :param percentile: percentile of latencies of recent requests, which is used as delay
+        :param window: count of recent latencies
+        :param min_samples: min count of latencies to calculate percentile. Requests are not hedged before it
+        :param max_rate: max share of hedged requests, so load is increased not more than max_rate
+        :param methods: types of methods, which are hedged. Only idempotent methods are hedged by default
+        """
+        self.fixed_delay = delay
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.max_rate = max_rate
+        self.methods = frozenset(m.upper() for m in methods)
+        self.__latencies = collections.deque(maxlen=window)
+        self.__delay = None
+        self.__observed = 0
+        self.__requests = 0
+        self.__hedged = 0
+        self.__won = 0
+        self.__capped = 0
+
+    @property
+    def stats(self) -> HedgeStats:
+        """
+        Counters: requests, hedged (hedged requests are sent), won (hedged request is faster) and capped (hedged request
+        is not sent because of max_rate)
+        """
+        return HedgeStats(requests=self.__requests, hedged=self.__hedged, won=self.__won, capped=self.__capped)
+
+    def allows(self, m_type: str) -> bool:
+        return m_type.upper() in self.methods
+
+    def delay(self) -> typing.Optional[float]:
+        """
+        Delay before hedged request. None, if there are not enough latencies for percentile
+        """
+        if self.fixed_delay is not None:
+            return self.fixed_delay
+        return self.__delay
+
+    def observe(self, elapsed: float):
+        """
+        Add latency of request. Percentile is recalculated every 16 latencies
+        """
+        self.__latencies.append(elapsed)
+        self.__observed += 1
+        if self.fixed_delay is None and len(self.__latencies) >= self.min_samples and self.__observed % 16 == 0:
+            latencies = sorted(self.__latencies)
+            index = min(len(latencies) - 1, math.ceil(len(latencies) * self.percentile / 100) - 1)
+            self.__delay = latencies[max(0, index)]
+
+    async def __timed(self, call):
+        start = time.perf_counter()
+        result = await call()
+        self.observe(time.perf_counter() - start)
+        return result
+
+    async def request(self, call: typing.Callable[[], typing.Awaitable]):
+        """
+        Call coroutine function and hedge it by the second call, if result is not received during delay
+
+        :param call: coroutine function, which takes request. It must be safe to call it twice
+        :return: result of the first successful call. If both calls fail, exception of the first call is raised
+        """
+        self.__requests += 1
+        first = asyncio.ensure_future(self.__timed(call))
+        delay = self.delay()
+        if delay is None:
+            return await first
+        try:
+            done, _ = await asyncio.wait({first}, timeout=delay)
+        except BaseException:
+            first.cancel()
+            raise
+        if done:
+            return first.result()
+        if self.__hedged + 1 > self.max_rate * self.__requests:
+            self.__capped += 1
+            return await first
+        self.__hedged += 1
+        second = asyncio.ensure_future(self.__timed(call))
+        pending = {first, second}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.__won += 1
+                        return task.result()
+            return first.result()
+        finally:
+            for task in pending:
+                task.cancel()
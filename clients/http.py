@@ -1,9 +1,38 @@
+import asyncio
 import collections
-import json
+import concurrent.futures
+import contextlib
+import contextvars
+import functools
+import os
+import socket
+import threading
+import time
 import typing
+import weakref
 
 import aiohttp
+import attr
 import requests
+from cachecontrol.cache import BaseCache
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout as RequestsTimeout
+from urllib3.exceptions import ReadTimeoutError
+
+from clients import codec, deadline, upload
+from clients.balancer import Balancer, EndpointStats
+from clients.breaker import Breakers
+from clients.cache import AsyncCache, CacheAdapter, CacheStats
+from clients.codec import Codecs
+from clients.compression import Compression, aiohttp_encodings, requests_encodings
+from clients.deadline import Timeout
+from clients.flight import FlightStats, SingleFlight
+from clients.hedge import Hedge, HedgeStats
+from clients.metrics import Metrics
+from clients.ratelimit import RateLimits, RateLimitStats, TokenBucket
+from clients.transport import AsyncTransport, Transport
+from clients.middleware import Overlay, Pipeline, ResponseInfo
+from clients.retry import Retrier, Retry, RetryBudget, RetryStats
 
 
 class RequestException(Exception):
@@ -13,6 +42,13 @@ class RequestException(Exception):
     pass
 
 
+class RequestTimeoutException(RequestException):
+    """
+    This exception raises, when timeout of request or deadline of context is exceeded
+    """
+    pass
+
+
 class ResponseProcessException(Exception):
     """
     This exception raises while response process
@@ -21,9 +57,34 @@ class ResponseProcessException(Exception):
 
 
 AsyncFile = collections.namedtuple('AsyncFile', ['field', 'content', 'filename', 'content_type'])
+PoolStats = collections.namedtuple('PoolStats', ['limit', 'limit_per_host', 'in_use', 'idle', 'waiting', 'created',
+                                                 'reused'])
+RequestPlan = collections.namedtuple('RequestPlan', ['source', 'm_type', 'verb', 'multipart', 'url_', 'headers',
+                                                     'content_type'])
+
+# m_type of method -> verb of transport (method of requests.Session and aiohttp.ClientSession)
+VERBS = {'GET': 'get', 'POST': 'post', 'PUT': 'put', 'PATCH': 'patch', 'DELETE': 'delete', 'FILE': 'post'}
 
 
-class Method:
+def compile_plan(m_type: str, url_: str, headers: typing.Optional[typing.Dict]) -> RequestPlan:
+    """
+    Compile static attributes of method into plan of request
+
+    :param m_type: type of method (GET, POST, FILE etc...). Unknown types are passed to transport as is
+    :param url_: template of url
+    :param headers: static headers of method
+    """
+    m_type_ = m_type.upper()
+    content_type = None
+    for key, value in (headers or {}).items():
+        if key.lower() == 'content-type':
+            content_type = value
+    return RequestPlan(source=(m_type, url_, headers), m_type=m_type_, verb=VERBS.get(m_type_, m_type.lower()),
+                       multipart=m_type_ == 'FILE', url_=url_, headers=headers, content_type=content_type)
+
+
+class BaseMethod:
+    __slots__ = ()
     name: str = '???'
     m_type: str = '???'
     url_: str = ''
@@ -34,6 +95,15 @@ class Method:
     auth: typing.Tuple = None
     files_async: typing.List[AsyncFile] = None
     files_sync: typing.Dict = None
+    cache: bool = None
+    cache_ttl: float = None
+    stream: bool = False
+    codecs: Codecs = None
+    retry: Retry = None
+    hedge: bool = None
+    timeout: Timeout = None
+    rate_limit: TokenBucket = None
+    compress: bool = None
     """
     :arg name: name of method 
     :arg m_type: type of method (GET, POST, PUT etc...)
@@ -45,15 +115,67 @@ class Method:
     :arg auth: requests authorisation
     :arg files_async: list with files for ASYNC method (key is field of server, value is file: name and content)
     :arg files_sync: dict with files for SYNC method (key is field of server, value is file: name and content) 
+    :arg cache: cache responses of method into cache of AsyncClient. None is cache GET methods without auth and
+                Authorization header only
+    :arg cache_ttl: time (seconds), while cached response is fresh. None is ttl of cache of client
+    :arg stream: body of response is not read by client. response_process takes StreamResponse (Client) or
+                 AsyncStreamResponse (AsyncClient) instead of body
+    :arg codecs: codecs of body of request and response (by Content-Type). None is codecs of client
+    :arg retry: policy of retries (see clients.retry.Retry). None is policy of client, retry.NEVER disables retries
+    :arg hedge: hedge requests of method into AsyncClient with hedge. None is hedge idempotent methods only
+    :arg timeout: timeouts of request (see clients.deadline.Timeout). Fields, which are None, are taken from client
+    :arg rate_limit: token bucket of method (see clients.ratelimit.TokenBucket). It is shared by all objects of class and
+                     by all clients. It is applied together with rate_limits of client
+    :arg compress: compress body of request by compression of client. None is compress, False disables compression of
+                   body (Accept-Encoding is set anyway)
     """
 
+    __url_src = None
+    __url = None
+    __own_plan = None
+
     def __init__(self, *args):
         assert len(args) == self.count, f'count path args must by equal count. count: {self.count}. passed: {len(args)}'
         self.__args = args
 
+    @property
+    def plan(self) -> RequestPlan:
+        """
+        Plan of request. It is compiled once for class of method. If m_type, url_ or headers are changed for object,
+        plan is compiled for object once and it is kept into object, while these attributes are the same
+        """
+        cls = type(self)
+        plan = cls.__dict__.get('_BaseMethod__plan')
+        if plan is None:
+            plan = compile_plan(cls.m_type, cls.url_, cls.class_attr('headers'))
+            setattr(cls, '_BaseMethod__plan', plan)
+        m_type, url_, headers = self.m_type, self.url_, self.headers
+        source = plan.source
+        if source[0] is m_type and source[1] is url_ and source[2] is headers:
+            return plan
+        plan = self.__own_plan
+        if plan is not None:
+            source = plan.source
+            if source[0] is m_type and source[1] is url_ and source[2] is headers:
+                return plan
+        plan = compile_plan(m_type, url_, headers)
+        self.__own_plan = plan
+        return plan
+
+    @classmethod
+    def class_attr(cls, name: str):
+        """
+        Value of attribute, which is defined into class of method
+        """
+        return getattr(cls, name)
+
     @property
     def url(self):
-        return self.url_ % self.__args
+        url_ = self.url_
+        if self.__url_src is not url_:
+            self.__url = url_ % self.__args
+            self.__url_src = url_
+        return self.__url
 
     @staticmethod
     def response_process(resp, status_code):
@@ -61,26 +183,193 @@ class Method:
 
     @property
     def body_(self):
-        if self.body is None:
+        return self.encode()
+
+    def encode(self, codecs: Codecs = None, plan: RequestPlan = None):
+        """
+        Serialize body by codec of Content-Type header (application/json by default). Clients serialize body once per
+        request, so body can be changed in place between requests
+
+        :param codecs: codecs of client. Method.codecs overrides it
+        :param plan: plan of request, which is taken by client. None is Method.plan
+        """
+        body = self.body
+        if body is None:
             return None
-        if self.m_type != "FILE":
-            if isinstance(self.body, dict) or isinstance(self.body, list):
-                return json.dumps(self.body)
-        elif isinstance(self.body, list):
-            return json.dumps(self.body)
-        return self.body
+        return self._serialize(body, self.codecs or codecs or codec.default, plan or self.plan)
+
+    def _serialize(self, body, codecs: Codecs, plan: RequestPlan):
+        if isinstance(body, list) or isinstance(body, dict) and not plan.multipart:
+            return codecs.encode(plan.content_type, body)
+        return body
+
+    @property
+    def content_type(self) -> typing.Optional[str]:
+        return self.plan.content_type
+
+
+class Method(BaseMethod):
+    """
+    Method of API. Attributes of object are stored into __dict__, so any attribute can be set for object
+    """
+
+
+# attributes of CompactMethod, which can be changed for object
+COMPACT_FIELDS = ('headers', 'body', 'params', 'auth', 'files_async', 'files_sync')
+
+
+class CompactMeta(type):
+    """
+    Metaclass of CompactMethod. Values of COMPACT_FIELDS, which are defined into class, are moved to the shared table
+    of defaults of class (_defaults), and subclasses take empty __slots__, so objects have not __dict__
+    """
+
+    def __new__(mcs, name, bases, namespace):
+        defaults = {}
+        for base in reversed(bases):
+            defaults.update(getattr(base, '_defaults', {}))
+        for field in COMPACT_FIELDS:
+            if field in namespace:
+                defaults[field] = namespace.pop(field)
+        namespace['_defaults'] = defaults
+        namespace.setdefault('__slots__', ())
+        return type.__new__(mcs, name, bases, namespace)
+
+
+class CompactMethod(BaseMethod, metaclass=CompactMeta):
+    """
+    Method of API for high-volume call sites. Objects have not __dict__: COMPACT_FIELDS are stored into __slots__,
+    defaults of fields are stored into the shared table of class (_defaults) and are set into slots by __new__. Url is
+    not cached into object, because objects are short-lived. Subclasses are defined as subclasses of Method, but only
+    COMPACT_FIELDS (headers, body, params, auth, files_async, files_sync) can be set for object. Other attributes of
+    Method (m_type, url_, count, stream, timeout, retry etc.) are attributes of class. Setting of other attribute
+    raises AttributeError, add its name into __slots__ of subclass:
+
+        class GetPage(CompactMethod):
+            __slots__ = ('page',)
+    """
+    __slots__ = COMPACT_FIELDS + ('_BaseMethod__args', '_BaseMethod__own_plan')
+
+    def __new__(cls, *args):
+        self = object.__new__(cls)
+        self._BaseMethod__own_plan = None
+        for name, value in cls._defaults.items():
+            setattr(self, name, value)
+        return self
+
+    @classmethod
+    def class_attr(cls, name: str):
+        if name in cls._defaults:
+            return cls._defaults[name]
+        return getattr(cls, name)
+
+    @property
+    def url(self):
+        return self.url_ % self._BaseMethod__args
+
+
+CompactMethod._defaults = {field: getattr(BaseMethod, field) for field in COMPACT_FIELDS}
+
+
+class StreamResponse:
+    def __init__(self, resp: requests.Response):
+        """
+        Response of Client, which body is not read. Body must be read by iter_content or response must be closed
+
+        :param resp: response of requests
+        """
+        self.status = resp.status_code
+        self.headers = resp.headers
+        self.__resp = resp
 
+    def __enter__(self):
+        return self
 
-middleware_type_ = typing.List[typing.Callable[[Method], Method]]
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def iter_content(self, chunk_size: int = 64 * 1024) -> typing.Iterator[bytes]:
+        """
+        Iterate body by chunks. Connection is returned to pool after the last chunk
+        """
+        try:
+            yield from self.__resp.iter_content(chunk_size)
+        finally:
+            self.close()
+
+    def close(self):
+        self.__resp.close()
+
+
+class AsyncStreamResponse:
+    def __init__(self, resp: aiohttp.ClientResponse, chunk_size: int = 64 * 1024):
+        """
+        Response of AsyncClient, which body is not read. Body must be read by async for or response must be closed
+
+        :param resp: response of aiohttp
+        :param chunk_size: max size of chunk for async for
+        """
+        self.status = resp.status
+        self.headers = resp.headers
+        self.chunk_size = chunk_size
+        self.__resp = resp
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __aiter__(self):
+        return self.iter_chunked(self.chunk_size)
+
+    async def iter_chunked(self, chunk_size: int = 64 * 1024) -> typing.AsyncIterator[bytes]:
+        """
+        Iterate body by chunks. Connection is returned to pool after the last chunk
+        """
+        try:
+            async for chunk in self.__resp.content.iter_chunked(chunk_size):
+                yield chunk
+        finally:
+            self.close()
+
+    def close(self):
+        self.__resp.release()
+
+
+middleware_type_ = typing.List[typing.Callable[[BaseMethod], BaseMethod]]
+cow_middleware_type_ = typing.List[typing.Callable[[Overlay], None]]
+async_middleware_type_ = typing.List[typing.Callable[[Overlay], typing.Awaitable[None]]]
+hook_type_ = typing.List[typing.Callable[[ResponseInfo], typing.Any]]
+
+
+endpoint_type_ = typing.Union[str, typing.Sequence[str], Balancer]
+
+
+def to_balancer(endpoint: endpoint_type_) -> typing.Optional[Balancer]:
+    if isinstance(endpoint, str):
+        return None
+    if isinstance(endpoint, Balancer):
+        return endpoint
+    return Balancer(endpoint)
 
 
 class AsyncClient:
-    def __init__(self, endpoint: str, mdws: middleware_type_ = None,
-                 mdws_nc: middleware_type_ = None):
+    def __init__(self, endpoint: endpoint_type_, mdws: middleware_type_ = None,
+                 mdws_nc: middleware_type_ = None, limit: int = 100, limit_per_host: int = 0,
+                 keepalive_timeout: float = None, ttl_dns_cache: int = 10, force_close: bool = False,
+                 sock_options: typing.List[typing.Tuple[int, int, int]] = None, cache: AsyncCache = None,
+                 codecs: Codecs = None, mdws_cow: cow_middleware_type_ = None, amdws: async_middleware_type_ = None,
+                 hooks: hook_type_ = None, retry: Retry = None, retry_budget: RetryBudget = None,
+                 breakers: Breakers = None, hedge: Hedge = None, coalesce: bool = False, timeout: Timeout = None,
+                 metrics: Metrics = None, rate_limits: RateLimits = None, transport: AsyncTransport = None,
+                 compression: Compression = None):
         """
         This client implements http-client
 
-        :param endpoint: base url for requests
+        :param endpoint: base url for requests, list of base urls of replicas or balancer of them (see
+                         clients.balancer.Balancer). Endpoint is picked for each attempt of request. List is balanced by
+                         peak EWMA of latencies with passive health checks
         :param mdws: (middlewares) list of middlewares of methods. After calling source object of method is changed.
                      This case more slowly, than mdws_nc. You must select mdws or mdws_nc
             For example, you need add functionality for each methods. You can add the only argument to the constructor
@@ -88,48 +377,261 @@ class AsyncClient:
             add middleware in the only place.
         :param mdws_nc: (middlewares not copy) list of middlewares of methods. After calling source object of method is
                         changed. This case more faster, than mdws. You must select mdws or mdws_nc
+        :param limit: total count of simultaneous connections. 0 is unlimited
+        :param limit_per_host: count of simultaneous connections to the same host. 0 is unlimited
+        :param keepalive_timeout: timeout of idle connection into pool (seconds). None is default of aiohttp
+        :param ttl_dns_cache: ttl of resolved addresses (seconds). None is cache forever
+        :param force_close: close connection after each request (keepalive is disabled)
+        :param sock_options: list of options for each new socket: (level, option, value), for example:
+                             (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1). It is required aiohttp>=3.12
+        :param cache: cache of responses (see clients.cache.AsyncCache). GET methods are cached by default, you can
+                      change it by Method.cache and Method.cache_ttl. Cache is shared by all credentials, so requests
+                      with auth or Authorization header are not cached, unless Method.cache is True
+        :param codecs: codecs of bodies of requests and responses (see clients.codec.Codecs). Method.codecs overrides
+                       it
+        :param mdws_cow: (middlewares copy on write) list of middlewares of methods. Middleware takes Overlay of method
+                         (see clients.middleware.Overlay) and changes it. Method is copied at most once per request,
+                         source object of method is not changed. It cannot be set with mdws or mdws_nc
+        :param amdws: (async middlewares) list of coroutine functions, which take Overlay of method like mdws_cow. They
+                      are run concurrently after other middlewares, so they must not depend on each other
+        :param hooks: list of functions or coroutine functions, which take ResponseInfo (method, status, headers and
+                      elapsed time of request till headers of response) before response_process. Coroutine functions
+                      are run concurrently. Error of hook raises ResponseProcessException
+        :param retry: policy of retries (see clients.retry.Retry). Method.retry overrides it. None is no retries
+        :param retry_budget: budget of retries, which is shared by all requests of client (see
+                             clients.retry.RetryBudget). None is at most 10% of retries
+        :param breakers: circuit breakers by endpoint and class of method (see clients.breaker.Breakers). Open breaker
+                         rejects requests by CircuitOpenException. None is without breakers
+        :param hedge: hedged requests (see clients.hedge.Hedge): if response is not received during delay, the second
+                      request is sent. Streams, uploads of files and cached requests are not hedged. None is without
+                      hedging
+        :param coalesce: identical concurrent GET and HEAD requests (type, url, params, headers, auth and proxy) share
+                         one request and its result (see clients.flight.SingleFlight). Streams are not coalesced
+        :param timeout: default timeouts of requests (see clients.deadline.Timeout). Method.timeout overrides it. Total
+                        timeout is shrunk by deadline of context (see clients.deadline.deadline). Timeouts, which are
+                        not set, are defaults of aiohttp
+        :param metrics: metrics of requests (see clients.metrics.Metrics): latencies, sizes, status codes, errors and
+                        pool of connections. They are recorded by TraceConfig of aiohttp. None is without metrics
+        :param rate_limits: token buckets by client, endpoint or class of method (see clients.ratelimit.RateLimits).
+                            Request waits token before each attempt without blocking of loop. If wait is longer than
+                            deadline of context, RequestTimeoutException is raised at once. None is without limits
+        :param transport: transport of requests (see clients.transport), for example, Http2AsyncTransport. Options of
+                          connections pool of client are not used by it. None is aiohttp.ClientSession
+        :param compression: compression of bodies of requests and Accept-Encoding of responses (see
+                            clients.compression.Compression). Uploads of files are not compressed. Responses are
+                            decompressed by transport while they are read. None is defaults of transport
         """
-        self.endpoint = endpoint
+        assert not (force_close and keepalive_timeout is not None), 'keepalive_timeout cannot be set with force_close'
+        self.balancer = to_balancer(endpoint)
+        self.endpoint = endpoint if self.balancer is None else self.balancer.name
         a = mdws is not None and mdws_nc is None
         b = mdws is None and mdws_nc is not None
         c = mdws is None and mdws_nc is None
         assert a or b or c, 'you must set mdws or mdws_nc, but not both'
+        assert mdws_cow is None or c, 'mdws_cow cannot be set with mdws or mdws_nc'
         self.mdws = []
         if mdws is not None:
             self.mdws = mdws
         self.mdws_nc = []
         if mdws_nc is not None:
             self.mdws_nc = mdws_nc
+        self.mdws_cow = []
+        if mdws_cow is not None:
+            self.mdws_cow = mdws_cow
+        self.pipeline = Pipeline(self.mdws, self.mdws_nc, self.mdws_cow, amdws, hooks)
+        self.retry = retry
+        self.retrier = Retrier(retry_budget)
+        self.breakers = breakers
+        self.timeout = timeout
+        self.metrics = metrics
+        self.rate_limits = rate_limits
+        if metrics is not None:
+            metrics.gauge(self.__pool_gauges)
+        if metrics is not None and rate_limits is not None:
+            metrics.gauge(rate_limits.gauges)
+        if metrics is not None and self.balancer is not None:
+            metrics.gauge(self.balancer.gauges)
+        self.hedge = hedge
+        self.flights = SingleFlight() if coalesce else None
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.ttl_dns_cache = ttl_dns_cache
+        self.force_close = force_close
+        self.sock_options = sock_options
+        self.cache = cache
+        self.codecs = codecs if codecs is not None else codec.default
         self.__session = None
+        self.__connector = None
+        self.__waiting = 0
+        self.__created = 0
+        self.__reused = 0
+        self.__prober = None
+        self.transport = transport
+        self.compression = compression
+        if compression is not None:
+            encodings = aiohttp_encodings() if transport is None else transport.encodings
+            self.__accept_encoding = compression.accept_encoding(encodings)
+
+    def __new_session(self):
+        if self.transport is not None:
+            return self.transport
+        connector_kwargs = dict(limit=self.limit, limit_per_host=self.limit_per_host, ttl_dns_cache=self.ttl_dns_cache,
+                                force_close=self.force_close)
+        if self.keepalive_timeout is not None:
+            connector_kwargs['keepalive_timeout'] = self.keepalive_timeout
+        if self.sock_options is not None:
+            connector_kwargs['socket_factory'] = self.__socket_factory
+        self.__connector = aiohttp.TCPConnector(**connector_kwargs)
+        trace = aiohttp.TraceConfig()
+        trace.on_connection_queued_start.append(self.__on_queued_start)
+        trace.on_connection_queued_end.append(self.__on_queued_end)
+        trace.on_connection_create_end.append(self.__on_create_end)
+        trace.on_connection_reuseconn.append(self.__on_reuseconn)
+        if self.metrics is not None:
+            trace.on_request_start.append(self.__on_request_start)
+            trace.on_request_chunk_sent.append(self.__on_request_chunk_sent)
+            trace.on_request_end.append(self.__on_request_end)
+        return aiohttp.ClientSession(connector=self.__connector, trace_configs=[trace])
+
+    def __socket_factory(self, addr_info):
+        family, type_, proto, _, _ = addr_info
+        sock = socket.socket(family=family, type=type_, proto=proto)
+        for level, option, value in self.sock_options:
+            sock.setsockopt(level, option, value)
+        return sock
+
+    async def __on_queued_start(self, session, ctx, params):
+        self.__waiting += 1
+
+    async def __on_queued_end(self, session, ctx, params):
+        self.__waiting -= 1
 
-    def __get_url(self, method):
-        return f'{self.endpoint}{method.url}'
-
-    def __middlewares(self, method_):
-        method = method_
-        for m in self.mdws:
-            method_ = m(method)
-            assert id(method_) != id(method), 'middleware must call copy for argument of method before ' \
-                                              'return: return copy.copy(m). See test test_request_middleware and ' \
-                                              'test_request_middleware_not_copy for example. If you want to use ' \
-                                              'middleware without copy, you need, mdws_nc argument in constructor'
-            method = method_
-        for m in self.mdws_nc:
-            method_ = m(method)
-            assert id(method_) == id(method), 'middleware must NOT call copy for argument of method. See test ' \
-                                              'test_request_middleware and test_request_middleware_not_copy for ' \
-                                              'example. If you want to use middleware with copy, you need, ' \
-                                              'mdws argument in constructor'
-            method = method_
-        return method
+    async def __on_create_end(self, session, ctx, params):
+        self.__created += 1
+
+    async def __on_reuseconn(self, session, ctx, params):
+        self.__reused += 1
+
+    @staticmethod
+    async def __on_request_start(session, ctx, params):
+        ctx.start = time.perf_counter()
+        ctx.sent = 0
 
     @staticmethod
-    def __add_files(files, body=None):
+    async def __on_request_chunk_sent(session, ctx, params):
+        ctx.sent += len(params.chunk)
+
+    async def __on_request_end(self, session, ctx, params):
+        if ctx.trace_request_ctx is None:
+            # probe of balancer
+            return
+        endpoint, name = ctx.trace_request_ctx
+        resp = params.response
+        self.metrics.response(endpoint, name, resp.status, time.perf_counter() - ctx.start, ctx.sent,
+                              resp.content_length)
+
+    def __pool_gauges(self):
+        stats = self.pool_stats
+        for state in ['in_use', 'idle', 'waiting']:
+            yield ('pool_connections', 'Connections of pool by state', {'endpoint': self.endpoint, 'state': state},
+                   getattr(stats, state))
+
+    @property
+    def retry_stats(self) -> RetryStats:
+        """
+        Counters of retries: attempts (all sent requests), retries, give_ups (failed requests, which are not retried
+        because of attempts, budget or Retry-After) and budget_exhausted
+        """
+        return self.retrier.stats
+
+    @property
+    def rate_limit_stats(self) -> typing.Optional[typing.Dict[typing.Any, RateLimitStats]]:
+        """
+        Stats of token buckets of rate_limits by key (None, endpoint or class of method): acquired, throttled, waited
+        and current wait_time. None, if rate_limits is not set
+        """
+        return self.rate_limits.stats if self.rate_limits is not None else None
+
+    @property
+    def balancer_stats(self) -> typing.Optional[typing.Dict[str, EndpointStats]]:
+        """
+        Stats of endpoints of balancer by url: outstanding, requests, failures, consecutive_failures, latency, ejected
+        and ejections. None, if client has one endpoint
+        """
+        return self.balancer.stats if self.balancer is not None else None
+
+    def __buckets(self, method, endpoint) -> typing.List[TokenBucket]:
+        buckets = []
+        if method.rate_limit is not None:
+            buckets.append(method.rate_limit)
+        if self.rate_limits is not None:
+            buckets.append(self.rate_limits.get(endpoint, type(method)))
+        return buckets
+
+    @property
+    def coalesce_stats(self) -> typing.Optional[FlightStats]:
+        """
+        Counters of coalescing: calls and coalesced. None, if coalesce is not set
+        """
+        return self.flights.stats if self.flights is not None else None
+
+    @property
+    def hedge_stats(self) -> typing.Optional[HedgeStats]:
+        """
+        Counters of hedged requests: requests, hedged, won and capped. None, if hedge is not set
+        """
+        return self.hedge.stats if self.hedge is not None else None
+
+    @property
+    def pool_stats(self) -> PoolStats:
+        """
+        Live stats of connections pool: in_use (acquired connections), idle (opened connections into pool), waiting
+        (requests, which wait free connection), created and reused (count of connections since start)
+        """
+        in_use, idle = 0, 0
+        if self.__connector is not None and not self.__connector.closed:
+            in_use = len(self.__connector._acquired)
+            idle = sum(len(conns) for conns in self.__connector._conns.values())
+        return PoolStats(limit=self.limit, limit_per_host=self.limit_per_host, in_use=in_use, idle=idle,
+                         waiting=self.__waiting, created=self.__created, reused=self.__reused)
+
+    async def __probe(self):
+        timeout = aiohttp.ClientTimeout(total=self.balancer.probe_timeout)
+
+        async def check(endpoint):
+            try:
+                resp = await self.__session.request(method='get', url=f'{endpoint.url}{self.balancer.probe}',
+                                                    timeout=timeout)
+                healthy = resp.status < 400
+                resp.release()
+            except Exception:
+                # any error of probe is failed probe, loop of probes must not be stopped by it
+                healthy = False
+            self.balancer.probed(endpoint, healthy)
+
+        while True:
+            await asyncio.gather(*(check(endpoint) for endpoint in self.balancer.endpoints))
+            await asyncio.sleep(self.balancer.probe_interval)
+
+    @staticmethod
+    def __content(content, opened):
+        if content is None or isinstance(content, (str, bytes)):
+            return content
+        if isinstance(content, os.PathLike):
+            f = open(content, 'rb')
+            opened.append(f)
+            return f
+        if upload.is_iterator(content):
+            return upload.aiter_content(content)
+        return content
+
+    def __add_files(self, files, opened, body=None):
         form = aiohttp.FormData()
         for f in files:
             form.add_field(
                 name=f.field,
-                value=f.content,
+                value=self.__content(f.content, opened),
                 filename=f.filename,
                 content_type=f.content_type,
             )
@@ -141,58 +643,311 @@ class AsyncClient:
     async def resolve(self):
         if self.__session is None:
             return
+        if self.cache is not None:
+            self.cache.cancel()
+        if self.__prober is not None:
+            self.__prober.cancel()
+            self.__prober = None
         await self.__session.close()
+        self.__session = None
+        self.__connector = None
 
-    async def request(self, method: Method, proxy: str = None):
+    async def request(self, method: Method, proxy: str = None, stream: bool = None, process: bool = True):
         """
         requests is used to take a request by url asynchronously
 
         :param method: object of method
         :param proxy: is url of proxy (example: http://proxy.com)
+        :param stream: if True, body of response is not read and response_process takes AsyncStreamResponse. None is
+                       Method.stream
+        :param process: if False, response_process of method is not called, response and status code are returned as
+                        is
         :return:
         """
+        if self.metrics is None:
+            return await self.__request(method, proxy, stream, process)
+        try:
+            return await self.__request(method, proxy, stream, process)
+        except Exception as e:
+            self.metrics.error(self.endpoint, type(method).__name__, type(e).__name__)
+            raise
+
+    async def __request(self, method: Method, proxy: str = None, stream: bool = None, process: bool = True):
         if self.__session is None:
-            self.__session = aiohttp.ClientSession()
-        # TODO: two steps requests: 1. take headers; 2. take body (text or json)
+            self.__session = self.__new_session()
+        if self.__prober is None and self.balancer is not None and self.balancer.probe is not None:
+            self.__prober = asyncio.ensure_future(self.__probe())
         # TODO: add task to running event loop
-        method = self.__middlewares(method)
+        method = await self.pipeline.arun(method)
+        stream = method.stream if stream is None else stream
+        response_process = method.response_process if process else BaseMethod.response_process
+        plan = method.plan
         params = method.params
         headers = method.headers
-        m_type = method.m_type.lower()
+        m_type = plan.verb
         auth_ = method.auth
         proxy = proxy if proxy is not None else None
-        url = self.__get_url(method)
+        path = method.url
+        url = f'{self.endpoint}{path}'
         files = method.files_async if method.files_async is not None else None
-        body = method.body_
+        codecs = method.codecs or self.codecs
+        opened = []
+        data = method.encode(codecs, plan)
+        if self.compression is not None and files is None:
+            data, headers = self.compression.apply(data, headers, self.__accept_encoding, method.compress is not False)
+        body = self.__content(data, opened)
         # assert not (body is not None and files is not None), 'files and body cannot transfer at the same time'
-        assert files is not None and m_type == 'file' or files is None, 'files must transfer via POST request'
+        assert files is not None and plan.multipart or files is None, 'files must transfer via POST request'
         if files is not None:
-            m_type = 'post'
-            body = self.__add_files(files, method.body_)
+            body = self.__add_files(files, opened, data)
         if m_type == 'get':
             assert body is None, 'for GET method body must be empty'
+        if stream:
+            resp = await self.__send(method, m_type, path, params, body, headers, proxy, auth_, opened)
+            try:
+                return response_process(AsyncStreamResponse(resp), resp.status)
+            except Exception as e:
+                resp.release()
+                raise ResponseProcessException(e)
+        if self.__cacheable(method, m_type, files, auth_, headers, body, opened):
+            async def fetch(etag):
+                headers_ = headers if etag is None else {**(headers or {}), 'If-None-Match': etag}
+                resp_ = await self.__send(method, m_type, path, params, body, headers_, proxy, auth_)
+                r = await self.__read(resp_, codecs)
+                return r, resp_.status, resp_.headers.get('ETag'), len(await resp_.read())
+
+            r_, status = await self.cache.request(self.cache.key(m_type, url, params, body), fetch, method.cache_ttl)
+        elif self.hedge is None and self.flights is None:
+            resp = await self.__send(method, m_type, path, params, body, headers, proxy, auth_, opened)
+            r_, status = await self.__read(resp, codecs), resp.status
+        else:
+            async def exchange():
+                resp_ = await self.__send(method, m_type, path, params, body, headers, proxy, auth_, opened)
+                return await self.__read(resp_, codecs), resp_.status
+
+            call = exchange
+            if self.__hedgeable(method, m_type, body, opened):
+                call = functools.partial(self.hedge.request, exchange)
+            if self.flights is not None and m_type in ('get', 'head') and body is None:
+                key = self.flights.key(m_type, url, params, headers, auth_, proxy)
+                r_, status = await self.flights.request(key, call)
+            else:
+                r_, status = await call()
         try:
-            resp = await self.__session.request(method=m_type, url=url, params=params, data=body, headers=headers,
-                                                proxy=proxy, auth=auth_)
+            return response_process(r_, status)
         except Exception as e:
-            raise RequestException(e)
+            raise ResponseProcessException(e)
+
+    async def request_many(self, methods: typing.Iterable[Method], concurrency: int = 10,
+                           proxy: str = None) -> typing.List:
+        """
+        request_many is used to take many requests concurrently. Errors of requests don't cancel other requests
+
+        :param methods: objects of methods
+        :param concurrency: max count of simultaneous requests
+        :param proxy: is url of proxy (example: http://proxy.com)
+        :return: list of results of requests in order of methods. Result is response of request or exception, which
+                 is raised by request
+        """
+        methods = list(methods)
+        results = [None] * len(methods)
+        async for i, result in self.request_stream(methods, concurrency, proxy):
+            results[i] = result
+        return results
+
+    async def request_stream(self, methods: typing.Union[typing.Iterable[Method], typing.AsyncIterable[Method]],
+                             concurrency: int = 10,
+                             proxy: str = None) -> typing.AsyncIterator[typing.Tuple[int, typing.Any]]:
+        """
+        request_stream is used to take requests concurrently and yield results as they complete. Methods are taken
+        from iterable lazily, so that no more than concurrency requests exist at the same time. It can be used with
+        infinite iterables
+
+        :param methods: iterable or async iterable of objects of methods
+        :param concurrency: max count of simultaneous requests
+        :param proxy: is url of proxy (example: http://proxy.com)
+        :return: async iterator of pairs: index of method and result (response of request or exception)
+        """
+        assert concurrency > 0, 'concurrency must be positive'
+        if hasattr(methods, '__aiter__'):
+            iterator = methods.__aiter__()
+            next_ = iterator.__anext__
+        else:
+            iterator = iter(methods)
+
+            async def next_():
+                try:
+                    return next(iterator)
+                except StopIteration:
+                    raise StopAsyncIteration
+        pending = set()
+        i = 0
+        exhausted = False
         try:
-            r_ = await resp.json()
-        except:
-            r_ = await resp.read()
+            while True:
+                while not exhausted and len(pending) < concurrency:
+                    try:
+                        method = await next_()
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+                    pending.add(asyncio.ensure_future(self.__request_item(i, method, proxy)))
+                    i += 1
+                if not pending:
+                    return
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def __request_item(self, i, method, proxy):
         try:
-            return method.response_process(r_, resp.status)
+            return i, await self.request(method, proxy)
         except Exception as e:
-            raise ResponseProcessException(e)
+            return i, e
+
+    def __cacheable(self, method, m_type, files, auth_, headers, body, opened):
+        if self.cache is None or files is not None:
+            return False
+        if opened or body is not None and not isinstance(body, (str, bytes)):
+            # streamed body cannot be keyed and sent again by refresh
+            return False
+        if method.cache is None:
+            # responses of one credential must not be served to others
+            private = auth_ is not None or any(key.lower() == 'authorization' for key in headers or ())
+            return m_type == 'get' and not private
+        return method.cache
+
+    def __hedgeable(self, method, m_type, body, opened):
+        if self.hedge is None or method.hedge is False or opened:
+            return False
+        if body is not None and not isinstance(body, (str, bytes)):
+            return False
+        return method.hedge or self.hedge.allows(m_type)
+
+    async def __send(self, method, m_type, path, params, body, headers, proxy, auth_, opened=()):
+        policy = method.retry or self.retry
+        replayable = policy is not None and policy.allows(m_type) and not opened and \
+            (body is None or isinstance(body, (str, bytes)))
+        retry = 0
+        try:
+            while True:
+                node = self.balancer.pick() if self.balancer is not None else None
+                endpoint = self.endpoint if node is None else node.url
+                breaker = self.breakers.get(endpoint, type(method)) if self.breakers is not None else None
+                try:
+                    for bucket in self.__buckets(method, endpoint):
+                        if await bucket.acquire_async(timeout=deadline.remaining()) is None:
+                            raise RequestTimeoutException('wait of rate limit exceeds deadline')
+                    options = self.__options(method, endpoint)
+                    if breaker is not None:
+                        breaker.allow()
+                except BaseException:
+                    if node is not None:
+                        self.balancer.release(node)
+                    raise
+                self.retrier.attempt(retry)
+                start = time.perf_counter()
+                try:
+                    resp = await self.__session.request(method=m_type, url=f'{endpoint}{path}', params=params,
+                                                        data=body, headers=headers, proxy=proxy, auth=auth_,
+                                                        **options)
+                except Exception as e:
+                    if breaker is not None:
+                        breaker.record(True, time.perf_counter() - start)
+                    if node is not None:
+                        self.balancer.record(node, True, time.perf_counter() - start)
+                    delay = self.retrier.delay(policy, retry) if replayable and isinstance(e, policy.errors) else None
+                    if delay is None:
+                        if isinstance(e, asyncio.TimeoutError):
+                            raise RequestTimeoutException(e)
+                        raise RequestException(e)
+                except BaseException:
+                    if breaker is not None:
+                        breaker.release()
+                    if node is not None:
+                        self.balancer.release(node)
+                    raise
+                else:
+                    if breaker is not None:
+                        breaker.record(self.breakers.failure_statuses(resp.status), time.perf_counter() - start)
+                    if node is not None:
+                        self.balancer.record(node, self.balancer.failure_statuses(resp.status),
+                                             time.perf_counter() - start)
+                    if self.metrics is not None and self.transport is not None:
+                        # metrics of aiohttp are recorded by TraceConfig
+                        self.metrics.response(endpoint, type(method).__name__, resp.status,
+                                              time.perf_counter() - start, upload.size_of(body), resp.content_length)
+                    if not replayable or resp.status not in policy.statuses:
+                        break
+                    delay = self.retrier.delay(policy, retry, resp.status, resp.headers)
+                    if delay is None:
+                        break
+                    resp.release()
+                await asyncio.sleep(delay)
+                retry += 1
+        finally:
+            for f in opened:
+                f.close()
+        if self.pipeline.hooks or self.pipeline.ahooks:
+            try:
+                await self.pipeline.aresponse(ResponseInfo(method=method, status=resp.status, headers=resp.headers,
+                                                           elapsed=time.perf_counter() - start))
+            except Exception as e:
+                resp.release()
+                raise ResponseProcessException(e)
+        return resp
+
+    def __options(self, method, endpoint):
+        options = {}
+        timeout = deadline.merge(method.timeout, self.timeout)
+        if timeout.total is not None and timeout.total <= 0:
+            raise RequestTimeoutException('deadline is exceeded')
+        if timeout != (None, None, None):
+            # timeouts, which are not set, are defaults of session (total is 300 seconds by default of aiohttp)
+            default = getattr(self.__session, 'timeout', None)
+            if not isinstance(default, aiohttp.ClientTimeout):
+                default = aiohttp.client.DEFAULT_TIMEOUT
+            fields = {'total': timeout.total, 'sock_connect': timeout.connect, 'sock_read': timeout.read}
+            options['timeout'] = attr.evolve(default, **{k: v for k, v in fields.items() if v is not None})
+        if self.metrics is not None:
+            options['trace_request_ctx'] = (endpoint, type(method).__name__)
+        return options
+
+    @staticmethod
+    async def __read(resp, codecs):
+        try:
+            content = await resp.read()
+        except asyncio.TimeoutError as e:
+            raise RequestTimeoutException(e)
+        return codecs.decode(resp.headers.get('Content-Type'), content) if len(content) > 0 else None
+
+
+def is_requests_timeout(e: BaseException) -> bool:
+    """
+    Timeout of requests. Timeout of read of body is raised by requests as ConnectionError of urllib3 ReadTimeoutError
+    """
+    if isinstance(e, RequestsTimeout):
+        return True
+    return isinstance(e, RequestsConnectionError) and any(isinstance(arg, ReadTimeoutError) for arg in e.args)
 
 
 class Client:
-    def __init__(self, endpoint: str, proxies: list = None, mdws: middleware_type_ = None,
-                 mdws_nc: middleware_type_ = None):
+    def __init__(self, endpoint: endpoint_type_, proxies: list = None, mdws: middleware_type_ = None,
+                 mdws_nc: middleware_type_ = None, pool_connections: int = 10, pool_maxsize: int = 10,
+                 pool_block: bool = False, thread_safe: bool = False, cache: BaseCache = None,
+                 codecs: Codecs = None, mdws_cow: cow_middleware_type_ = None, hooks: hook_type_ = None,
+                 retry: Retry = None, retry_budget: RetryBudget = None, breakers: Breakers = None,
+                 timeout: Timeout = None, metrics: Metrics = None, rate_limits: RateLimits = None,
+                 transport: Transport = None, compression: Compression = None):
         """
         This client implements http-client
 
-        :param endpoint: base url for requests
+        :param endpoint: base url for requests, list of base urls of replicas or balancer of them (see
+                         clients.balancer.Balancer). Endpoint is picked for each attempt of request. List is balanced by
+                         peak EWMA of latencies with passive health checks
         :param proxies: dict with proxies ({'schema': 'endpoint'})
         :param mdws: (middlewares) list of middlewares of methods. After calling source object of method is changed.
                      This case more slowly, than mdws_nc. You must select mdws or mdws_nc
@@ -201,96 +956,408 @@ class Client:
             add middleware in the only place.
         :param mdws_nc: (middlewares not copy) list of middlewares of methods. After calling source object of method is
                         changed. This case more faster, than mdws. You must select mdws or mdws_nc
+        :param pool_connections: count of hosts, which connection pools are cached by client
+        :param pool_maxsize: max count of connections, which are kept alive for each host
+        :param pool_block: if True, request waits free connection, when pool of host is exhausted. Otherwise, new
+                           connection is opened and it is not returned to the pool
+        :param thread_safe: if True, each thread takes own session (cookies and other state of requests.Session).
+                            Connection pools are shared between all threads. Set it, if you share client between
+                            worker threads
+        :param cache: storage of responses (see clients.cache.LRUCache and clients.cache.FileCache). If it is set,
+                      responses of GET requests are cached by HTTP semantics: Cache-Control, ETag, Last-Modified, Vary
+        :param codecs: codecs of bodies of requests and responses (see clients.codec.Codecs). Method.codecs overrides
+                       it
+        :param mdws_cow: (middlewares copy on write) list of middlewares of methods. Middleware takes Overlay of method
+                         (see clients.middleware.Overlay) and changes it. Method is copied at most once per request,
+                         source object of method is not changed. It cannot be set with mdws or mdws_nc
+        :param hooks: list of functions, which take ResponseInfo (method, status, headers and elapsed time of request)
+                      before response_process. Error of hook raises ResponseProcessException
+        :param retry: policy of retries (see clients.retry.Retry). Method.retry overrides it. None is no retries
+        :param retry_budget: budget of retries, which is shared by all requests of client (see
+                             clients.retry.RetryBudget). None is at most 10% of retries
+        :param breakers: circuit breakers by endpoint and class of method (see clients.breaker.Breakers). Open breaker
+                         rejects requests by CircuitOpenException. None is without breakers
+        :param timeout: default timeouts of requests (see clients.deadline.Timeout). Method.timeout overrides it.
+                        requests has not total timeout, so total timeout and deadline of context limit connect and read
+                        timeouts. None is without timeouts
+        :param metrics: metrics of requests (see clients.metrics.Metrics): latencies, sizes, status codes and errors.
+                        They are recorded by hooks of requests. None is without metrics
+        :param rate_limits: token buckets by client, endpoint or class of method (see clients.ratelimit.RateLimits).
+                            Request waits token (thread sleeps) before each attempt. If wait is longer than deadline of
+                            context, RequestTimeoutException is raised at once. None is without limits
+        :param transport: transport of requests (see clients.transport), for example, Http2Transport. It is shared by
+                          all threads, options of connections pool and cache of client are not used by it. None is
+                          requests.Session
+        :param compression: compression of bodies of requests and Accept-Encoding of responses (see
+                            clients.compression.Compression). Multipart bodies are not compressed. Responses are
+                            decompressed by transport while they are read. None is defaults of transport
         """
-        self.endpoint = endpoint
+        self.balancer = to_balancer(endpoint)
+        self.endpoint = endpoint if self.balancer is None else self.balancer.name
         self.proxies = proxies
         a = mdws is not None and mdws_nc is None
         b = mdws is None and mdws_nc is not None
         c = mdws is None and mdws_nc is None
         assert a or b or c, 'you must set mdws or mdws_nc, but not both'
+        assert mdws_cow is None or c, 'mdws_cow cannot be set with mdws or mdws_nc'
         self.mdws = []
         if mdws is not None:
             self.mdws = mdws
         self.mdws_nc = []
         if mdws_nc is not None:
             self.mdws_nc = mdws_nc
+        self.mdws_cow = []
+        if mdws_cow is not None:
+            self.mdws_cow = mdws_cow
+        self.pipeline = Pipeline(self.mdws, self.mdws_nc, self.mdws_cow, hooks=hooks)
+        assert not self.pipeline.ahooks, 'coroutine hooks are supported by AsyncClient only'
+        assert cache is None or transport is None, 'cache cannot be set with transport'
+        self.transport = transport
+        self.retry = retry
+        self.retrier = Retrier(retry_budget)
+        self.breakers = breakers
+        self.timeout = timeout
+        self.metrics = metrics
+        self.rate_limits = rate_limits
+        if metrics is not None and rate_limits is not None:
+            metrics.gauge(rate_limits.gauges)
+        if metrics is not None and self.balancer is not None:
+            metrics.gauge(self.balancer.gauges)
+        self.thread_safe = thread_safe
+        self.codecs = codecs if codecs is not None else codec.default
+        if cache is None:
+            self.__adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                         pool_block=pool_block)
+        else:
+            self.__adapter = CacheAdapter(cache=cache, pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                          pool_block=pool_block)
+        self.__local = threading.local()
+        self.__lock = threading.Lock()
+        self.__sessions = []
+        # sessions of threads are dropped, when threads are finished
+        self.__thread_sessions = weakref.WeakKeyDictionary()
+        self.__session = None if thread_safe else self.__new_session()
+        self.__prober = None
+        self.__stopped = None
+        self.__executor = None
+        self.__workers = None
+        self.compression = compression
+        if compression is not None:
+            encodings = requests_encodings() if transport is None else transport.encodings
+            self.__accept_encoding = compression.accept_encoding(encodings)
 
-    def __get_url(self, method):
-        return f'{self.endpoint}{method.url}'
-
-    def __middlewares(self, method_):
-        method = method_
-        for m in self.mdws:
-            method_ = m(method)
-            assert id(method_) != id(method), 'middleware must call copy for argument of method before ' \
-                                              'return: return copy.copy(m). See test test_request_middleware and ' \
-                                              'test_request_middleware_not_copy for example. If you want to use ' \
-                                              'middleware without copy, you need, mdws_nc argument in constructor'
-            method = method_
-        for m in self.mdws_nc:
-            method_ = m(method)
-            assert id(method_) == id(method), 'middleware must NOT call copy for argument of method. See test ' \
-                                              'test_request_middleware and test_request_middleware_not_copy for ' \
-                                              'example. If you want to use middleware with copy, you need, ' \
-                                              'mdws argument in constructor'
-            method = method_
-        return method
-
-    def request(self, method):
-        method = self.__middlewares(method)
-        m_type = method.m_type
-        auth_ = method.auth
-        url = self.__get_url(method)
-        if m_type == 'GET':
-            assert method.body_ is None, 'For GET method body must be empty'
-            if self.proxies is None:
-                r = requests.get(url=url, params=method.params, headers=method.headers, auth=auth_)
-            else:
-                r = requests.get(url=url, params=method.params, headers=method.headers, proxies=self.proxies,
-                                 auth=auth_)
-        elif m_type == 'FILE':
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __new_session(self, thread: threading.Thread = None):
+        """
+        New session of client. Session of thread is dropped, when the next session is created after end of thread. It
+        is not closed: closing of session closes adapter, which is shared by all sessions
+        """
+        if self.transport is not None:
+            return self.transport
+        session = requests.Session()
+        session.mount('http://', self.__adapter)
+        session.mount('https://', self.__adapter)
+        with self.__lock:
+            if thread is None:
+                self.__sessions.append(session)
+                return session
+            for t in [t for t in self.__thread_sessions.keys() if not t.is_alive()]:
+                del self.__thread_sessions[t]
+            self.__thread_sessions[thread] = session
+        return session
+
+    @property
+    def session(self) -> typing.Union[requests.Session, Transport]:
+        """
+        Session of current thread. All sessions of client use the same pool of connections. Transport of client is
+        shared by all threads
+        """
+        if self.transport is not None:
+            return self.transport
+        if not self.thread_safe:
+            return self.__session
+        session = getattr(self.__local, 'session', None)
+        if session is None:
+            session = self.__local.session = self.__new_session(threading.current_thread())
+        return session
+
+    @property
+    def retry_stats(self) -> RetryStats:
+        """
+        Counters of retries: attempts (all sent requests), retries, give_ups (failed requests, which are not retried
+        because of attempts, budget or Retry-After) and budget_exhausted
+        """
+        return self.retrier.stats
+
+    @property
+    def rate_limit_stats(self) -> typing.Optional[typing.Dict[typing.Any, RateLimitStats]]:
+        """
+        Stats of token buckets of rate_limits by key (None, endpoint or class of method): acquired, throttled, waited
+        and current wait_time. None, if rate_limits is not set
+        """
+        return self.rate_limits.stats if self.rate_limits is not None else None
+
+    @property
+    def balancer_stats(self) -> typing.Optional[typing.Dict[str, EndpointStats]]:
+        """
+        Stats of endpoints of balancer by url: outstanding, requests, failures, consecutive_failures, latency, ejected
+        and ejections. None, if client has one endpoint
+        """
+        return self.balancer.stats if self.balancer is not None else None
+
+    def __buckets(self, method, endpoint) -> typing.List[TokenBucket]:
+        buckets = []
+        if method.rate_limit is not None:
+            buckets.append(method.rate_limit)
+        if self.rate_limits is not None:
+            buckets.append(self.rate_limits.get(endpoint, type(method)))
+        return buckets
+
+    @property
+    def cache_stats(self) -> typing.Optional[CacheStats]:
+        """
+        Counters of cache: hits, misses and revalidations. None, if cache is not set
+        """
+        if not isinstance(self.__adapter, CacheAdapter):
+            return None
+        return self.__adapter.stats
+
+    def close(self):
+        """
+        Close all connections of client. Client can be used after closing, connections will be opened again
+        """
+        with self.__lock:
+            sessions = list(self.__sessions) + list(self.__thread_sessions.values())
+            if self.__prober is not None:
+                self.__stopped.set()
+                self.__prober = None
+            executor, self.__executor = self.__executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+        for session in sessions:
+            session.close()
+        self.__adapter.close()
+        if self.transport is not None:
+            self.transport.close()
+
+    def __start_probes(self):
+        with self.__lock:
+            if self.__prober is not None:
+                return
+            self.__stopped = threading.Event()
+            self.__prober = threading.Thread(target=self.__probe, args=(self.__stopped,), daemon=True)
+            self.__prober.start()
+
+    def __probe(self, stopped):
+        session = self.__new_session(threading.current_thread())
+        while not stopped.is_set():
+            for endpoint in self.balancer.endpoints:
+                try:
+                    r = session.get(url=f'{endpoint.url}{self.balancer.probe}', proxies=self.proxies,
+                                    timeout=self.balancer.probe_timeout)
+                    healthy = r.status_code < 400
+                    r.close()
+                except Exception:
+                    # any error of probe is failed probe, thread of probes must not be stopped by it
+                    healthy = False
+                self.balancer.probed(endpoint, healthy)
+            stopped.wait(self.balancer.probe_interval)
+
+    def request(self, method, stream: bool = None, process: bool = True):
+        """
+        requests is used to take a request by url
+
+        :param method: object of method
+        :param stream: if True, body of response is not read and response_process takes StreamResponse. None is
+                       Method.stream
+        :param process: if False, response_process of method is not called, response and status code are returned as
+                        is
+        :return:
+        """
+        if self.metrics is None:
+            return self.__request(method, stream, process)
+        try:
+            return self.__request(method, stream, process)
+        except Exception as e:
+            self.metrics.error(self.endpoint, type(method).__name__, type(e).__name__)
+            raise
+
+    def __request(self, method, stream: bool = None, process: bool = True):
+        if self.__prober is None and self.balancer is not None and self.balancer.probe is not None:
+            self.__start_probes()
+        method = self.pipeline(method)
+        stream = method.stream if stream is None else stream
+        response_process = method.response_process if process else BaseMethod.response_process
+        plan = method.plan
+        if plan.m_type not in VERBS:
+            raise NotImplementedError("\nnot implemented method request: %s" % method.m_type)
+        codecs = method.codecs or self.codecs
+        body = method.encode(codecs, plan)
+        headers = method.headers
+        if self.compression is not None and not plan.multipart:
+            body, headers = self.compression.apply(body, headers, self.__accept_encoding, method.compress is not False)
+        if plan.multipart:
             # TODO: change this m_type to POST method
             assert method.files_sync is not None, 'For FILE attribute file must not be empty'
-            if self.proxies is not None:
-                r = requests.post(url=url, params=method.params, data=method.body_, headers=method.headers, auth=auth_,
-                                  files=method.files_sync)
-            else:
-                r = requests.post(url=url, params=method.params, data=method.body_, headers=method.headers,
-                                  proxies=self.proxies, auth=auth_, files=method.files_sync)
-        elif m_type == 'POST':
-            if self.proxies is None:
-                r = requests.post(url=url, params=method.params, data=method.body_, headers=method.headers, auth=auth_)
-            else:
-                r = requests.post(url=url, params=method.params, data=method.body_, headers=method.headers,
-                                  proxies=self.proxies, auth=auth_)
-        elif m_type == 'DELETE':
-            if self.proxies is None:
-                r = requests.delete(url=url, params=method.params, data=method.body_, headers=method.headers,
-                                    auth=auth_)
-            else:
-                r = requests.delete(url=url, params=method.params, data=method.body_, headers=method.headers,
-                                    proxies=self.proxies, auth=auth_)
-        elif m_type == 'PATCH':
-            if self.proxies is None:
-                r = requests.patch(url=url, params=method.params, data=method.body_, headers=method.headers, auth=auth_)
-            else:
-                r = requests.patch(url=url, params=method.params, data=method.body_, headers=method.headers,
-                                   proxies=self.proxies, auth=auth_)
-        elif m_type == 'PUT':
-            if self.proxies is None:
-                r = requests.put(url=url, params=method.params, data=method.body_, headers=method.headers, auth=auth_)
-            else:
-                r = requests.put(url=url, params=method.params, data=method.body_, headers=method.headers,
-                                 proxies=self.proxies, auth=auth_)
-        else:
-            raise NotImplementedError("\nnot implemented method request: %s" % method.m_type)
-        try:
-            r_ = r.json()
-        except:
-            r_ = r.content
+            body = upload.MultipartEncoder(method.files_sync, body)
+            headers = {**(headers or {}), 'Content-Type': body.content_type}
+        elif body is not None and not isinstance(body, (str, bytes)):
+            assert not upload.is_async_iterator(body), 'async iterators are supported by AsyncClient only'
+            if isinstance(body, os.PathLike) or upload.is_iterator(body):
+                body = upload.Body(body)
+        if plan.m_type == 'GET':
+            assert body is None, 'For GET method body must be empty'
+        start, r = self.__send(method, plan, body, headers, stream)
+        if self.pipeline.hooks:
+            try:
+                self.pipeline.response(ResponseInfo(method=method, status=r.status_code, headers=r.headers,
+                                                    elapsed=time.perf_counter() - start))
+            except Exception as e:
+                r.close()
+                raise ResponseProcessException(e)
+        if stream:
+            try:
+                return response_process(StreamResponse(r), r.status_code)
+            except Exception as e:
+                r.close()
+                raise ResponseProcessException(e)
+        content = r.content
+        r_ = codecs.decode(r.headers.get('Content-Type'), content) if len(content) > 0 else None
         try:
-            if r_ is None or len(r.content) == 0:
-                return method.response_process({}, r.status_code)
-            return method.response_process(r_, r.status_code)
+            if r_ is None:
+                return response_process({}, r.status_code)
+            return response_process(r_, r.status_code)
         except Exception as e:
             raise ResponseProcessException(e)
+
+    def __send(self, method, plan, body, headers, stream):
+        policy = method.retry or self.retry
+        replayable = policy is not None and policy.allows(plan.m_type) and \
+            (body is None or isinstance(body, (str, bytes, dict)))
+        send = getattr(self.session, plan.verb)
+        path = method.url
+        retry = 0
+        while True:
+            node = self.balancer.pick() if self.balancer is not None else None
+            endpoint = self.endpoint if node is None else node.url
+            breaker = self.breakers.get(endpoint, type(method)) if self.breakers is not None else None
+            hooks = {}
+            if self.metrics is not None:
+                hooks['hooks'] = {'response': functools.partial(self.__on_response, endpoint, type(method).__name__)}
+            try:
+                for bucket in self.__buckets(method, endpoint):
+                    if bucket.acquire(timeout=deadline.remaining()) is None:
+                        raise RequestTimeoutException('wait of rate limit exceeds deadline')
+                timeout = self.__timeout(method)
+                if breaker is not None:
+                    breaker.allow()
+            except BaseException:
+                if node is not None:
+                    self.balancer.release(node)
+                raise
+            self.retrier.attempt(retry)
+            start = time.perf_counter()
+            try:
+                r = send(url=f'{endpoint}{path}', params=method.params, data=body, headers=headers,
+                         proxies=self.proxies, auth=method.auth, stream=stream, timeout=timeout, **hooks)
+            except Exception as e:
+                if breaker is not None:
+                    breaker.record(True, time.perf_counter() - start)
+                if node is not None:
+                    self.balancer.record(node, True, time.perf_counter() - start)
+                delay = self.retrier.delay(policy, retry) if replayable and isinstance(e, policy.errors) else None
+                if delay is None:
+                    if is_requests_timeout(e):
+                        raise RequestTimeoutException(e) from e
+                    raise
+            except BaseException:
+                if breaker is not None:
+                    breaker.release()
+                if node is not None:
+                    self.balancer.release(node)
+                raise
+            else:
+                if breaker is not None:
+                    breaker.record(self.breakers.failure_statuses(r.status_code), time.perf_counter() - start)
+                if node is not None:
+                    self.balancer.record(node, self.balancer.failure_statuses(r.status_code),
+                                         time.perf_counter() - start)
+                if not replayable or r.status_code not in policy.statuses:
+                    return start, r
+                delay = self.retrier.delay(policy, retry, r.status_code, r.headers)
+                if delay is None:
+                    return start, r
+                r.close()
+            time.sleep(delay)
+            retry += 1
+
+    def __on_response(self, endpoint, name, r, *args, **kwargs):
+        sent = r.request.headers.get('Content-Length')
+        size = r.headers.get('Content-Length')
+        self.metrics.response(endpoint, name, r.status_code, r.elapsed.total_seconds(),
+                              int(sent) if sent is not None else 0, int(size) if size is not None else None)
+
+    def __timeout(self, method):
+        timeout = deadline.merge(method.timeout, self.timeout)
+        total = timeout.total
+        if total is None:
+            if timeout.connect is None and timeout.read is None:
+                return None
+            return timeout.connect, timeout.read
+        if total <= 0:
+            raise RequestTimeoutException('deadline is exceeded')
+        return (min(timeout.connect, total) if timeout.connect is not None else total,
+                min(timeout.read, total) if timeout.read is not None else total)
+
+    def __executor_of(self, workers: int) -> concurrent.futures.ThreadPoolExecutor:
+        with self.__lock:
+            executor = None
+            if self.__executor is not None and self.__workers != workers:
+                executor, self.__executor = self.__executor, None
+            if self.__executor is None:
+                self.__executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+                self.__workers = workers
+            result = self.__executor
+        if executor is not None:
+            executor.shutdown(wait=False)
+        return result
+
+    def request_many(self, methods: typing.Iterable[Method], workers: int = 10,
+                     timeout: float = None) -> typing.List:
+        """
+        request_many is used to take many requests in parallel threads. All threads use connections pool of client,
+        so pool_maxsize should be not less than workers. Use thread_safe client, if methods change cookies. Threads are
+        reused by the next calls and are stopped by close of client
+
+        :param methods: objects of methods
+        :param workers: count of threads. Pool of threads is created again, if count is changed
+        :param timeout: deadline (seconds) for all requests. Requests, which are not started before deadline, are
+                        cancelled, timeouts of started requests are shrunk to deadline
+        :return: list of results of requests in order of methods. Result is response of request or exception, which
+                 is raised by request (concurrent.futures.TimeoutError, if request is not finished before deadline)
+        """
+        executor = self.__executor_of(workers)
+        futures = []
+        try:
+            with deadline.deadline(timeout) if timeout is not None else contextlib.nullcontext():
+                # deadline of context is propagated to threads
+                for m in methods:
+                    futures.append(executor.submit(contextvars.copy_context().run, self.request, m))
+            done, _ = concurrent.futures.wait(futures, timeout=timeout)
+        finally:
+            for f in futures:
+                f.cancel()
+        results = []
+        for f in futures:
+            if f not in done:
+                results.append(concurrent.futures.TimeoutError('request is not finished before deadline'))
+            elif f.exception() is not None:
+                results.append(f.exception())
+            else:
+                results.append(f.result())
+        return results
@@ -0,0 +1,155 @@
+import bisect
+import threading
+import typing
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1., 2.5, 5., 7.5, 10.)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+LABELS = ('endpoint', 'method')
+
+
+def escape(value) -> str:
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def labels_text(names: typing.Sequence[str], values: typing.Sequence) -> str:
+    if not names:
+        return ''
+    return '{' + ','.join(f'{n}="{escape(v)}"' for n, v in zip(names, values)) + '}'
+
+
+def number(value) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help_: str, labels: typing.Sequence[str]):
+        self.name = name
+        self.help = help_
+        self.labels = tuple(labels)
+        self.values = {}
+
+    def inc(self, key: tuple, value: float = 1):
+        self.values[key] = self.values.get(key, 0) + value
+
+    def render(self) -> typing.List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        for key, value in sorted(self.values.items()):
+            lines.append(f'{self.name}{labels_text(self.labels, key)} {number(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_: str, labels: typing.Sequence[str], buckets: typing.Sequence[float]):
+        self.name = name
+        self.help = help_
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.values = {}
+
+    def observe(self, key: tuple, value: float):
+        item = self.values.get(key)
+        if item is None:
+            # counts of buckets (not cumulative) and +Inf, sum
+            item = self.values[key] = [0] * (len(self.buckets) + 1) + [0]
+        item[bisect.bisect_left(self.buckets, value)] += 1
+        item[-1] += value
+
+    def render(self) -> typing.List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        names = self.labels + ('le',)
+        for key, item in sorted(self.values.items()):
+            total = 0
+            for le, count in zip(self.buckets + (float('inf'),), item):
+                total += count
+                lines.append(f'{self.name}_bucket{labels_text(names, key + (number(le),))} {total}')
+            lines.append(f'{self.name}_sum{labels_text(self.labels, key)} {number(item[-1])}')
+            lines.append(f'{self.name}_count{labels_text(self.labels, key)} {total}')
+        return lines
+
+
+class Metrics:
+    def __init__(self, prefix: str = 'http_client', latency_buckets: typing.Sequence[float] = LATENCY_BUCKETS,
+                 size_buckets: typing.Sequence[float] = SIZE_BUCKETS):
+        """
+        In-process metrics of clients: latencies, sizes of payloads, status codes, errors and connections pool. Metrics
+        are labeled by endpoint of client and class of method. One object can be shared by many clients. Metrics are
+        rendered by Prometheus text format (Metrics.render)
+
+        :param prefix: prefix of names of metrics
+        :param latency_buckets: upper bounds (seconds) of buckets of histogram of latencies
+        :param size_buckets: upper bounds (bytes) of buckets of histograms of sizes of payloads
+        """
+        self.prefix = prefix
+        self.requests = Counter(f'{prefix}_requests_total', 'Responses by status code', LABELS + ('status',))
+        self.errors = Counter(f'{prefix}_errors_total', 'Failed requests by type of exception', LABELS + ('error',))
+        self.latency = Histogram(f'{prefix}_request_duration_seconds', 'Time till headers of response', LABELS,
+                                 latency_buckets)
+        self.request_size = Histogram(f'{prefix}_request_size_bytes', 'Size of body of request', LABELS, size_buckets)
+        self.response_size = Histogram(f'{prefix}_response_size_bytes', 'Size of body of response by Content-Length',
+                                       LABELS, size_buckets)
+        self.sent = Counter(f'{prefix}_sent_bytes_total', 'Sent bytes of bodies of requests', LABELS)
+        self.received = Counter(f'{prefix}_received_bytes_total', 'Received bytes of bodies of responses by '
+                                                                   'Content-Length', LABELS)
+        self.__gauges = []
+        self.__lock = threading.Lock()
+
+    def gauge(self, collect: typing.Callable[[], typing.Iterable[typing.Tuple[str, str, typing.Dict, float]]]):
+        """
+        Add collector of gauges. It is called by render and returns tuples: name (without prefix), help, labels and
+        value
+        """
+        self.__gauges.append(collect)
+
+    def response(self, endpoint: str, method: str, status: int, elapsed: float, sent: typing.Optional[int],
+                 size: typing.Optional[int]):
+        """
+        Record response
+
+        :param endpoint: endpoint of client
+        :param method: name of class of method
+        :param status: status code
+        :param elapsed: time (seconds) till headers of response
+        :param sent: size of body of request. None, if size is unknown
+        :param size: size of body of response by Content-Length. None, if size is unknown
+        """
+        key = (endpoint, method)
+        with self.__lock:
+            self.requests.inc(key + (status,))
+            self.latency.observe(key, elapsed)
+            if sent is not None:
+                self.request_size.observe(key, sent)
+                self.sent.inc(key, sent)
+            if size is not None:
+                self.response_size.observe(key, size)
+                self.received.inc(key, size)
+
+    def error(self, endpoint: str, method: str, error: str):
+        with self.__lock:
+            self.errors.inc((endpoint, method, error))
+
+    def render(self) -> str:
+        """
+        Metrics by Prometheus text format
+        """
+        with self.__lock:
+            lines = []
+            for metric in [self.requests, self.errors, self.latency, self.request_size, self.response_size,
+                           self.sent, self.received]:
+                if metric.values:
+                    lines.extend(metric.render())
+        gauges = {}
+        for collect in self.__gauges:
+            for name, help_, labels, value in collect():
+                gauges.setdefault(name, (help_, []))[1].append((labels, value))
+        for name, (help_, values) in gauges.items():
+            lines.extend([f'# HELP {self.prefix}_{name} {help_}', f'# TYPE {self.prefix}_{name} gauge'])
+            for labels, value in values:
+                lines.append(f'{self.prefix}_{name}{labels_text(list(labels), list(labels.values()))} '
+                             f'{number(value)}')
+        return '\n'.join(lines) + '\n'
+
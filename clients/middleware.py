@@ -0,0 +1,188 @@
+import asyncio
+import collections
+import collections.abc
+import copy
+import typing
+
+COW_FIELDS = ('headers', 'params', 'body')
+
+ResponseInfo = collections.namedtuple('ResponseInfo', ['method', 'status', 'headers', 'elapsed'])
+
+
+class CowDict(collections.abc.MutableMapping):
+    __slots__ = ('base', 'data')
+
+    def __init__(self, base: typing.Optional[typing.Mapping]):
+        """
+        Copy-on-write view of dict: dict is copied at the first change only
+
+        :param base: source dict. It is not changed. None is empty dict
+        """
+        self.base = base if base is not None else {}
+        self.data = None
+
+    @property
+    def changed(self) -> bool:
+        return self.data is not None
+
+    def __own(self):
+        if self.data is None:
+            self.data = dict(self.base)
+        return self.data
+
+    def __getitem__(self, key):
+        return (self.base if self.data is None else self.data)[key]
+
+    def __setitem__(self, key, value):
+        self.__own()[key] = value
+
+    def __delitem__(self, key):
+        del self.__own()[key]
+
+    def __iter__(self):
+        return iter(self.base if self.data is None else self.data)
+
+    def __len__(self):
+        return len(self.base if self.data is None else self.data)
+
+
+class Overlay:
+    __slots__ = ('_Overlay__method', '_Overlay__changes')
+
+    def __init__(self, method):
+        """
+        Copy-on-write overlay of method for mdws_cow. Middleware reads attributes of method and changes them into
+        overlay: headers, params and dict body can be changed in place, other attributes are replaced. Source object of
+        method is not changed
+
+        :param method: object of method
+        """
+        object.__setattr__(self, '_Overlay__method', method)
+        object.__setattr__(self, '_Overlay__changes', {})
+
+    def __getattr__(self, name):
+        changes = self.__changes
+        if name in changes:
+            return changes[name]
+        value = getattr(self.__method, name)
+        if name in COW_FIELDS and (value is None and name != 'body' or isinstance(value, dict)):
+            value = changes[name] = CowDict(value)
+        return value
+
+    def __setattr__(self, name, value):
+        self.__changes[name] = value
+
+    def apply(self):
+        """
+        Method with changes of overlay. Method is copied once, if something is changed, otherwise source object of
+        method is returned
+        """
+        changes = {}
+        for name, value in self.__changes.items():
+            if not isinstance(value, CowDict):
+                changes[name] = value
+            elif value.changed:
+                changes[name] = value.data
+        if not changes:
+            return self.__method
+        method = copy.copy(self.__method)
+        for name, value in changes.items():
+            setattr(method, name, value)
+        return method
+
+
+class Pipeline:
+    def __init__(self, mdws: typing.Sequence[typing.Callable] = None, mdws_nc: typing.Sequence[typing.Callable] = None,
+                 mdws_cow: typing.Sequence[typing.Callable] = None, amdws: typing.Sequence[typing.Callable] = None,
+                 hooks: typing.Sequence[typing.Callable] = None):
+        """
+        Chain of middlewares of client. It is built once for client
+
+        :param mdws: middlewares, which return copy of method
+        :param mdws_nc: middlewares, which change method and return it
+        :param mdws_cow: middlewares, which change Overlay of method. Method is copied once per request, if it is
+                         changed
+        :param amdws: coroutine functions, which change Overlay of method. They are run concurrently after other
+                      middlewares
+        :param hooks: functions or coroutine functions, which take ResponseInfo before response_process. Coroutine
+                      functions are run concurrently
+        """
+        self.mdws = tuple(mdws or ())
+        self.mdws_nc = tuple(mdws_nc or ())
+        self.mdws_cow = tuple(mdws_cow or ())
+        self.amdws = tuple(amdws or ())
+        self.hooks = tuple(h for h in hooks or () if not asyncio.iscoroutinefunction(h))
+        self.ahooks = tuple(h for h in hooks or () if asyncio.iscoroutinefunction(h))
+        if self.mdws_cow:
+            self.__call = self.__cow
+        elif self.mdws or self.mdws_nc:
+            self.__call = self.__chain
+        else:
+            self.__call = self.__identity
+
+    def __call__(self, method):
+        return self.__call(method)
+
+    async def arun(self, method):
+        """
+        Run middlewares and async middlewares for method. Middlewares of mdws_cow and async middlewares change the same
+        overlay, so method is copied at most once
+        """
+        if not self.amdws:
+            return self.__call(method)
+        if self.mdws_cow:
+            overlay = self.__overlay(method)
+        else:
+            overlay = Overlay(self.__call(method))
+        if len(self.amdws) == 1:
+            await self.amdws[0](overlay)
+        else:
+            await asyncio.gather(*(m(overlay) for m in self.amdws))
+        return overlay.apply()
+
+    def response(self, info: ResponseInfo):
+        """
+        Run hooks for response. Coroutine hooks are not supported into sync client
+        """
+        for h in self.hooks:
+            h(info)
+
+    async def aresponse(self, info: ResponseInfo):
+        """
+        Run hooks for response. Coroutine hooks are run concurrently
+        """
+        for h in self.hooks:
+            h(info)
+        if self.ahooks:
+            await asyncio.gather(*(h(info) for h in self.ahooks))
+
+    @staticmethod
+    def __identity(method):
+        return method
+
+    def __chain(self, method_):
+        method = method_
+        for m in self.mdws:
+            method_ = m(method)
+            assert id(method_) != id(method), 'middleware must call copy for argument of method before ' \
+                                              'return: return copy.copy(m). See test test_request_middleware and ' \
+                                              'test_request_middleware_not_copy for example. If you want to use ' \
+                                              'middleware without copy, you need, mdws_nc argument in constructor'
+            method = method_
+        for m in self.mdws_nc:
+            method_ = m(method)
+            assert id(method_) == id(method), 'middleware must NOT call copy for argument of method. See test ' \
+                                              'test_request_middleware and test_request_middleware_not_copy for ' \
+                                              'example. If you want to use middleware with copy, you need, ' \
+                                              'mdws argument in constructor'
+            method = method_
+        return method
+
+    def __overlay(self, method) -> Overlay:
+        overlay = Overlay(method)
+        for m in self.mdws_cow:
+            m(overlay)
+        return overlay
+
+    def __cow(self, method):
+        return self.__overlay(method).apply()
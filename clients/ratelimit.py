@@ -0,0 +1,154 @@
+import asyncio
+import collections
+import threading
+import time
+import typing
+
+RateLimitStats = collections.namedtuple('RateLimitStats', ['acquired', 'throttled', 'waited', 'wait_time'])
+
+CLIENT = 'client'
+ENDPOINT = 'endpoint'
+METHOD = 'method'
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float = None):
+        """
+        Token bucket: rate tokens are added per second, bucket keeps not more than burst tokens. Each request takes
+        token. If bucket is empty, request waits the next token. Waiting requests are served in order of arrival. It is
+        thread-safe: Client waits by acquire (thread sleeps), AsyncClient waits by acquire_async (loop is not blocked)
+
+        :param rate: tokens per second (requests per second)
+        :param burst: capacity of bucket (max count of requests at once). None is max(1, rate)
+        """
+        assert rate > 0, 'rate must be positive'
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1., rate)
+        self.__tokens = self.burst
+        self.__updated = time.monotonic()
+        self.__lock = threading.Lock()
+        self.__acquired = 0
+        self.__throttled = 0
+        self.__waited = 0.
+
+    @property
+    def wait_time(self) -> float:
+        """
+        Time (seconds), which new request would wait now
+        """
+        with self.__lock:
+            self.__refill()
+            return max(0., (1 - self.__tokens) / self.rate)
+
+    @property
+    def stats(self) -> RateLimitStats:
+        """
+        Counters: acquired (count of requests), throttled (count of requests, which waited), waited (sum of waits in
+        seconds) and current wait_time
+        """
+        wait_time = self.wait_time
+        return RateLimitStats(acquired=self.__acquired, throttled=self.__throttled, waited=self.__waited,
+                              wait_time=wait_time)
+
+    def __refill(self):
+        now = time.monotonic()
+        self.__tokens = min(self.burst, self.__tokens + (now - self.__updated) * self.rate)
+        self.__updated = now
+
+    def reserve(self, tokens: float = 1., timeout: float = None) -> typing.Optional[float]:
+        """
+        Take tokens now. Tokens can be borrowed from future
+
+        :param timeout: max time (seconds) of waiting. None is without limit
+        :return: time (seconds), which caller must wait before request. None, if wait is longer than timeout (tokens
+                 are not taken)
+        """
+        with self.__lock:
+            self.__refill()
+            wait = max(0., (tokens - self.__tokens) / self.rate)
+            if timeout is not None and wait > timeout:
+                return None
+            self.__tokens -= tokens
+            self.__acquired += 1
+            if wait > 0:
+                self.__throttled += 1
+                self.__waited += wait
+            return wait
+
+    def cancel(self, tokens: float = 1.):
+        """
+        Return reserved tokens (waiting request is cancelled)
+        """
+        with self.__lock:
+            self.__tokens += tokens
+
+    def acquire(self, tokens: float = 1., timeout: float = None) -> typing.Optional[float]:
+        """
+        Take tokens and sleep until they are available
+
+        :param timeout: max time (seconds) of waiting. None is without limit
+        :return: time (seconds) of waiting. None, if wait is longer than timeout (tokens are not taken)
+        """
+        wait = self.reserve(tokens, timeout)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: float = 1., timeout: float = None) -> typing.Optional[float]:
+        """
+        Take tokens and wait asynchronously until they are available. Tokens are returned, if waiting is cancelled
+
+        :param timeout: max time (seconds) of waiting. None is without limit
+        :return: time (seconds) of waiting. None, if wait is longer than timeout (tokens are not taken)
+        """
+        wait = self.reserve(tokens, timeout)
+        if wait:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self.cancel(tokens)
+                raise
+        return wait
+
+
+class RateLimits:
+    def __init__(self, rate: float, burst: float = None, per: str = CLIENT):
+        """
+        Rate limits of client. Buckets are created at first request: one bucket for client (per=CLIENT), bucket for
+        each endpoint (per=ENDPOINT) or bucket for each class of method (per=METHOD). Object can be shared between
+        clients, so limit is shared too
+
+        :param rate: requests per second of each bucket
+        :param burst: capacity of each bucket. None is max(1, rate)
+        :param per: CLIENT, ENDPOINT or METHOD
+        """
+        assert per in (CLIENT, ENDPOINT, METHOD), f'per must be {CLIENT}, {ENDPOINT} or {METHOD}'
+        self.rate = rate
+        self.burst = burst
+        self.per = per
+        self.__buckets = {}
+        self.__lock = threading.Lock()
+
+    def get(self, endpoint: str, m_class: type) -> TokenBucket:
+        key = None if self.per == CLIENT else endpoint if self.per == ENDPOINT else m_class
+        bucket = self.__buckets.get(key)
+        if bucket is None:
+            with self.__lock:
+                bucket = self.__buckets.setdefault(key, TokenBucket(self.rate, self.burst))
+        return bucket
+
+    @property
+    def stats(self) -> typing.Dict[typing.Any, RateLimitStats]:
+        """
+        Stats of buckets by key: None (per=CLIENT), endpoint or class of method
+        """
+        return {key: bucket.stats for key, bucket in list(self.__buckets.items())}
+
+    def gauges(self):
+        """
+        Collector of gauges for clients.metrics.Metrics: current wait time of each bucket
+        """
+        for key, bucket in list(self.__buckets.items()):
+            name = '' if key is None else key if isinstance(key, str) else key.__name__
+            yield ('rate_limit_wait_seconds', 'Time, which new request would wait token of rate limit',
+                   {'per': self.per, 'key': name}, bucket.wait_time)
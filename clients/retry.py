@@ -0,0 +1,168 @@
+import asyncio
+import collections
+import datetime
+import email.utils
+import random
+import threading
+import typing
+
+import aiohttp
+import requests
+
+IDEMPOTENT = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE', 'TRACE'])
+ERRORS = (requests.ConnectionError, requests.Timeout, aiohttp.ClientConnectionError, asyncio.TimeoutError)
+
+RetryStats = collections.namedtuple('RetryStats', ['attempts', 'retries', 'give_ups', 'budget_exhausted'])
+
+
+class Retry:
+    def __init__(self, attempts: int = 3, backoff: float = 0.1, max_backoff: float = 10.,
+                 statuses: typing.Iterable[int] = (429, 502, 503, 504), methods: typing.Iterable[str] = IDEMPOTENT,
+                 errors: typing.Tuple[typing.Type[BaseException], ...] = ERRORS, max_retry_after: float = 60.):
+        """
+        Policy of retries. Delay before retry is random in [0, min(max_backoff, backoff * 2 ** retry)] (exponential
+        backoff with full jitter). Retry-After header of 429 and 503 responses overrides the delay
+
+        :param attempts: max count of attempts of request (first request and retries)
+        :param backoff: base of delay (seconds)
+        :param max_backoff: max delay (seconds)
+        :param statuses: status codes of responses, which are retried
+        :param methods: types of methods, which are retried. Only idempotent methods are retried by default
+        :param errors: errors of requests, which are retried (errors of connection and timeouts by default)
+        :param max_retry_after: if Retry-After is more than max_retry_after (seconds), request is not retried
+        """
+        assert attempts >= 1, 'attempts must be positive'
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.statuses = frozenset(statuses)
+        self.methods = frozenset(m.upper() for m in methods)
+        self.errors = errors
+        self.max_retry_after = max_retry_after
+
+    def allows(self, m_type: str) -> bool:
+        return self.attempts > 1 and m_type.upper() in self.methods
+
+    def backoff_delay(self, retry: int) -> float:
+        """
+        Delay before retry with full jitter
+
+        :param retry: number of retry from 0
+        """
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** retry))
+
+    @staticmethod
+    def retry_after(headers: typing.Optional[typing.Mapping]) -> typing.Optional[float]:
+        """
+        Delay from Retry-After header: seconds or HTTP-date. None, if header is absent or invalid
+        """
+        value = headers.get('Retry-After') if headers is not None else None
+        if value is None:
+            return None
+        try:
+            return max(0., float(value))
+        except ValueError:
+            pass
+        try:
+            date = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if date is None:
+            return None
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=datetime.timezone.utc)
+        return max(0., (date - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+    def delay(self, retry: int, status: int = None, headers: typing.Mapping = None) -> typing.Optional[float]:
+        """
+        Delay before retry. None, if Retry-After is more than max_retry_after
+        """
+        if status in (429, 503):
+            retry_after = self.retry_after(headers)
+            if retry_after is not None:
+                return retry_after if retry_after <= self.max_retry_after else None
+        return self.backoff_delay(retry)
+
+
+NEVER = Retry(attempts=1)
+
+
+class RetryBudget:
+    def __init__(self, ratio: float = 0.1, min_tokens: float = 10., max_tokens: float = 100.):
+        """
+        Budget of retries of client. Each request adds ratio of token, each retry takes token, so retries add not
+        more than ratio of load (plus min_tokens). It prevents storms of retries, when downstream is failing
+
+        :param ratio: share of retries
+        :param min_tokens: tokens at start, they allow retries for first requests
+        :param max_tokens: max count of saved tokens
+        """
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = min_tokens
+        self.__lock = threading.Lock()
+
+    def deposit(self):
+        with self.__lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self.__lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class Retrier:
+    def __init__(self, budget: RetryBudget = None):
+        """
+        Retries of client: budget and counters. It is shared by all requests of client
+
+        :param budget: budget of retries. None is RetryBudget with defaults
+        """
+        self.budget = budget if budget is not None else RetryBudget()
+        self.__lock = threading.Lock()
+        self.__attempts = 0
+        self.__retries = 0
+        self.__give_ups = 0
+        self.__budget_exhausted = 0
+
+    @property
+    def stats(self) -> RetryStats:
+        return RetryStats(attempts=self.__attempts, retries=self.__retries, give_ups=self.__give_ups,
+                          budget_exhausted=self.__budget_exhausted)
+
+    def attempt(self, retry: int):
+        """
+        Count attempt of request
+
+        :param retry: number of retry, 0 is first request
+        """
+        if retry == 0:
+            self.budget.deposit()
+        with self.__lock:
+            self.__attempts += 1
+
+    def delay(self, policy: Retry, retry: int, status: int = None,
+              headers: typing.Mapping = None) -> typing.Optional[float]:
+        """
+        Delay before next retry of failed attempt. None, if request must not be retried: attempts are over, budget is
+        exhausted or Retry-After is too long
+
+        :param policy: policy of retries
+        :param retry: number of retry of failed attempt, 0 is first request
+        :param status: status code of response. None, if request is failed with error
+        :param headers: headers of response
+        """
+        delay = policy.delay(retry, status, headers) if retry + 1 < policy.attempts else None
+        if delay is not None and not self.budget.withdraw():
+            with self.__lock:
+                self.__budget_exhausted += 1
+            delay = None
+        with self.__lock:
+            if delay is None:
+                self.__give_ups += 1
+            else:
+                self.__retries += 1
+        return delay
@@ -0,0 +1,279 @@
+import asyncio
+import datetime
+import threading
+import time
+import typing
+
+import aiohttp
+import requests
+
+from clients import compression, upload
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+class AsyncTransport:
+    """
+    Transport of AsyncClient. Default transport is aiohttp.ClientSession of client, so transport implements the same
+    subset of interface of aiohttp:
+
+        await transport.request(method=..., url=..., params=..., data=..., headers=..., proxy=..., auth=...,
+                                timeout=aiohttp.ClientTimeout(...), trace_request_ctx=...)
+
+    Response has status, headers, content_length, coroutine read(), release() and content.iter_chunked(size). Transport
+    is closed by AsyncClient.resolve and must be opened again by the next request. Transport decompresses responses by
+    content codings of encodings
+    """
+    encodings: typing.Sequence[str] = (compression.GZIP, compression.DEFLATE)
+
+    async def request(self, method: str, url: str, params: typing.Dict = None, data=None, headers: typing.Dict = None,
+                      proxy: str = None, auth=None, timeout: aiohttp.ClientTimeout = None, trace_request_ctx=None):
+        raise NotImplementedError()
+
+    async def close(self):
+        raise NotImplementedError()
+
+
+class Transport:
+    """
+    Transport of Client. Default transport is requests.Session of client, so transport implements the same subset of
+    interface of requests: methods by verbs (get, post etc...), which take url, params, data, headers, proxies, auth,
+    stream, timeout (seconds or pair of connect and read timeouts) and hooks. Response has status_code, headers,
+    content, iter_content(size), close(), elapsed and request.headers. Transport is closed by Client.close and must be
+    opened again by the next request. It must be thread-safe. Transport decompresses responses by content codings of
+    encodings
+    """
+    encodings: typing.Sequence[str] = (compression.GZIP, compression.DEFLATE)
+
+    def request(self, method: str, url: str, params: typing.Dict = None, data=None, headers: typing.Dict = None,
+                proxies: typing.Dict = None, auth=None, stream: bool = False, timeout=None,
+                hooks: typing.Dict = None):
+        raise NotImplementedError()
+
+    def close(self):
+        raise NotImplementedError()
+
+    def get(self, **kwargs):
+        return self.request('GET', **kwargs)
+
+    def post(self, **kwargs):
+        return self.request('POST', **kwargs)
+
+    def put(self, **kwargs):
+        return self.request('PUT', **kwargs)
+
+    def patch(self, **kwargs):
+        return self.request('PATCH', **kwargs)
+
+    def delete(self, **kwargs):
+        return self.request('DELETE', **kwargs)
+
+    def head(self, **kwargs):
+        return self.request('HEAD', **kwargs)
+
+    def options(self, **kwargs):
+        return self.request('OPTIONS', **kwargs)
+
+
+def httpx_encodings() -> typing.List[str]:
+    """
+    Content codings, which are decompressed by httpx
+    """
+    try:
+        from httpx._decoders import SUPPORTED_DECODERS
+    except ImportError:
+        return [compression.GZIP, compression.DEFLATE]
+    return [e for e in compression.PREFERENCE if e in SUPPORTED_DECODERS]
+
+
+def httpx_limits(max_connections: int, keepalive_expiry: float):
+    return httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections,
+                        keepalive_expiry=keepalive_expiry)
+
+
+class HttpxAsyncResponse:
+    def __init__(self, resp):
+        """
+        Response of httpx with interface of aiohttp.ClientResponse, which is used by AsyncClient
+        """
+        length = resp.headers.get('Content-Length')
+        self.status = resp.status_code
+        self.headers = resp.headers
+        self.content_length = int(length) if length is not None else None
+        self.http_version = resp.http_version
+        self.content = self
+        self.__resp = resp
+
+    async def read(self) -> bytes:
+        return await self.__resp.aread()
+
+    async def iter_chunked(self, chunk_size: int) -> typing.AsyncIterator[bytes]:
+        async for chunk in self.__resp.aiter_bytes(chunk_size):
+            yield chunk
+
+    def release(self):
+        if not self.__resp.is_closed:
+            asyncio.ensure_future(self.__resp.aclose())
+
+
+class Http2AsyncTransport(AsyncTransport):
+    def __init__(self, prior_knowledge: bool = False, max_connections: int = 100, keepalive_expiry: float = 5.,
+                 verify: bool = True, proxy: str = None):
+        """
+        HTTP/2 transport of AsyncClient by httpx (pip install httpx[http2]). Many concurrent requests to one host are
+        multiplexed over one connection. Multipart uploads (Method.files_async) and proxies of requests are not
+        supported. Total timeout limits time till headers of response
+
+        :param prior_knowledge: use HTTP/2 without negotiation. It is required for HTTP/2 without TLS (h2c). Otherwise
+                                HTTP/2 is negotiated by TLS (ALPN), and http:// urls use HTTP/1.1
+        :param max_connections: max count of connections
+        :param keepalive_expiry: timeout of idle connection (seconds)
+        :param verify: verify certificates of servers
+        :param proxy: url of proxy for all requests
+        """
+        assert httpx is not None, 'httpx is not installed'
+        self.prior_knowledge = prior_knowledge
+        self.max_connections = max_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.verify = verify
+        self.proxy = proxy
+        self.encodings = httpx_encodings()
+        self.__client = None
+
+    def __new_client(self):
+        return httpx.AsyncClient(http1=not self.prior_knowledge, http2=True, verify=self.verify, proxy=self.proxy,
+                                 limits=httpx_limits(self.max_connections, self.keepalive_expiry), timeout=None)
+
+    async def request(self, method: str, url: str, params: typing.Dict = None, data=None, headers: typing.Dict = None,
+                      proxy: str = None, auth=None, timeout: aiohttp.ClientTimeout = None,
+                      trace_request_ctx=None) -> HttpxAsyncResponse:
+        assert proxy is None, 'proxy of request is not supported by Http2AsyncTransport'
+        if isinstance(data, aiohttp.FormData):
+            raise NotImplementedError('multipart requests are not supported by Http2AsyncTransport')
+        if self.__client is None:
+            self.__client = self.__new_client()
+        if hasattr(data, 'read'):
+            data = upload.aiter_content(upload.iter_content(data))
+        if isinstance(auth, aiohttp.BasicAuth):
+            auth = (auth.login, auth.password)
+        timeout_ = httpx.Timeout(None)
+        total = None
+        if timeout is not None:
+            timeout_ = httpx.Timeout(None, connect=timeout.sock_connect, read=timeout.sock_read)
+            total = timeout.total
+        request = self.__client.build_request(method.upper(), url, params=params, content=data, headers=headers,
+                                              timeout=timeout_)
+        try:
+            resp = await asyncio.wait_for(self.__client.send(request, auth=auth, stream=True), total)
+        except httpx.TimeoutException as e:
+            raise asyncio.TimeoutError(str(e)) from e
+        except httpx.TransportError as e:
+            raise aiohttp.ClientConnectionError(str(e)) from e
+        return HttpxAsyncResponse(resp)
+
+    async def close(self):
+        if self.__client is not None:
+            client, self.__client = self.__client, None
+            await client.aclose()
+
+
+class HttpxResponse:
+    def __init__(self, resp, elapsed: float):
+        """
+        Response of httpx with interface of requests.Response, which is used by Client
+        """
+        self.status_code = resp.status_code
+        self.headers = resp.headers
+        self.request = resp.request
+        self.elapsed = datetime.timedelta(seconds=elapsed)
+        self.http_version = resp.http_version
+        self.__resp = resp
+
+    @property
+    def content(self) -> bytes:
+        return self.__resp.read()
+
+    def iter_content(self, chunk_size: int = 1) -> typing.Iterator[bytes]:
+        return self.__resp.iter_bytes(chunk_size)
+
+    def close(self):
+        self.__resp.close()
+
+
+class Http2Transport(Transport):
+    def __init__(self, prior_knowledge: bool = False, max_connections: int = 100, keepalive_expiry: float = 5.,
+                 verify: bool = True, proxy: str = None):
+        """
+        HTTP/2 transport of Client by httpx (pip install httpx[http2]). Requests of threads are multiplexed over one
+        connection to host. Proxies of requests and cache of Client are not supported
+
+        :param prior_knowledge: use HTTP/2 without negotiation. It is required for HTTP/2 without TLS (h2c). Otherwise
+                                HTTP/2 is negotiated by TLS (ALPN), and http:// urls use HTTP/1.1
+        :param max_connections: max count of connections
+        :param keepalive_expiry: timeout of idle connection (seconds)
+        :param verify: verify certificates of servers
+        :param proxy: url of proxy for all requests
+        """
+        assert httpx is not None, 'httpx is not installed'
+        self.prior_knowledge = prior_knowledge
+        self.max_connections = max_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.verify = verify
+        self.proxy = proxy
+        self.encodings = httpx_encodings()
+        self.__client = None
+        self.__lock = threading.Lock()
+
+    def __get_client(self):
+        client = self.__client
+        if client is None:
+            with self.__lock:
+                if self.__client is None:
+                    self.__client = httpx.Client(http1=not self.prior_knowledge, http2=True, verify=self.verify,
+                                                 proxy=self.proxy, timeout=None,
+                                                 limits=httpx_limits(self.max_connections, self.keepalive_expiry))
+                client = self.__client
+        return client
+
+    def request(self, method: str, url: str, params: typing.Dict = None, data=None, headers: typing.Dict = None,
+                proxies: typing.Dict = None, auth=None, stream: bool = False, timeout=None,
+                hooks: typing.Dict = None) -> HttpxResponse:
+        assert not proxies, 'proxies of request are not supported by Http2Transport'
+        client = self.__get_client()
+        content, form = data, None
+        if isinstance(data, dict):
+            content, form = None, data
+        elif isinstance(data, upload.Body) and data.len is not None:
+            headers = {**(headers or {}), 'Content-Length': str(data.len)}
+        if timeout is None:
+            timeout_ = httpx.Timeout(None)
+        elif isinstance(timeout, tuple):
+            timeout_ = httpx.Timeout(None, connect=timeout[0], read=timeout[1])
+        else:
+            timeout_ = httpx.Timeout(None, connect=timeout, read=timeout)
+        request = client.build_request(method, url, params=params, content=content, data=form, headers=headers,
+                                       timeout=timeout_)
+        start = time.perf_counter()
+        try:
+            resp = client.send(request, auth=auth, stream=True)
+            elapsed = time.perf_counter() - start
+            if not stream:
+                resp.read()
+        except httpx.TimeoutException as e:
+            raise requests.Timeout(str(e)) from e
+        except httpx.TransportError as e:
+            raise requests.ConnectionError(str(e)) from e
+        resp = HttpxResponse(resp, elapsed)
+        hook = (hooks or {}).get('response')
+        if hook is not None:
+            hook(resp)
+        return resp
+
+    def close(self):
+        with self.__lock:
+            client, self.__client = self.__client, None
+        if client is not None:
+            client.close()
@@ -0,0 +1,143 @@
+import io
+import os
+import typing
+import uuid
+
+CHUNK_SIZE = 64 * 1024
+
+
+def is_iterator(content) -> bool:
+    """
+    Check, that content is iterable of chunks (generator, iterator and etc.), but not bytes, str, file or container
+    """
+    if isinstance(content, (bytes, bytearray, memoryview, str, dict, list, tuple, io.IOBase)):
+        return False
+    return hasattr(content, '__iter__')
+
+
+def is_async_iterator(content) -> bool:
+    return hasattr(content, '__aiter__')
+
+
+def size_of(content) -> typing.Optional[int]:
+    """
+    Size of content in bytes. None, if size is unknown before reading
+    """
+    if isinstance(content, str):
+        return len(content.encode())
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        return len(content)
+    if isinstance(content, os.PathLike):
+        return os.path.getsize(content)
+    if isinstance(content, io.TextIOBase) or not hasattr(content, 'read'):
+        return None
+    try:
+        return os.fstat(content.fileno()).st_size - content.tell()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        pass
+    try:
+        position = content.tell()
+        size = content.seek(0, io.SEEK_END) - position
+        content.seek(position)
+        return size
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+
+def iter_content(content, chunk_size: int = CHUNK_SIZE) -> typing.Iterator[bytes]:
+    """
+    Iterate content by chunks. Content is file path, file object, iterator of chunks, bytes or str
+    """
+    if isinstance(content, os.PathLike):
+        with open(content, 'rb') as f:
+            yield from iter_content(f, chunk_size)
+    elif hasattr(content, 'read'):
+        while True:
+            chunk = content.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk.encode() if isinstance(chunk, str) else chunk
+    elif is_iterator(content):
+        for chunk in content:
+            yield chunk.encode() if isinstance(chunk, str) else chunk
+    elif isinstance(content, str):
+        yield content.encode()
+    else:
+        yield content
+
+
+async def aiter_content(content) -> typing.AsyncIterator[bytes]:
+    """
+    Iterate sync iterator of chunks asynchronously
+    """
+    for chunk in content:
+        yield chunk.encode() if isinstance(chunk, str) else chunk
+
+
+class Body:
+    def __init__(self, content, chunk_size: int = CHUNK_SIZE):
+        """
+        Streaming body for requests. It is sent with Content-Length, if size of content is known, otherwise it is sent
+        with chunked transfer encoding
+
+        :param content: file path, file object or iterator of chunks
+        :param chunk_size: size of chunks, which are read from file
+        """
+        self.content = content
+        self.chunk_size = chunk_size
+        self.len = size_of(content)
+
+    def __iter__(self):
+        return iter_content(self.content, self.chunk_size)
+
+
+class MultipartEncoder(Body):
+    def __init__(self, files: typing.Union[typing.Dict, typing.List], fields: typing.Dict = None,
+                 chunk_size: int = CHUNK_SIZE):
+        """
+        Streaming multipart/form-data body for requests. Files are read by chunks while body is sent
+
+        :param files: files in format of requests: dict or list of pairs: field and file. File is content or tuple:
+                      filename, content, content type and headers. Content is file path, file object, iterator of
+                      chunks, bytes or str
+        :param fields: form fields
+        :param chunk_size: size of chunks, which are read from files
+        """
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f'multipart/form-data; boundary={self.boundary}'
+        self.__parts = []
+        for name, value in (fields or {}).items():
+            self.__add_part(name, str(value), None, None, {})
+        for name, value in (files.items() if isinstance(files, dict) else files):
+            if isinstance(value, (tuple, list)):
+                filename, content, content_type, headers = (tuple(value) + (None, None))[:4]
+            else:
+                filename, content, content_type, headers = None, value, None, None
+            if filename is None:
+                filename = getattr(content, 'name', None)
+                filename = os.path.basename(filename if isinstance(filename, (str, os.PathLike)) else name)
+            self.__add_part(name, content, filename, content_type, headers or {})
+        self.__tail = f'--{self.boundary}--\r\n'.encode()
+        sizes = [size_of(content) for _, content in self.__parts]
+        content_len = None
+        if None not in sizes:
+            content_len = sum(sizes) + sum(len(h) + 2 for h, _ in self.__parts) + len(self.__tail)
+        Body.__init__(self, None, chunk_size)
+        self.len = content_len
+
+    def __add_part(self, name, content, filename, content_type, headers):
+        disposition = f'form-data; name="{name}"'
+        if filename is not None:
+            disposition += f'; filename="{filename}"'
+        lines = [f'--{self.boundary}', f'Content-Disposition: {disposition}']
+        if content_type is not None:
+            lines.append(f'Content-Type: {content_type}')
+        lines.extend(f'{k}: {v}' for k, v in headers.items())
+        self.__parts.append((('\r\n'.join(lines) + '\r\n\r\n').encode(), content))
+
+    def __iter__(self):
+        for header, content in self.__parts:
+            yield header
+            yield from iter_content(content, self.chunk_size)
+            yield b'\r\n'
+        yield self.__tail
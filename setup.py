@@ -30,4 +30,5 @@ setuptools.setup(
         "Operating System :: OS Independent",
     ],
     install_requires=install_reqs,
+    extras_require={'http2': ['httpx[http2]>=0.26.0'], 'compression': ['brotli>=1.0.9', 'zstandard>=0.22.0']},
 )
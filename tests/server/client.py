@@ -54,3 +54,78 @@ class SyncFileResponse(http.Method):
     def __init__(self, file):
         http.Method.__init__(self)
         self.files_sync = {'file': file}
+
+
+class Cache(http.Method):
+    url_ = '/cache'
+    m_type = 'GET'
+
+    def __init__(self, cache_control='max-age=60'):
+        http.Method.__init__(self)
+        self.params = {'cache_control': cache_control}
+
+
+class Download(http.Method):
+    url_ = '/download'
+    m_type = 'GET'
+    stream = True
+
+    def __init__(self, size):
+        http.Method.__init__(self)
+        self.params = {'size': size}
+
+
+class Upload(http.Method):
+    url_ = '/upload'
+    m_type = 'POST'
+
+    def __init__(self, body):
+        http.Method.__init__(self)
+        self.body = body
+
+
+class Flaky(http.Method):
+    url_ = '/flaky'
+    m_type = 'GET'
+
+    def __init__(self, status=200, delay=0.):
+        http.Method.__init__(self)
+        self.params = {'status': status, 'delay': delay}
+
+
+class Json(http.Method):
+    url_ = '/json'
+    m_type = 'GET'
+
+    def __init__(self, count=1):
+        http.Method.__init__(self)
+        self.params = {'count': count}
+
+
+class Compressed(http.Method):
+    url_ = '/compressed'
+    m_type = 'GET'
+
+    def __init__(self, count=1, stream=False):
+        http.Method.__init__(self)
+        self.params = {'count': count}
+        self.stream = stream
+
+
+class Decompress(http.Method):
+    url_ = '/compressed'
+    m_type = 'POST'
+
+    def __init__(self, body, compress=None):
+        http.Method.__init__(self)
+        self.body = body
+        self.compress = compress
+
+
+class Artifact(http.Method):
+    url_ = '/artifact'
+    m_type = 'GET'
+
+    def __init__(self, size, version=1, ranges=True, drop=-1, etag=True):
+        http.Method.__init__(self)
+        self.params = {'size': size, 'version': version, 'ranges': int(ranges), 'drop': drop, 'etag': int(etag)}
@@ -1,4 +1,8 @@
+import asyncio
+import functools
 import io
+import json
+import random
 from typing import List, Dict, Optional
 
 import fastapi
@@ -7,6 +11,7 @@ from fastapi import UploadFile, File, Form
 from loguru import logger
 
 import tests
+from clients import compression
 from pydantic import BaseModel
 
 
@@ -89,5 +94,122 @@ async def file_method_response(file: UploadFile = File(...),):
     return fastapi.responses.StreamingResponse(io.StringIO(b), media_type='text/plain')
 
 
+handler = '/cache'
+@app.get(handler, status_code=200)
+async def cache_method(request: fastapi.Request, response: fastapi.Response):
+    logger.debug(f"")
+    etag = '"cache-v1"'
+    if request.headers.get('if-none-match') == etag:
+        return fastapi.Response(status_code=304, headers={'ETag': etag, 'Cache-Control': 'no-cache'})
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = request.query_params.get('cache_control', 'max-age=60')
+    return {'success': True}
+
+
+handler = '/upload'
+@app.post(handler, status_code=200)
+async def upload_method(request: fastapi.Request):
+    logger.debug(f"")
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+    return {'size': size, 'content_length': request.headers.get('content-length'),
+            'chunked': request.headers.get('transfer-encoding') == 'chunked'}
+
+
+handler = '/download'
+@app.get(handler, status_code=200, response_model=None)
+async def download_method(size: int = 1024, chunk: int = 64 * 1024):
+    logger.debug(f"size {size}")
+
+    async def content():
+        for i in range(0, size, chunk):
+            yield b'0' * min(chunk, size - i)
+    return fastapi.responses.StreamingResponse(content(), media_type='application/octet-stream')
+
+
+handler = '/json'
+@app.get(handler, status_code=200)
+async def json_method(count: int = 1):
+    logger.debug(f"count {count}")
+    return [{'id': i, 'name': f'user {i}', 'email': f'user{i}@example.com', 'active': i % 2 == 0,
+             'tags': ['a', 'b', 'c']} for i in range(count)]
+
+
+handler = '/flaky'
+@app.get(handler, status_code=200)
+async def flaky_method(status: int = 200, delay: float = 0.):
+    logger.debug(f"status {status} delay {delay}")
+    if delay > 0:
+        await asyncio.sleep(delay)
+    if status != 200:
+        raise fastapi.HTTPException(status_code=status)
+    return {'success': True}
+
+
+handler = '/compressed'
+@app.get(handler, status_code=200, response_model=None)
+async def compressed_method(request: fastapi.Request, count: int = 1, chunk: int = 1024):
+    logger.debug(f"count {count}")
+    body = json.dumps(await json_method(count)).encode()
+    accepted = [e.split(';')[0].strip() for e in request.headers.get('accept-encoding', '').split(',')]
+    encoding = next((e for e in accepted if e in compression.available()), None)
+    headers = {}
+    if encoding is not None:
+        body = compression.compress(encoding, body)
+        headers['Content-Encoding'] = encoding
+
+    async def content():
+        for i in range(0, len(body), chunk):
+            yield body[i:i + chunk]
+    return fastapi.responses.StreamingResponse(content(), media_type='application/json', headers=headers)
+
+
+@app.post(handler, status_code=200)
+async def decompress_method(request: fastapi.Request):
+    logger.debug(f"")
+    body = await request.body()
+    encoding = request.headers.get('content-encoding')
+    data = compression.decompress(encoding, body) if encoding is not None else body
+    return {'encoding': encoding, 'size': len(body), 'body': json.loads(data)}
+
+
+@functools.lru_cache(maxsize=8)
+def artifact(size: int, version: int) -> bytes:
+    return random.Random(version).getrandbits(size * 8).to_bytes(size, 'little') if size > 0 else b''
+
+
+handler = '/artifact'
+@app.get(handler, status_code=200, response_model=None)
+async def artifact_method(request: fastapi.Request, size: int = 1024, version: int = 1, ranges: bool = True,
+                          drop: int = -1, etag: bool = True):
+    logger.debug(f"size {size} version {version} range {request.headers.get('range')}")
+    data = artifact(size, version)
+    etag_ = f'"artifact-{version}"'
+    headers = {'ETag': etag_} if etag else {}
+    start, end, status = 0, size - 1, 200
+    range_ = request.headers.get('range')
+    if ranges and range_ is not None and request.headers.get('if-range', etag_) == etag_:
+        first, _, last = range_[len('bytes='):].partition('-')
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if start >= size:
+            return fastapi.Response(status_code=416, headers={'Content-Range': f'bytes */{size}'})
+        status = 206
+        headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+    headers['Content-Length'] = str(end - start + 1)
+
+    async def content():
+        # connection is dropped at byte drop of resource
+        for i in range(start, end + 1, 64 * 1024):
+            j = min(i + 64 * 1024, end + 1)
+            if i <= drop < j:
+                yield data[i:drop]
+                raise ConnectionResetError('connection is dropped')
+            yield data[i:j]
+    return fastapi.responses.StreamingResponse(content(), status_code=status, headers=headers,
+                                               media_type='application/octet-stream')
+
+
 if __name__ == "__main__":
     uvicorn.run(app, host='0.0.0.0', port=tests.port)
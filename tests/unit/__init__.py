@@ -1,12 +1,83 @@
-from clients import http
+import asyncio
 import typing
 
+from clients import http
+
 fake_url = 'https://ed.cba'
 real_url = 'https://yandex.ru'
 
 client = http.AsyncClient(real_url)
 
 
+class Response:
+    """
+    Fake response of both clients: aiohttp.ClientResponse (status, read, release) and requests.Response (status_code,
+    content, close)
+    """
+
+    def __init__(self, status=200, headers=None, content=b'{"success": true}'):
+        self.status = self.status_code = status
+        self.headers = {'Content-Type': 'application/json', **(headers or {})}
+        self.content = content
+        self.released = False
+
+    async def read(self):
+        return self.content
+
+    def release(self):
+        self.released = True
+
+    def close(self):
+        self.released = True
+
+
+class Session:
+    """
+    Fake transport of both clients: it replaces aiohttp.ClientSession of AsyncClient and module requests of Client
+    (monkeypatch http.requests). Results (responses and errors) are taken from list, the last one is repeated.
+    Requests sleep delay: all of them or the first slow ones. Arguments of the last request are kept into kwargs
+    """
+
+    def __init__(self, *results, delay=0., slow=None):
+        self.results = list(results) or [Response()]
+        self.delay = delay
+        self.slow = slow
+        self.calls = 0
+        self.cancelled = 0
+        self.kwargs = None
+
+    def __next(self, kwargs):
+        self.kwargs = kwargs
+        result = self.results[min(self.calls, len(self.results) - 1)]
+        self.calls += 1
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def Session(self):
+        return self
+
+    def mount(self, prefix, adapter):
+        pass
+
+    def close(self):
+        pass
+
+    def __getattr__(self, item):
+        return lambda **kwargs: self.__next(kwargs)
+
+    async def request(self, **kwargs):
+        index = self.calls
+        result = self.__next(kwargs)
+        if self.delay and (self.slow is None or index < self.slow):
+            try:
+                await asyncio.sleep(self.delay)
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                raise
+        return result
+
+
 class GetResponseProcess(http.Method):
     url_ = '/'
     m_type = 'GET'
@@ -1,4 +1,7 @@
+import asyncio
 import copy
+import json
+import socket
 from pathlib import Path
 import pytest
 
@@ -18,6 +21,12 @@ class Response:
         self.status = status
         self.content = content
         self.json_ = json_
+        self.headers = {'Content-Type': 'application/json' if json_ else 'text/plain'}
+
+    async def read(self):
+        if self.json_:
+            return json.dumps(self.response).encode()
+        return self.content.encode()
 
     async def json(self):
         if not self.json_:
@@ -29,6 +38,9 @@ class Response:
             raise Exception()
         return self.content
 
+    def release(self):
+        pass
+
 
 class MockSessions:
     def __init__(self, resp, content, code, failure=False, json_=True):
@@ -296,3 +308,162 @@ async def test_request_mdws_nc_not_copy():
     assert resp == {}
     assert unit.Get().__dict__ != m.__dict__
     assert status_code == 204
+
+
+def middleware_cow(m):
+    m.headers['test'] = 'test'
+
+
+@pytest.mark.asyncio
+async def test_request_mdws_cow():
+    client = http.AsyncClient(unit.fake_url, mdws_cow=[middleware_cow])
+    client._AsyncClient__session = MockSessions(resp={}, code=204, content='')
+    m = unit.Get()
+    resp, status_code = await client.request(m)
+    assert resp == {}
+    assert unit.Get().__dict__ == m.__dict__
+    assert status_code == 204
+
+
+@pytest.mark.asyncio
+async def test_request_amdws():
+    async def token(m):
+        await asyncio.sleep(0.1)
+        m.headers['Authorization'] = 'token'
+
+    async def route(m):
+        await asyncio.sleep(0.1)
+        m.params['shard'] = 1
+
+    client = http.AsyncClient(unit.fake_url, amdws=[token, route])
+    client._AsyncClient__session = MockSessions(resp={}, code=204, content='')
+    m = unit.Get()
+    start = asyncio.get_event_loop().time()
+    resp, status_code = await client.request(m)
+    assert asyncio.get_event_loop().time() - start < 0.19
+    assert status_code == 204
+    assert unit.Get().__dict__ == m.__dict__
+
+
+@pytest.mark.asyncio
+async def test_request_hooks():
+    infos = []
+
+    def hook(info):
+        infos.append(info)
+
+    async def async_hook(info):
+        infos.append(info)
+
+    client = http.AsyncClient(unit.fake_url, hooks=[hook, async_hook])
+    client._AsyncClient__session = MockSessions(resp={}, code=204, content='')
+    m = unit.Get()
+    await client.request(m)
+    assert len(infos) == 2
+    assert infos[0].method is m
+    assert infos[0].status == 204
+    assert infos[0].elapsed >= 0
+
+
+@pytest.mark.asyncio
+async def test_request_hook_error():
+    def hook(info):
+        raise TestException()
+
+    client = http.AsyncClient(unit.fake_url, hooks=[hook])
+    client._AsyncClient__session = MockSessions(resp={}, code=204, content='')
+    with pytest.raises(http.ResponseProcessException):
+        await client.request(unit.Get())
+
+
+@pytest.mark.asyncio
+async def test_pool_stats():
+    client = http.AsyncClient(f"http://localhost:{port}", limit=1, keepalive_timeout=30)
+    data = {"data1": "data1", "data2": 12345, "data3": False}
+    results = await asyncio.gather(*[client.request(unit.DataDict(data)) for _ in range(3)])
+    assert all(status_code == 200 for _, status_code in results)
+    stats = client.pool_stats
+    assert stats.limit == 1
+    assert stats.in_use == 0
+    assert stats.idle == 1
+    assert stats.waiting == 0
+    assert stats.created == 1
+    assert stats.reused == 2
+    await client.resolve()
+    assert client.pool_stats.idle == 0
+
+
+@pytest.mark.asyncio
+async def test_sock_options():
+    client = http.AsyncClient(f"http://localhost:{port}", force_close=True,
+                              sock_options=[(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)])
+    resp, status_code = await client.request(unit.DataDict({"data1": "data1", "data2": 12345, "data3": False}))
+    assert status_code == 200
+    assert client.pool_stats.idle == 0
+    await client.resolve()
+
+
+class ConcurrencySessions(MockSessions):
+    def __init__(self, resp, content, code):
+        MockSessions.__init__(self, resp=resp, content=content, code=code)
+        self.active = 0
+        self.max_active = 0
+
+    async def request(self, **args):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(0.01 if args['method'] == 'post' else 0)
+        self.active -= 1
+        return self.response
+
+
+@pytest.mark.asyncio
+async def test_request_many():
+    client = http.AsyncClient(unit.fake_url)
+    session = ConcurrencySessions(resp={}, code=204, content='')
+    client._AsyncClient__session = session
+    methods = [unit.Post(), unit.Get(), unit.GetWithBody()] * 5
+    results = await client.request_many(methods, concurrency=3)
+    assert len(results) == 15
+    assert results[0] == ({}, 204)
+    assert results[1] == ({}, 204)
+    assert isinstance(results[2], AssertionError)
+    assert session.max_active <= 3
+
+
+@pytest.mark.asyncio
+async def test_request_stream():
+    client = http.AsyncClient(unit.fake_url)
+    session = ConcurrencySessions(resp={}, code=204, content='')
+    client._AsyncClient__session = session
+    taken = []
+
+    def methods():
+        while True:
+            taken.append(1)
+            yield unit.Post() if len(taken) % 2 else unit.Get()
+
+    order = []
+    stream = client.request_stream(methods(), concurrency=4)
+    async for i, result in stream:
+        assert result == ({}, 204)
+        order.append(i)
+        if len(order) == 100:
+            break
+    await stream.aclose()
+    assert order != sorted(order)
+    assert len(taken) < 110
+    assert session.max_active <= 4
+
+
+@pytest.mark.asyncio
+async def test_request_stream_async_iterable():
+    client = http.AsyncClient(unit.fake_url)
+    client._AsyncClient__session = MockSessions(resp={}, code=204, content='')
+
+    async def methods():
+        for _ in range(5):
+            yield unit.Get()
+
+    results = [r async for r in client.request_stream(methods())]
+    assert sorted(i for i, _ in results) == list(range(5))
@@ -0,0 +1,121 @@
+import asyncio
+import math
+import time
+
+import pytest
+
+from clients import balancer, http
+from tests import unit
+
+
+def test_least_outstanding():
+    lb = balancer.Balancer(['a', 'b', 'c'], policy=balancer.LEAST_OUTSTANDING)
+    picked = [lb.pick() for _ in range(3)]
+    assert sorted(e.url for e in picked) == ['a', 'b', 'c']
+    lb.record(picked[0], False, 0.01)
+    assert lb.pick() is picked[0]
+    assert lb.stats[picked[1].url].outstanding == 1
+
+
+def test_peak_ewma():
+    lb = balancer.Balancer(['fast', 'slow'])
+    fast, slow = lb.endpoints
+    for endpoint, elapsed in [(fast, 0.01), (slow, 0.5)]:
+        endpoint.outstanding += 1
+        lb.record(endpoint, False, elapsed)
+    assert {lb.pick().url for _ in range(5)} == {'fast'}
+    # peak is taken at once
+    lb.record(fast, False, 1.)
+    assert lb.stats['fast'].latency == 1.
+
+
+def test_decay():
+    lb = balancer.Balancer(['a'], decay=0.05)
+    a = lb.pick()
+    lb.record(a, False, 1.)
+    time.sleep(0.05)
+    lb.pick()
+    lb.record(a, False, 0.)
+    assert 0.2 < lb.stats['a'].latency < 0.5
+
+
+def test_ejection():
+    lb = balancer.Balancer(['a', 'b', 'c', 'd'], max_failures=2, ejection_time=0.05, max_ejected=0.5)
+    a, b, c, d = lb.endpoints
+    for endpoint in [a, a, b, b, c, c]:
+        endpoint.outstanding += 1
+        lb.record(endpoint, True, 0.01)
+    stats = lb.stats
+    # max_ejected keeps c
+    assert [stats[url].ejected for url in 'abcd'] == [True, True, False, False]
+    assert {lb.pick().url for _ in range(20)} <= {'c', 'd'}
+    time.sleep(0.05)
+    assert not lb.stats['a'].ejected
+    assert lb.stats['a'].ejections == 1
+
+
+def test_success_resets_failures():
+    lb = balancer.Balancer(['a', 'b'], max_failures=2)
+    a = lb.endpoints[0]
+    for failed in [True, False, True]:
+        a.outstanding += 1
+        lb.record(a, failed, 0.01)
+    assert lb.stats['a'].consecutive_failures == 1
+    assert not lb.stats['a'].ejected
+
+
+def test_probes():
+    lb = balancer.Balancer(['a', 'b'])
+    a, b = lb.endpoints
+    lb.probed(a, False)
+    assert a.ejected_until == math.inf
+    assert {lb.pick().url for _ in range(10)} == {'b'}
+    lb.probed(b, False)
+    # all endpoints are ejected, so all of them are used
+    assert {lb.pick().url for _ in range(20)} == {'a', 'b'}
+    lb.probed(a, True)
+    assert not lb.stats['a'].ejected and lb.stats['b'].ejected
+
+
+class ProbeSession(unit.Session):
+    """
+    The first probes raise unexpected error
+    """
+
+    def __init__(self, errors):
+        unit.Session.__init__(self)
+        self.errors = errors
+
+    async def request(self, **kwargs):
+        if kwargs['url'].endswith('/health') and self.errors > 0:
+            self.errors -= 1
+            raise RuntimeError('unexpected')
+        return await unit.Session.request(self, **kwargs)
+
+    async def close(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_probes_after_error():
+    lb = balancer.Balancer(['http://a', 'http://b'], probe='/health', probe_interval=0.01)
+    a, b = lb.endpoints
+    lb.probed(a, False)
+    client = http.AsyncClient(lb)
+    client._AsyncClient__session = ProbeSession(errors=4)
+    await client.request(unit.Get())
+    for _ in range(100):
+        if not lb.stats['http://a'].ejected:
+            break
+        await asyncio.sleep(0.01)
+    # unexpected errors fail probes, but probes go on and endpoint is returned
+    assert not lb.stats['http://a'].ejected
+    await client.resolve()
+
+
+def test_release():
+    lb = balancer.Balancer(['a'])
+    a = lb.pick()
+    lb.release(a)
+    assert lb.stats['a'].outstanding == 0
+    assert lb.stats['a'].latency == 0.
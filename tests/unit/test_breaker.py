@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+from clients import breaker
+
+
+def test_open_by_errors():
+    cb = breaker.CircuitBreaker(min_calls=4, error_rate=0.5)
+    for failed in [False, True, False]:
+        cb.allow()
+        cb.record(failed, 0.01)
+    assert cb.state.state == breaker.CLOSED
+    cb.allow()
+    cb.record(True, 0.01)
+    assert cb.state.state == breaker.OPEN
+    with pytest.raises(breaker.CircuitOpenException):
+        cb.allow()
+    assert cb.state.rejected == 1
+
+
+def test_open_by_slow_calls():
+    cb = breaker.CircuitBreaker(min_calls=2, slow_call_duration=0.5, slow_call_rate=0.5)
+    cb.allow()
+    cb.record(False, 0.01)
+    cb.allow()
+    cb.record(False, 1.)
+    assert cb.state.state == breaker.OPEN
+
+
+def test_window():
+    cb = breaker.CircuitBreaker(window=0.05, min_calls=2)
+    cb.allow()
+    cb.record(True, 0.01)
+    time.sleep(0.06)
+    cb.allow()
+    cb.record(True, 0.01)
+    assert cb.state == breaker.BreakerState(state=breaker.CLOSED, calls=1, failures=1, slow_calls=0, rejected=0,
+                                            opened=None)
+
+
+def test_half_open():
+    cb = breaker.CircuitBreaker(min_calls=1, open_timeout=0.05, half_open_calls=1)
+    cb.allow()
+    cb.record(True, 0.01)
+    time.sleep(0.06)
+    assert cb.state.state == breaker.HALF_OPEN
+    cb.allow()
+    with pytest.raises(breaker.CircuitOpenException):
+        cb.allow()
+    cb.record(True, 0.01)
+    assert cb.state.state == breaker.OPEN
+    time.sleep(0.06)
+    cb.allow()
+    cb.record(False, 0.01)
+    assert cb.state.state == breaker.CLOSED
+
+
+def test_release():
+    cb = breaker.CircuitBreaker(min_calls=1, open_timeout=0.)
+    cb.allow()
+    cb.record(True, 0.01)
+    cb.allow()
+    cb.release()
+    cb.allow()
+
+
+def test_breakers():
+    breakers = breaker.Breakers(min_calls=1)
+    assert breakers.get('a', int) is breakers.get('a', int)
+    assert breakers.get('a', int) is not breakers.get('a', str)
+    assert set(breakers.states) == {('a', int), ('a', str)}
+    assert breakers.failure_statuses(503)
+    assert not breakers.failure_statuses(404)
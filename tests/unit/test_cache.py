@@ -0,0 +1,155 @@
+import asyncio
+
+import pytest
+
+from clients import cache, http
+from tests import unit
+
+
+def test_lru_cache_budget():
+    storage = cache.LRUCache(max_bytes=10)
+    storage.set('a', b'1234')
+    storage.set('b', b'1234')
+    assert storage.get('a') == b'1234'
+    storage.set('c', b'1234')
+    assert storage.get('b') is None
+    assert storage.get('a') == b'1234'
+    assert storage.size == 8
+    storage.set('d', b'12345678901')
+    assert storage.get('d') is None
+    storage.delete('a')
+    assert len(storage) == 1
+    assert storage.size == 4
+
+
+def test_lru_cache_expires():
+    storage = cache.LRUCache()
+    storage.set('a', b'1', expires=-1)
+    assert storage.get('a') is None
+    assert storage.size == 0
+
+
+def test_file_cache(tmp_path):
+    storage = cache.FileCache(str(tmp_path))
+    assert storage.get('a') is None
+    storage.set('a', b'123')
+    assert cache.FileCache(str(tmp_path)).get('a') == b'123'
+    storage.delete('a')
+    storage.delete('a')
+    assert storage.get('a') is None
+
+
+class Fetch:
+    def __init__(self, status=200, etag='"v1"'):
+        self.status = status
+        self.etag = etag
+        self.calls = []
+
+    async def __call__(self, etag):
+        self.calls.append(etag)
+        if etag is not None and etag == self.etag:
+            return None, 304, self.etag, 0
+        return {'call': len(self.calls)}, self.status, self.etag, 10
+
+
+@pytest.mark.asyncio
+async def test_async_cache_ttl():
+    storage = cache.AsyncCache(ttl=60)
+    fetch = Fetch()
+    key = storage.key('get', 'http://a/b', {'b': 1, 'a': 2})
+    assert key == storage.key('get', 'http://a/b', {'a': 2, 'b': 1})
+    assert await storage.request(key, fetch) == ({'call': 1}, 200)
+    assert await storage.request(key, fetch) == ({'call': 1}, 200)
+    assert fetch.calls == [None]
+    assert storage.stats == cache.AsyncCacheStats(hits=1, stale_hits=0, misses=1, revalidations=0, refresh_errors=0)
+
+
+@pytest.mark.asyncio
+async def test_async_cache_revalidation():
+    storage = cache.AsyncCache(ttl=60)
+    fetch = Fetch()
+    assert await storage.request('k', fetch, ttl=0) == ({'call': 1}, 200)
+    assert await storage.request('k', fetch, ttl=0) == ({'call': 1}, 200)
+    assert fetch.calls == [None, '"v1"']
+    assert storage.stats.revalidations == 1
+
+
+@pytest.mark.asyncio
+async def test_async_cache_stale_while_revalidate():
+    storage = cache.AsyncCache(ttl=0, stale_while_revalidate=60)
+    fetch = Fetch(etag=None)
+    assert await storage.request('k', fetch) == ({'call': 1}, 200)
+    assert await storage.request('k', fetch) == ({'call': 1}, 200)
+    assert await storage.request('k', fetch) == ({'call': 1}, 200)
+    await asyncio.sleep(0)
+    assert fetch.calls == [None, None]
+    assert await storage.request('k', fetch) == ({'call': 2}, 200)
+    assert storage.stats.stale_hits == 3
+
+
+@pytest.mark.asyncio
+async def test_async_cache_errors_not_cached():
+    storage = cache.AsyncCache()
+    fetch = Fetch(status=500)
+    await storage.request('k', fetch)
+    await storage.request('k', fetch)
+    assert len(fetch.calls) == 2
+    assert len(storage) == 0
+
+
+@pytest.mark.asyncio
+async def test_async_cache_eviction():
+    storage = cache.AsyncCache(max_entries=2, max_bytes=25)
+    for key in ['a', 'b', 'c']:
+        await storage.request(key, Fetch())
+    assert len(storage) == 2
+    assert storage.size == 20
+    storage = cache.AsyncCache(max_entries=2, max_bytes=15)
+    for key in ['a', 'b']:
+        await storage.request(key, Fetch())
+    assert len(storage) == 1
+
+
+@pytest.mark.asyncio
+async def test_async_cache_credentials():
+    class Private(unit.Get):
+        headers = {'Authorization': 'Bearer alice'}
+
+    class Shared(Private):
+        url_ = '/shared'
+        cache = True
+
+    client = http.AsyncClient(unit.fake_url, cache=cache.AsyncCache(ttl=60))
+    session = unit.Session()
+    client._AsyncClient__session = session
+    for m in [unit.Get(), unit.Get(), Private(), Private(), Shared(), Shared()]:
+        assert await client.request(m) == ({'success': True}, 200)
+    assert session.calls == 4
+    m = unit.Get()
+    m.auth = ('bob', 'password')
+    await client.request(m)
+    assert session.calls == 5
+
+
+@pytest.mark.asyncio
+async def test_async_cache_body(tmp_path):
+    class Search(unit.Post):
+        cache = True
+
+        def __init__(self, body):
+            unit.Post.__init__(self)
+            self.body = body
+
+    client = http.AsyncClient(unit.fake_url, cache=cache.AsyncCache(ttl=60))
+    session = unit.Session()
+    client._AsyncClient__session = session
+    for body in [{'q': 'a'}, {'q': 'b'}, {'q': 'a'}]:
+        await client.request(Search(body))
+    assert session.calls == 2
+    # streamed body is not cached
+    path = tmp_path / 'body.bin'
+    path.write_bytes(b'data')
+    for _ in range(2):
+        await client.request(Search(path))
+        assert session.kwargs['data'].closed
+    assert session.calls == 4
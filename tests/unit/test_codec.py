@@ -0,0 +1,55 @@
+import pytest
+
+from clients import codec, http
+from tests import unit
+
+
+def test_find():
+    codecs = codec.Codecs()
+    assert codecs.find('application/json; charset=utf-8').name == 'json'
+    assert codecs.find('Application/Problem+JSON').name == 'json'
+    assert codecs.find('text/html') is None
+    assert codecs.find(None) is None
+
+
+def test_decode():
+    codecs = codec.Codecs()
+    assert codecs.decode('application/json', b'{"a": 1}') == {'a': 1}
+    assert codecs.decode('application/json', b'{"a": ') == b'{"a": '
+    assert codecs.decode('text/plain', b'{"a": 1}') == b'{"a": 1}'
+
+
+def test_encode():
+    codecs = codec.Codecs()
+    assert codecs.encode(None, {'a': 1}) == '{"a": 1}'
+    assert codecs.encode('text/plain', {'a': 1}) == '{"a": 1}'
+    assert codec.Codecs({}).encode('application/x-www-form-urlencoded', [1]) == '[1]'
+
+
+def test_fastest():
+    codecs = codec.Codecs.fastest()
+    if codec.orjson is not None:
+        assert codecs.find('application/json').name == 'orjson'
+    if codec.msgpack is not None:
+        assert codecs.decode('application/msgpack', codecs.encode('application/msgpack', [1, 'a'])) == [1, 'a']
+
+
+@pytest.mark.skipif(codec.msgpack is None, reason='msgpack is not installed')
+def test_method_codecs():
+    class Msgpack(unit.Post):
+        headers = {'Content-Type': codec.MSGPACK}
+        codecs = codec.Codecs({codec.MSGPACK: codec.MsgpackCodec()})
+
+    assert Msgpack().body_ == codec.msgpack.packb({})
+    assert unit.Post().encode(codec.Codecs.fastest()) in ('{}', b'{}')
+    assert isinstance(Msgpack().encode(codec.Codecs.fastest()), bytes)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('status', [200, 204])
+async def test_empty_response(monkeypatch, status):
+    client = http.AsyncClient(unit.fake_url)
+    client._AsyncClient__session = unit.Session(unit.Response(status, content=b''))
+    assert await client.request(unit.Get()) == (None, status)
+    monkeypatch.setattr(http, 'requests', unit.Session(unit.Response(status, content=b'')))
+    assert http.Client(unit.fake_url).request(unit.Get()) == ({}, status)
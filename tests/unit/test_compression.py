@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+from clients import compression
+
+DATA = json.dumps([{'id': i, 'name': f'user {i}'} for i in range(100)]).encode()
+
+
+@pytest.mark.parametrize('encoding', compression.available())
+def test_roundtrip(encoding):
+    compressed = compression.compress(encoding, DATA)
+    assert len(compressed) < len(DATA)
+    assert compression.decompress(encoding, compressed) == DATA
+
+
+def test_unknown():
+    with pytest.raises(ValueError):
+        compression.compress('lz4', DATA)
+    with pytest.raises(AssertionError):
+        compression.Compression('lz4')
+
+
+def test_accept_encoding():
+    assert compression.Compression().accept_encoding(['br', 'gzip', 'deflate']) == 'br, gzip, deflate'
+    c = compression.Compression(accept=['zstd', 'gzip'])
+    assert c.accept_encoding(['br', 'gzip', 'deflate']) == 'gzip'
+
+
+def test_apply():
+    c = compression.Compression(threshold=100)
+    body, headers = c.apply(DATA.decode(), None, 'gzip')
+    assert headers == {'Accept-Encoding': 'gzip', 'Content-Encoding': 'gzip'}
+    assert compression.decompress('gzip', body) == DATA
+    body, headers = c.apply(b'{}', {'X-Id': '1'}, 'gzip')
+    assert (body, headers) == (b'{}', {'X-Id': '1', 'Accept-Encoding': 'gzip'})
+    body, headers = c.apply(DATA, {'accept-encoding': 'identity'}, 'gzip', enabled=False)
+    assert (body, headers) == (DATA, {'accept-encoding': 'identity'})
+    body, headers = c.apply(DATA, {'Content-Encoding': 'br'}, 'gzip')
+    assert body is DATA
+    stream = iter([DATA])
+    assert c.apply(stream, None, 'gzip')[0] is stream
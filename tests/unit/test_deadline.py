@@ -0,0 +1,115 @@
+import asyncio
+import socket
+import threading
+import time
+
+import pytest
+import requests
+
+from clients import deadline, http
+from tests import unit
+
+
+def test_merge():
+    timeout = deadline.merge(deadline.Timeout(read=1.), None, deadline.Timeout(connect=2., read=3.))
+    assert timeout == deadline.Timeout(connect=2., read=1., total=None)
+
+
+def test_nested_deadline():
+    assert deadline.remaining() is None
+    with deadline.deadline(1.):
+        with deadline.deadline(10.):
+            assert deadline.remaining() <= 1.
+        with deadline.deadline(0.5):
+            assert deadline.remaining() <= 0.5
+            assert deadline.merge(deadline.Timeout(total=5.)).total <= 0.5
+    assert deadline.remaining() is None
+
+
+@pytest.mark.asyncio
+async def test_async_timeout():
+    class Slow(unit.Get):
+        timeout = deadline.Timeout(read=1.)
+
+    client = http.AsyncClient(unit.fake_url, timeout=deadline.Timeout(connect=2., read=3., total=10.))
+    session = unit.Session()
+    client._AsyncClient__session = session
+    await client.request(Slow())
+    timeout = session.kwargs['timeout']
+    assert (timeout.sock_connect, timeout.sock_read, timeout.total) == (2., 1., 10.)
+    client = http.AsyncClient(unit.fake_url)
+    client._AsyncClient__session = session
+    await client.request(Slow())
+    # total timeout of session is kept
+    timeout = session.kwargs['timeout']
+    assert (timeout.sock_read, timeout.total) == (1., http.aiohttp.client.DEFAULT_TIMEOUT.total)
+
+
+@pytest.mark.asyncio
+async def test_async_deadline():
+    client = http.AsyncClient(unit.fake_url)
+    session = unit.Session()
+    client._AsyncClient__session = session
+    await client.request(unit.Get())
+    assert 'timeout' not in session.kwargs
+    with deadline.deadline(0.5):
+        await asyncio.sleep(0.01)
+        await client.request(unit.Get())
+        assert session.kwargs['timeout'].total < 0.5
+    with deadline.deadline(0.):
+        with pytest.raises(http.RequestTimeoutException):
+            await client.request(unit.Get())
+
+
+def stalling_server(stopped: threading.Event) -> int:
+    """
+    Server sends headers and part of body, then it stalls till stopped is set
+    """
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(1)
+
+    def serve():
+        conn, _ = server.accept()
+        conn.recv(65536)
+        conn.sendall(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: 100\r\n\r\n{"a": ')
+        stopped.wait(5.)
+        conn.close()
+        server.close()
+
+    threading.Thread(target=serve, daemon=True).start()
+    return server.getsockname()[1]
+
+
+def test_sync_read_timeout_of_body(monkeypatch):
+    monkeypatch.setattr(http, 'requests', requests)
+    stopped = threading.Event()
+    client = http.Client(f'http://127.0.0.1:{stalling_server(stopped)}', timeout=deadline.Timeout(read=0.2))
+    try:
+        with pytest.raises(http.RequestTimeoutException):
+            client.request(unit.Get())
+    finally:
+        stopped.set()
+        client.close()
+
+
+def test_sync_timeout(monkeypatch):
+    session = unit.Session()
+    monkeypatch.setattr(http, 'requests', session)
+    client = http.Client(unit.fake_url, timeout=deadline.Timeout(connect=2., read=3.))
+    client.request(unit.Get())
+    assert session.kwargs['timeout'] == (2., 3.)
+    with deadline.deadline(1.):
+        client.request(unit.Get())
+        connect, read = session.kwargs['timeout']
+        assert connect <= 1. and read <= 1.
+
+
+def test_sync_request_many_deadline(monkeypatch):
+    session = unit.Session()
+    monkeypatch.setattr(http, 'requests', session)
+    client = http.Client(unit.fake_url)
+    start = time.monotonic()
+    client.request_many([unit.Get()], timeout=5.)
+    connect, read = session.kwargs['timeout']
+    assert read <= 5. - (time.monotonic() - start) + 0.1
@@ -0,0 +1,186 @@
+import hashlib
+import random
+
+import aiohttp
+import pytest
+import requests
+
+import tests
+from clients import download, http
+from tests.server import client
+
+ENDPOINT = f'http://localhost:{tests.port}'
+SIZE = 1000003
+SEGMENT = 128 * 1024
+
+
+def artifact(size, version=1):
+    return random.Random(version).getrandbits(size * 8).to_bytes(size, 'little') if size > 0 else b''
+
+
+def test_download_sync(tmp_path):
+    path = tmp_path / 'artifact.bin'
+    data = artifact(SIZE)
+    downloader = download.Downloader(connections=4, segment_size=SEGMENT)
+    stats = downloader.download(http.Client(ENDPOINT), client.Artifact(SIZE), path,
+                                checksum=hashlib.sha256(data).hexdigest())
+    assert path.read_bytes() == data
+    assert stats.size == stats.downloaded == SIZE
+    assert (stats.resumed, stats.segments, stats.retries) == (0, 8, 0)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['artifact.bin']
+
+
+@pytest.mark.asyncio
+async def test_download_async(tmp_path):
+    path = tmp_path / 'artifact.bin'
+    data = artifact(SIZE)
+    client_ = http.AsyncClient(ENDPOINT)
+    stats = await download.Downloader(segment_size=SEGMENT).download_async(
+        client_, client.Artifact(SIZE), path, checksum=hashlib.md5(data).hexdigest(), algorithm='md5')
+    assert path.read_bytes() == data
+    assert (stats.downloaded, stats.segments) == (SIZE, 8)
+    await client_.resolve()
+
+
+def test_resume_sync(tmp_path):
+    path = tmp_path / 'artifact.bin'
+    client_ = http.Client(ENDPOINT)
+    downloader = download.Downloader(connections=2, segment_size=SEGMENT, attempts=1)
+    with pytest.raises(requests.RequestException):
+        downloader.download(client_, client.Artifact(SIZE, drop=SEGMENT * 3 + 100), path)
+    assert not path.exists()
+    assert (tmp_path / 'artifact.bin.part').stat().st_size == SIZE
+    stats = downloader.download(client_, client.Artifact(SIZE), path)
+    assert path.read_bytes() == artifact(SIZE)
+    assert stats.resumed >= SEGMENT * 3
+    assert stats.resumed + stats.downloaded == SIZE
+
+
+@pytest.mark.asyncio
+async def test_resume_async(tmp_path):
+    path = tmp_path / 'artifact.bin'
+    client_ = http.AsyncClient(ENDPOINT)
+    downloader = download.Downloader(connections=2, segment_size=SEGMENT, attempts=1)
+    with pytest.raises(aiohttp.ClientError):
+        await downloader.download_async(client_, client.Artifact(SIZE, drop=SEGMENT * 5 + 100), path)
+    # resource is changed: If-Range fails and download starts from scratch
+    stats = await downloader.download_async(client_, client.Artifact(SIZE, version=2), path)
+    assert path.read_bytes() == artifact(SIZE, version=2)
+    assert (stats.resumed, stats.downloaded) == (0, SIZE)
+    await client_.resolve()
+
+
+class CompactArtifact(http.CompactMethod):
+    url_ = '/artifact'
+    m_type = 'GET'
+
+    def __init__(self, size):
+        http.CompactMethod.__init__(self)
+        self.params = {'size': size, 'version': 1, 'ranges': 1, 'drop': -1}
+
+    @staticmethod
+    def response_process(resp, status_code):
+        return resp.json()
+
+
+def test_resume_without_validator(tmp_path):
+    path = tmp_path / 'artifact.bin'
+    client_ = http.Client(ENDPOINT)
+    downloader = download.Downloader(connections=2, segment_size=SEGMENT, attempts=1)
+    with pytest.raises(requests.RequestException):
+        downloader.download(client_, client.Artifact(SIZE, drop=SEGMENT * 3 + 100, etag=False), path)
+    assert (tmp_path / 'artifact.bin.part').stat().st_size == SIZE
+    # changed resource without ETag is not mixed into the partial file
+    stats = downloader.download(client_, client.Artifact(SIZE, version=2, etag=False), path)
+    assert path.read_bytes() == artifact(SIZE, version=2)
+    assert (stats.resumed, stats.downloaded) == (0, SIZE)
+
+
+def test_download_compact(tmp_path):
+    path = tmp_path / 'artifact.bin'
+    stats = download.Downloader(connections=2, segment_size=SEGMENT).download(http.Client(ENDPOINT),
+                                                                              CompactArtifact(SIZE), path)
+    assert path.read_bytes() == artifact(SIZE)
+    assert (stats.size, stats.segments) == (SIZE, 8)
+
+
+@pytest.mark.asyncio
+async def test_download_compact_async(tmp_path):
+    path = tmp_path / 'artifact.bin'
+    client_ = http.AsyncClient(ENDPOINT)
+    stats = await download.Downloader(segment_size=SEGMENT).download_async(client_, CompactArtifact(SIZE), path)
+    assert path.read_bytes() == artifact(SIZE)
+    assert stats.downloaded == SIZE
+    await client_.resolve()
+
+
+def test_without_ranges(tmp_path):
+    path = tmp_path / 'artifact.bin'
+    stats = download.Downloader(segment_size=SEGMENT).download(http.Client(ENDPOINT),
+                                                               client.Artifact(SIZE, ranges=False), path)
+    assert path.read_bytes() == artifact(SIZE)
+    assert (stats.size, stats.segments) == (SIZE, 1)
+    download.Downloader().download(http.Client(ENDPOINT), client.Artifact(0), path)
+    assert path.read_bytes() == b''
+
+
+def test_checksum(tmp_path):
+    path = tmp_path / 'artifact.bin'
+    with pytest.raises(download.ChecksumException):
+        download.Downloader(segment_size=SEGMENT).download(http.Client(ENDPOINT), client.Artifact(SIZE), path,
+                                                           checksum='0' * 64)
+    assert list(tmp_path.iterdir()) == []
+
+
+class StreamResponse:
+    def __init__(self, headers):
+        self.headers = headers
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ErrorClient:
+    def __init__(self, status, headers):
+        self.status = status
+        self.resp = StreamResponse(headers)
+
+    def request(self, method, stream=None, process=True):
+        return self.resp, self.status
+
+
+class AsyncErrorClient(ErrorClient):
+    async def request(self, method, stream=None, process=True):
+        return self.resp, self.status
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('status, headers', [(404, {}), (416, {'Content-Range': 'bytes */10'}),
+                                             (206, {'Content-Range': 'bytes 5-9/10'})])
+async def test_error_closes_response(tmp_path, status, headers):
+    client_ = ErrorClient(status, headers)
+    with pytest.raises(http.RequestException):
+        download.Downloader().download(client_, client.Artifact(SIZE), tmp_path / 'artifact.bin')
+    assert client_.resp.closed
+    client_ = AsyncErrorClient(status, headers)
+    with pytest.raises(http.RequestException):
+        await download.Downloader().download_async(client_, client.Artifact(SIZE), tmp_path / 'artifact.bin')
+    assert client_.resp.closed
+
+
+def test_part(tmp_path):
+    part = download.Part(tmp_path / 'file', segment_size=4)
+    part.create(10, '"v1"')
+    assert part.pending() == [0, 1, 2]
+    part.write(2, b'89')
+    part.write(0, b'01')
+    with pytest.raises(http.RequestException):
+        part.write(0, b'234')
+    part.save()
+    part.close()
+    part = download.Part(tmp_path / 'file', segment_size=1024)
+    assert part.load()
+    assert (part.segment_size, part.written, part.pending()) == (4, 4, [0, 1])
+    assert part.range(0) == (2, 3)
+    part.close()
@@ -0,0 +1,89 @@
+import asyncio
+
+import aiohttp
+import pytest
+
+from clients import flight, http
+from tests import unit
+
+
+@pytest.mark.asyncio
+async def test_coalesce():
+    client = http.AsyncClient(unit.fake_url, coalesce=True)
+    session = unit.Session(delay=0.05)
+    client._AsyncClient__session = session
+    results = await asyncio.gather(*(client.request(unit.Get()) for _ in range(10)))
+    assert results == [({'success': True}, 200)] * 10
+    assert session.calls == 1
+    assert client.coalesce_stats == flight.FlightStats(calls=10, coalesced=9)
+    await client.request(unit.Get())
+    assert session.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_coalesce_not_get():
+    client = http.AsyncClient(unit.fake_url, coalesce=True)
+    session = unit.Session(delay=0.01)
+    client._AsyncClient__session = session
+    await asyncio.gather(*(client.request(unit.Post()) for _ in range(3)))
+    assert session.calls == 3
+
+
+@pytest.mark.asyncio
+@pytest.mark.filterwarnings('ignore::DeprecationWarning')
+async def test_coalesce_auth():
+    client = http.AsyncClient(unit.fake_url, coalesce=True)
+    session = unit.Session(delay=0.05)
+    client._AsyncClient__session = session
+    alice, bob = unit.Get(), unit.Get()
+    alice.auth, bob.auth = aiohttp.BasicAuth('alice'), aiohttp.BasicAuth('bob')
+    await asyncio.gather(client.request(alice), client.request(bob))
+    assert session.calls == 2
+    assert client.coalesce_stats == flight.FlightStats(calls=2, coalesced=0)
+
+@pytest.mark.asyncio
+async def test_cancel_waiter():
+    sf = flight.SingleFlight()
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 'result'
+
+    first = asyncio.ensure_future(sf.request('key', call))
+    second = asyncio.ensure_future(sf.request('key', call))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    assert await second == 'result'
+    assert first.cancelled()
+    assert len(calls) == 1
+    assert len(sf) == 0
+
+
+@pytest.mark.asyncio
+async def test_cancel_all_waiters():
+    sf = flight.SingleFlight()
+    cancelled = []
+
+    async def call():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    waiter = asyncio.ensure_future(sf.request('key', call))
+    await asyncio.sleep(0.01)
+    waiter.cancel()
+    await asyncio.sleep(0.01)
+    assert cancelled == [1]
+    assert len(sf) == 0
+
+
+def test_key():
+    assert flight.SingleFlight.key('get', '/a', {'b': 1}, {'X': '1'}) == \
+        flight.SingleFlight.key('get', '/a', [('b', '1')], {'x': '1'})
+    assert flight.SingleFlight.key('get', '/a', None, None) != flight.SingleFlight.key('get', '/a', None, {'x': '1'})
+    assert flight.SingleFlight.key('get', '/a', None, None) != \
+        flight.SingleFlight.key('get', '/a', None, None, proxy='http://proxy')
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from clients import hedge, http
+from tests import unit
+
+
+@pytest.mark.asyncio
+async def test_hedge_won():
+    client = http.AsyncClient(unit.fake_url, hedge=hedge.Hedge(delay=0.01, max_rate=1.))
+    session = unit.Session(delay=1., slow=1)
+    client._AsyncClient__session = session
+    resp, status_code = await asyncio.wait_for(client.request(unit.Get()), 0.5)
+    assert status_code == 200
+    assert session.calls == 2
+    await asyncio.sleep(0)
+    assert session.cancelled == 1
+    assert client.hedge_stats == hedge.HedgeStats(requests=1, hedged=1, won=1, capped=0)
+
+
+@pytest.mark.asyncio
+async def test_hedge_not_fired():
+    client = http.AsyncClient(unit.fake_url, hedge=hedge.Hedge(delay=0.1, max_rate=1.))
+    session = unit.Session()
+    client._AsyncClient__session = session
+    await client.request(unit.Get())
+    assert session.calls == 1
+    assert client.hedge_stats == hedge.HedgeStats(requests=1, hedged=0, won=0, capped=0)
+
+
+@pytest.mark.asyncio
+async def test_hedge_capped():
+    client = http.AsyncClient(unit.fake_url, hedge=hedge.Hedge(delay=0.01, max_rate=0.5))
+    session = unit.Session(delay=0.05, slow=1)
+    client._AsyncClient__session = session
+    await client.request(unit.Get())
+    assert session.calls == 1
+    assert client.hedge_stats.capped == 1
+
+
+@pytest.mark.asyncio
+async def test_hedge_not_idempotent():
+    client = http.AsyncClient(unit.fake_url, hedge=hedge.Hedge(delay=0.01, max_rate=1.))
+    session = unit.Session(delay=0.05, slow=1)
+    client._AsyncClient__session = session
+    await client.request(unit.Post())
+    assert session.calls == 1
+    assert client.hedge_stats.requests == 0
+
+
+def test_percentile():
+    h = hedge.Hedge(percentile=90, min_samples=16, max_rate=1.)
+    assert h.delay() is None
+    for i in range(1, 17):
+        h.observe(i / 100)
+    assert h.delay() == 0.15
+
+
+@pytest.mark.asyncio
+async def test_both_failed():
+    async def call():
+        await asyncio.sleep(0.02)
+        raise ValueError()
+
+    h = hedge.Hedge(delay=0.01, max_rate=1.)
+    with pytest.raises(ValueError):
+        await h.request(call)
+    assert h.stats == hedge.HedgeStats(requests=1, hedged=1, won=0, capped=0)
@@ -0,0 +1,37 @@
+from clients import metrics
+
+
+def test_render():
+    m = metrics.Metrics(latency_buckets=(0.1, 1.), size_buckets=(100,))
+    m.response('http://a', 'Get', 200, 0.05, 0, 10)
+    m.response('http://a', 'Get', 200, 0.5, 0, None)
+    m.response('http://a', 'Get', 503, 5., 200, 300)
+    m.error('http://a', 'Get', 'RequestException')
+    text = m.render()
+    assert text.endswith('\n')
+    lines = text.splitlines()
+    assert '# TYPE http_client_requests_total counter' in lines
+    assert 'http_client_requests_total{endpoint="http://a",method="Get",status="200"} 2' in lines
+    assert 'http_client_requests_total{endpoint="http://a",method="Get",status="503"} 1' in lines
+    assert 'http_client_errors_total{endpoint="http://a",method="Get",error="RequestException"} 1' in lines
+    assert '# TYPE http_client_request_duration_seconds histogram' in lines
+    assert 'http_client_request_duration_seconds_bucket{endpoint="http://a",method="Get",le="0.1"} 1' in lines
+    assert 'http_client_request_duration_seconds_bucket{endpoint="http://a",method="Get",le="1"} 2' in lines
+    assert 'http_client_request_duration_seconds_bucket{endpoint="http://a",method="Get",le="+Inf"} 3' in lines
+    assert 'http_client_request_duration_seconds_sum{endpoint="http://a",method="Get"} 5.55' in lines
+    assert 'http_client_request_duration_seconds_count{endpoint="http://a",method="Get"} 3' in lines
+    assert 'http_client_response_size_bytes_count{endpoint="http://a",method="Get"} 2' in lines
+    assert 'http_client_received_bytes_total{endpoint="http://a",method="Get"} 310' in lines
+    assert 'http_client_sent_bytes_total{endpoint="http://a",method="Get"} 200' in lines
+
+
+def test_gauge():
+    m = metrics.Metrics(prefix='api')
+    m.gauge(lambda: [('pool_connections', 'Connections', {'state': 'idle'}, 3)])
+    lines = m.render().splitlines()
+    assert lines == ['# HELP api_pool_connections Connections', '# TYPE api_pool_connections gauge',
+                     'api_pool_connections{state="idle"} 3']
+
+
+def test_escape():
+    assert metrics.labels_text(['a'], ['x"y\\z\n']) == '{a="x\\"y\\\\z\\n"}'
@@ -0,0 +1,92 @@
+import pytest
+
+from clients import http, middleware
+from tests import unit
+
+
+def test_cow_dict():
+    base = {'a': 1}
+    d = middleware.CowDict(base)
+    assert d['a'] == 1
+    assert not d.changed
+    d['b'] = 2
+    del d['a']
+    assert d.changed
+    assert dict(d) == {'b': 2}
+    assert base == {'a': 1}
+
+
+def test_overlay_not_changed():
+    m = unit.DataDict({'a': 1})
+    overlay = middleware.Overlay(m)
+    assert overlay.headers['Content-Type'] == m.headers['Content-Type']
+    assert overlay.url == m.url
+    assert overlay.apply() is m
+
+
+def test_overlay():
+    m = unit.DataDict({'a': 1})
+    headers = dict(m.headers)
+    overlay = middleware.Overlay(m)
+    overlay.headers['X-Token'] = 'token'
+    overlay.body['b'] = 2
+    overlay.params['page'] = 1
+    overlay.auth = ('user', 'password')
+    m_ = overlay.apply()
+    assert m_ is not m
+    assert m_.headers == dict(headers, **{'X-Token': 'token'})
+    assert m_.params == {'page': 1}
+    assert m_.auth == ('user', 'password')
+    assert m_.body == {'a': 1, 'b': 2}
+    assert m.headers == headers
+    assert m.body == {'a': 1}
+    assert m.params is None
+    assert m.auth is None
+
+
+class CountCopies(unit.Get):
+    copies = 0
+
+    def __copy__(self):
+        CountCopies.copies += 1
+        m = CountCopies.__new__(CountCopies)
+        m.__dict__.update(self.__dict__)
+        return m
+
+
+def test_pipeline_copy_once():
+    def header(name):
+        def mdw(m):
+            m.headers[name] = name
+        return mdw
+
+    pipeline = middleware.Pipeline(mdws_cow=[header(str(i)) for i in range(5)])
+    m = CountCopies()
+    m_ = pipeline(m)
+    assert m_ is not m
+    assert m_.headers == {str(i): str(i) for i in range(5)}
+    assert m.headers is None
+    assert CountCopies.copies == 1
+
+
+
+@pytest.mark.asyncio
+async def test_pipeline_async_copy_once():
+    async def amdw(m):
+        m.params['async'] = '1'
+
+    CountCopies.copies = 0
+    pipeline = middleware.Pipeline(mdws_cow=[lambda m: m.headers.update(sync='1')], amdws=[amdw, amdw])
+    m_ = await pipeline.arun(CountCopies())
+    assert (m_.headers, m_.params) == ({'sync': '1'}, {'async': '1'})
+    assert CountCopies.copies == 1
+
+def test_pipeline_empty():
+    pipeline = middleware.Pipeline()
+    m = unit.Get()
+    assert pipeline(m) is m
+
+
+def test_mdws_cow_with_mdws():
+    with pytest.raises(AssertionError):
+        http.Client(unit.fake_url, mdws=[], mdws_cow=[])
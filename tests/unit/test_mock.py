@@ -1,9 +1,14 @@
+import asyncio
 import io
+import json
+import time
+import tracemalloc
 
 import pytest
+import requests
 
 import tests
-from clients import http
+from clients import balancer, breaker, cache, compression, deadline, http, metrics, ratelimit
 from tests.server import client
 
 
@@ -60,3 +65,310 @@ async def test_file_sync_response():
     resp, status_code = client_.request(m)
     assert status_code == 200
     assert type(resp) == bytes
+
+
+def test_cache_max_age():
+    client_ = http.Client(f'http://localhost:{tests.port}', cache=cache.LRUCache())
+    for _ in range(3):
+        resp, status_code = client_.request(client.Cache())
+        assert status_code == 200
+        assert resp == {'success': True}
+    assert client_.cache_stats == cache.CacheStats(hits=2, misses=1, revalidations=0)
+
+
+def test_cache_revalidation(tmp_path):
+    client_ = http.Client(f'http://localhost:{tests.port}', cache=cache.FileCache(str(tmp_path)))
+    for _ in range(3):
+        resp, status_code = client_.request(client.Cache(cache_control='no-cache'))
+        assert status_code == 200
+        assert resp == {'success': True}
+    assert client_.cache_stats == cache.CacheStats(hits=0, misses=1, revalidations=2)
+
+
+class NotCached(client.Cache):
+    cache = False
+
+
+@pytest.mark.asyncio
+async def test_async_cache():
+    client_ = http.AsyncClient(f'http://localhost:{tests.port}', cache=cache.AsyncCache(ttl=0))
+    for _ in range(3):
+        resp, status_code = await client_.request(client.Cache(cache_control='no-cache'))
+        assert status_code == 200
+        assert resp == {'success': True}
+    resp, status_code = await client_.request(NotCached())
+    assert status_code == 200
+    assert client_.cache.stats == cache.AsyncCacheStats(hits=0, stale_hits=0, misses=1, revalidations=2,
+                                                        refresh_errors=0)
+    await client_.resolve()
+
+
+def test_stream_sync_response():
+    client_ = http.Client(f'http://localhost:{tests.port}')
+    size = 16 * 1024 * 1024
+    tracemalloc.start()
+    resp, status_code = client_.request(client.Download(size))
+    assert status_code == 200
+    assert isinstance(resp, http.StreamResponse)
+    assert resp.headers['Content-Type'] == 'application/octet-stream'
+    received = sum(len(chunk) for chunk in resp.iter_content(64 * 1024))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert received == size
+    assert peak < size / 8
+
+
+@pytest.mark.asyncio
+async def test_stream_async_response():
+    client_ = http.AsyncClient(f'http://localhost:{tests.port}')
+    size = 16 * 1024 * 1024
+    tracemalloc.start()
+    resp, status_code = await client_.request(client.Download(size))
+    assert status_code == 200
+    assert isinstance(resp, http.AsyncStreamResponse)
+    received = 0
+    async for chunk in resp:
+        received += len(chunk)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert received == size
+    assert peak < size / 8
+    assert client_.pool_stats.idle == 1
+    await client_.resolve()
+
+
+@pytest.mark.asyncio
+async def test_stream_per_call():
+    client_ = http.AsyncClient(f'http://localhost:{tests.port}')
+    async with (await client_.request(client.AsyncFileResponse(io.StringIO('123a')), stream=True))[0] as resp:
+        assert resp.status == 200
+        assert b''.join([chunk async for chunk in resp.iter_chunked(2)]) == b'123a'
+    await client_.resolve()
+    client_ = http.Client(f'http://localhost:{tests.port}')
+    resp, status_code = client_.request(client.SyncFileResponse(io.StringIO('123a')), stream=True)
+    assert status_code == 200
+    with resp:
+        assert b''.join(resp.iter_content(2)) == b'123a'
+
+
+def chunks(count, size=1024):
+    for _ in range(count):
+        yield b'0' * size
+
+
+def test_upload_sync(tmp_path):
+    path = tmp_path / 'file.bin'
+    path.write_bytes(b'0' * 100000)
+    client_ = http.Client(f'http://localhost:{tests.port}')
+    resp, status_code = client_.request(client.Upload(path))
+    assert resp == {'size': 100000, 'content_length': '100000', 'chunked': False}
+    resp, status_code = client_.request(client.Upload(chunks(10)))
+    assert resp == {'size': 10240, 'content_length': None, 'chunked': True}
+    resp, status_code = client_.request(client.SyncFileRequest(path))
+    assert status_code == 200
+    resp, status_code = client_.request(client.SyncFileRequest(chunks(10)))
+    assert status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_upload_async(tmp_path):
+    path = tmp_path / 'file.bin'
+    path.write_bytes(b'0' * 100000)
+
+    async def async_chunks(count, size=1024):
+        for chunk in chunks(count, size):
+            yield chunk
+
+    client_ = http.AsyncClient(f'http://localhost:{tests.port}')
+    resp, status_code = await client_.request(client.Upload(path))
+    assert resp == {'size': 100000, 'content_length': '100000', 'chunked': False}
+    resp, status_code = await client_.request(client.Upload(chunks(10)))
+    assert resp == {'size': 10240, 'content_length': None, 'chunked': True}
+    resp, status_code = await client_.request(client.Upload(async_chunks(10)))
+    assert resp == {'size': 10240, 'content_length': None, 'chunked': True}
+    for content in [path, chunks(10), async_chunks(10)]:
+        resp, status_code = await client_.request(client.AsyncFileRequest(content))
+        assert status_code == 200
+    await client_.resolve()
+
+
+def test_breaker_sync():
+    breakers = breaker.Breakers(min_calls=3, open_timeout=0.2)
+    client_ = http.Client(f'http://localhost:{tests.port}', breakers=breakers)
+    for _ in range(3):
+        resp, status_code = client_.request(client.Flaky(status=503))
+        assert status_code == 503
+    with pytest.raises(breaker.CircuitOpenException):
+        client_.request(client.Flaky())
+    assert breakers.states[(client_.endpoint, client.Flaky)].state == breaker.OPEN
+    time.sleep(0.2)
+    resp, status_code = client_.request(client.Flaky())
+    assert status_code == 200
+    assert breakers.states[(client_.endpoint, client.Flaky)].state == breaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_breaker_async():
+    breakers = breaker.Breakers(min_calls=2, slow_call_duration=0.1, open_timeout=0.2)
+    client_ = http.AsyncClient(f'http://localhost:{tests.port}', breakers=breakers)
+    for _ in range(2):
+        resp, status_code = await client_.request(client.Flaky(delay=0.15))
+        assert status_code == 200
+    with pytest.raises(breaker.CircuitOpenException):
+        await client_.request(client.Flaky())
+    resp, status_code = await client_.request(client.Get())
+    assert status_code == 200
+    await asyncio.sleep(0.2)
+    resp, status_code = await client_.request(client.Flaky(status=500))
+    assert status_code == 500
+    assert breakers.states[(client_.endpoint, client.Flaky)].state == breaker.OPEN
+    await client_.resolve()
+
+
+def test_timeout_sync():
+    client_ = http.Client(f'http://localhost:{tests.port}', timeout=deadline.Timeout(read=0.1))
+    with pytest.raises(http.RequestTimeoutException):
+        client_.request(client.Flaky(delay=0.5))
+    resp, status_code = client_.request(client.Flaky())
+    assert status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_timeout_async():
+    client_ = http.AsyncClient(f'http://localhost:{tests.port}')
+    with deadline.deadline(0.1):
+        with pytest.raises(http.RequestTimeoutException):
+            await client_.request(client.Flaky(delay=0.5))
+    resp, status_code = await client_.request(client.Flaky())
+    assert status_code == 200
+    await client_.resolve()
+
+
+def test_metrics_sync():
+    metrics_ = metrics.Metrics()
+    client_ = http.Client(f'http://localhost:{tests.port}', metrics=metrics_)
+    client_.request(client.Get())
+    client_.request(client.Raise())
+    client_.request(client.Upload(b'0' * 1000))
+    text = metrics_.render()
+    assert f'http_client_requests_total{{endpoint="{client_.endpoint}",method="Get",status="200"}} 1' in text
+    assert f'http_client_requests_total{{endpoint="{client_.endpoint}",method="Raise",status="400"}} 1' in text
+    assert f'http_client_sent_bytes_total{{endpoint="{client_.endpoint}",method="Upload"}} 1000' in text
+    assert f'http_client_request_duration_seconds_count{{endpoint="{client_.endpoint}",method="Get"}} 1' in text
+
+
+@pytest.mark.asyncio
+async def test_metrics_async():
+    metrics_ = metrics.Metrics()
+    client_ = http.AsyncClient(f'http://localhost:{tests.port}', metrics=metrics_)
+    await client_.request(client.Get())
+    await client_.request(client.Upload(b'0' * 1000))
+    failed = http.AsyncClient('http://localhost:1', metrics=metrics_)
+    with pytest.raises(http.RequestException):
+        await failed.request(client.Get())
+    await failed.resolve()
+    text = metrics_.render()
+    assert f'http_client_requests_total{{endpoint="{client_.endpoint}",method="Get",status="200"}} 1' in text
+    assert f'http_client_sent_bytes_total{{endpoint="{client_.endpoint}",method="Upload"}} 1000' in text
+    assert 'http_client_errors_total{endpoint="http://localhost:1",method="Get",error="RequestException"} 1' in text
+    assert f'http_client_pool_connections{{endpoint="{client_.endpoint}",state="idle"}} 1' in text
+    await client_.resolve()
+
+
+def test_rate_limit_sync():
+    limits = ratelimit.RateLimits(rate=20, burst=1)
+    client_ = http.Client(f'http://localhost:{tests.port}', rate_limits=limits)
+    start = time.monotonic()
+    for _ in range(3):
+        resp, status_code = client_.request(client.Get())
+        assert status_code == 200
+    assert time.monotonic() - start >= 0.095
+    assert client_.rate_limit_stats[None].throttled == 2
+    time.sleep(0.05)
+    with deadline.deadline(0.01):
+        client_.request(client.Get())
+        with pytest.raises(http.RequestTimeoutException):
+            client_.request(client.Get())
+
+
+class Limited(client.Get):
+    rate_limit = ratelimit.TokenBucket(rate=20, burst=1)
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_async():
+    client_ = http.AsyncClient(f'http://localhost:{tests.port}')
+    start = time.monotonic()
+    results = await asyncio.gather(*(client_.request(Limited()) for _ in range(3)))
+    assert [status_code for _, status_code in results] == [200] * 3
+    assert time.monotonic() - start >= 0.095
+    assert Limited.rate_limit.stats.throttled == 2
+    assert client_.rate_limit_stats is None
+    await client_.resolve()
+
+
+def test_balancer_sync():
+    lb = balancer.Balancer([f'http://localhost:{tests.port}', 'http://localhost:1'], max_failures=1)
+    client_ = http.Client(lb)
+    failed = 0
+    for _ in range(10):
+        try:
+            resp, status_code = client_.request(client.Get())
+            assert status_code == 200
+        except requests.ConnectionError:
+            failed += 1
+    assert failed <= 1
+    stats = client_.balancer_stats
+    assert stats['http://localhost:1'].ejected
+    assert stats[f'http://localhost:{tests.port}'].requests >= 9
+
+
+@pytest.mark.asyncio
+async def test_balancer_async():
+    lb = balancer.Balancer([f'http://localhost:{tests.port}', 'http://localhost:1'], probe='/method',
+                           probe_interval=0.05)
+    metrics_ = metrics.Metrics()
+    client_ = http.AsyncClient(lb, metrics=metrics_)
+    try:
+        await client_.request(client.Flaky())
+    except http.RequestException:
+        pass
+    await asyncio.sleep(0.05)
+    assert client_.balancer_stats['http://localhost:1'].ejected
+    for _ in range(5):
+        resp, status_code = await client_.request(client.Get())
+        assert status_code == 200
+    text = metrics_.render()
+    assert f'http_client_requests_total{{endpoint="http://localhost:{tests.port}",method="Get",status="200"}} 5' in text
+    assert 'http_client_endpoint_ejected{endpoint="http://localhost:1"} 1' in text
+    await client_.resolve()
+
+
+def test_compression_sync():
+    client_ = http.Client(f'http://localhost:{tests.port}', compression=compression.Compression(threshold=100))
+    body = [{'id': i} for i in range(100)]
+    resp, status_code = client_.request(client.Decompress(body))
+    assert resp['encoding'] == 'gzip' and resp['body'] == body
+    assert resp['size'] < len(json.dumps(body))
+    resp, status_code = client_.request(client.Decompress(body, compress=False))
+    assert resp['encoding'] is None and resp['body'] == body
+    resp, status_code = client_.request(client.Decompress([1]))
+    assert resp['encoding'] is None
+    resp, status_code = client_.request(client.Compressed(1000, stream=True))
+    assert resp.headers['Content-Encoding'] == compression.requests_encodings()[0]
+    assert len(json.loads(b''.join(resp.iter_content(1024)))) == 1000
+
+
+@pytest.mark.asyncio
+async def test_compression_async():
+    c = compression.Compression(encoding=compression.DEFLATE, threshold=100, accept=[compression.GZIP])
+    client_ = http.AsyncClient(f'http://localhost:{tests.port}', compression=c)
+    body = [{'id': i} for i in range(100)]
+    resp, status_code = await client_.request(client.Decompress(body))
+    assert resp['encoding'] == 'deflate' and resp['body'] == body
+    resp, status_code = await client_.request(client.Compressed(1000))
+    assert len(resp) == 1000
+    resp, status_code = await client_.request(client.Compressed(1000, stream=True))
+    assert resp.headers['Content-Encoding'] == 'gzip'
+    assert len(json.loads(b''.join([chunk async for chunk in resp]))) == 1000
+    await client_.resolve()
@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from clients import ratelimit
+
+
+def test_burst():
+    bucket = ratelimit.TokenBucket(rate=10, burst=3)
+    assert [bucket.reserve() for _ in range(3)] == [0., 0., 0.]
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    assert bucket.wait_time == pytest.approx(0.2, abs=0.01)
+    stats = bucket.stats
+    assert (stats.acquired, stats.throttled) == (4, 1)
+
+
+def test_refill():
+    bucket = ratelimit.TokenBucket(rate=100, burst=1)
+    bucket.reserve()
+    assert bucket.wait_time > 0
+    time.sleep(0.02)
+    assert bucket.wait_time == 0.
+
+
+def test_timeout():
+    bucket = ratelimit.TokenBucket(rate=10, burst=1)
+    bucket.reserve()
+    assert bucket.acquire(timeout=0.01) is None
+    assert bucket.stats.acquired == 1
+    assert bucket.acquire(timeout=0.2) == pytest.approx(0.1, abs=0.01)
+
+
+def test_threads():
+    bucket = ratelimit.TokenBucket(rate=100, burst=1)
+    start = time.monotonic()
+    threads = [threading.Thread(target=bucket.acquire) for _ in range(11)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert time.monotonic() - start >= 0.095
+    assert bucket.stats.throttled == 10
+
+
+@pytest.mark.asyncio
+async def test_async():
+    bucket = ratelimit.TokenBucket(rate=100, burst=2)
+    ticks = []
+
+    async def tick():
+        while True:
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.005)
+
+    ticker = asyncio.ensure_future(tick())
+    start = time.monotonic()
+    await asyncio.gather(*(bucket.acquire_async() for _ in range(7)))
+    ticker.cancel()
+    assert time.monotonic() - start >= 0.045
+    # loop is not blocked while requests wait
+    assert len(ticks) >= 5
+
+
+class Clock:
+    """
+    Fake time of ratelimit: it is not changed while test runs
+    """
+    now = 1000.
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_async_cancel(monkeypatch):
+    monkeypatch.setattr(ratelimit, 'time', Clock())
+    bucket = ratelimit.TokenBucket(rate=10, burst=1)
+    bucket.reserve()
+    task = asyncio.ensure_future(bucket.acquire_async())
+    await asyncio.sleep(0)
+    assert bucket.wait_time == pytest.approx(0.2)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    # tokens of cancelled request are returned
+    assert bucket.wait_time == pytest.approx(0.1)
+
+
+def test_rate_limits():
+    class A:
+        pass
+
+    class B:
+        pass
+
+    per_client = ratelimit.RateLimits(rate=1)
+    assert per_client.get('a', A) is per_client.get('b', B)
+    per_endpoint = ratelimit.RateLimits(rate=1, per=ratelimit.ENDPOINT)
+    assert per_endpoint.get('a', A) is per_endpoint.get('a', B)
+    assert per_endpoint.get('a', A) is not per_endpoint.get('b', A)
+    per_method = ratelimit.RateLimits(rate=1, per=ratelimit.METHOD)
+    assert per_method.get('a', A) is per_method.get('b', A)
+    assert per_method.get('a', A) is not per_method.get('a', B)
+    per_method.get('a', A).reserve()
+    assert per_method.stats[A].acquired == 1
+    assert {labels['key'] for _, _, labels, _ in per_method.gauges()} == {'A', 'B'}
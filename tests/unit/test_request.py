@@ -1,10 +1,14 @@
+import concurrent.futures
 import copy
+import gc
+import time
+import weakref
 from pathlib import Path
 import pytest
 from loguru import logger
 
 from tests import unit, port
-from clients import http
+from clients import codec, http
 
 req = http.requests
 
@@ -18,6 +22,7 @@ class Response:
         self.response = response
         self.status_code = status_code
         self.content = content
+        self.headers = {'Content-Type': 'application/json'}
 
     def json(self):
         return {'response': self.response}
@@ -31,6 +36,15 @@ class MockRequests:
     def __failure(self):
         raise TestException()
 
+    def Session(self):
+        return self
+
+    def mount(self, prefix, adapter):
+        pass
+
+    def close(self):
+        pass
+
     def get(self, **args):
         if self.failure:
             self.__failure()
@@ -314,3 +328,287 @@ def test_request_mdws_nc_not_copy():
     assert resp == {}
     assert unit.Get().__dict__ != m.__dict__
     assert status_code == 204
+
+
+def middleware_cow(m):
+    m.headers['test'] = 'test'
+
+
+def test_request_mdws_cow():
+    # Mock requests
+    http.requests = MockRequests(resp=None, code=204, content='')
+
+    client = http.Client(unit.fake_url, mdws_cow=[middleware_cow])
+    m = unit.Get()
+    resp, status_code = client.request(m)
+    assert resp == {}
+    assert unit.Get().__dict__ == m.__dict__
+    assert status_code == 204
+
+
+def test_request_hooks():
+    # Mock requests
+    http.requests = MockRequests(resp=None, code=204, content='')
+    infos = []
+
+    client = http.Client(unit.fake_url, hooks=[infos.append])
+    m = unit.Get()
+    client.request(m)
+    assert len(infos) == 1
+    assert infos[0].method is m
+    assert infos[0].status == 204
+
+
+def test_request_async_hooks():
+    async def hook(info):
+        pass
+
+    with pytest.raises(AssertionError):
+        http.Client(unit.fake_url, hooks=[hook])
+
+
+def test_session_reused():
+    http.requests = req
+
+    client = http.Client(unit.fake_url)
+    assert client.session is client.session
+    assert client.session.get_adapter('https://ed.cba') is client.session.get_adapter('http://ed.cba')
+    client.close()
+
+
+def test_session_thread_safe():
+    import threading
+    http.requests = req
+
+    client = http.Client(unit.fake_url, thread_safe=True, pool_maxsize=2, pool_block=True)
+    sessions = []
+    threads = [threading.Thread(target=lambda: sessions.append(client.session)) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sessions[0] is not sessions[1]
+    assert sessions[0].get_adapter(unit.fake_url) is sessions[1].get_adapter(unit.fake_url)
+    assert client.session is client.session
+    client.close()
+
+
+class SessionsRequests(MockRequests):
+    def __init__(self):
+        MockRequests.__init__(self, resp=None, content='', code=204)
+        self.sessions = weakref.WeakSet()
+
+    def Session(self):
+        session = MockRequests(resp=None, content='', code=204)
+        self.sessions.add(session)
+        return session
+
+
+def test_session_of_finished_thread():
+    import threading
+    http.requests = SessionsRequests()
+
+    client = http.Client(unit.fake_url, thread_safe=True)
+    for _ in range(20):
+        thread = threading.Thread(target=client.request, args=(unit.Get(),))
+        thread.start()
+        thread.join()
+    gc.collect()
+    # the last finished thread keeps session till the next session is created
+    assert len(http.requests.sessions) == 1
+    client.close()
+
+
+def test_session_context_manager():
+    http.requests = req
+
+    with http.Client(f"http://localhost:{port}") as client:
+        resp, status_code = client.request(unit.DataDict({"data1": "data1", "data2": 12345, "data3": False}))
+        assert status_code == 200
+        resp, status_code = client.request(unit.DataDict({"data1": "data1", "data2": 12345, "data3": False}))
+        assert status_code == 200
+
+
+class SlowRequests(MockRequests):
+    def __init__(self, resp, content, code, delays):
+        MockRequests.__init__(self, resp=resp, content=content, code=code)
+        self.delays = delays
+
+    def get(self, **args):
+        time.sleep(self.delays['get'])
+        return self.response
+
+    def post(self, **args):
+        time.sleep(self.delays['post'])
+        return self.response
+
+
+def test_request_many():
+    # Mock requests
+    http.requests = SlowRequests(resp=None, code=204, content='', delays={'get': 0.05, 'post': 0})
+
+    client = http.Client(unit.fake_url)
+    start = time.monotonic()
+    results = client.request_many([unit.Get(), unit.Post(), unit.GetWithBody(), unit.Undefined()] * 4, workers=8)
+    assert time.monotonic() - start < 0.15
+    assert results[0] == ({}, 204)
+    assert results[1] == ({}, 204)
+    assert isinstance(results[2], AssertionError)
+    assert isinstance(results[3], NotImplementedError)
+    assert len(results) == 16
+
+
+def test_request_many_timeout():
+    # Mock requests
+    http.requests = SlowRequests(resp=None, code=204, content='', delays={'get': 0.2, 'post': 0})
+
+    client = http.Client(unit.fake_url)
+    results = client.request_many([unit.Post(), unit.Get(), unit.Get(), unit.Get()], workers=2, timeout=0.1)
+    assert results[0] == ({}, 204)
+    assert all(isinstance(r, concurrent.futures.TimeoutError) for r in results[1:])
+
+
+def test_request_many_reuses_threads():
+    import threading
+    http.requests = SessionsRequests()
+
+    client = http.Client(unit.fake_url, thread_safe=True)
+    for _ in range(50):
+        assert client.request_many([unit.Get()] * 4, workers=4) == [({}, 204)] * 4
+    gc.collect()
+    assert len(http.requests.sessions) <= 4
+    threads = threading.active_count()
+    client.request_many([unit.Get()] * 4, workers=4)
+    assert threading.active_count() == threads
+    client.close()
+
+
+class PathArgs(http.Method):
+    url_ = '/%s/%s'
+    m_type = 'post'
+    count = 2
+
+
+def test_plan():
+    assert unit.Get().plan is unit.Get().plan
+    assert unit.Post().plan is not unit.Get().plan
+    assert unit.DataDict({}).plan.content_type == 'application/json'
+    assert PathArgs(1, 2).plan.m_type == 'POST'
+    assert unit.File().plan.verb == 'post'
+    assert unit.File().plan.multipart
+    m = unit.Get()
+    m.m_type = 'DELETE'
+    assert m.plan.verb == 'delete'
+    assert unit.Get().plan.verb == 'get'
+
+
+def test_url_cache():
+    m = PathArgs(1, 2)
+    assert m.url == '/1/2'
+    assert m.url is m.url
+    m.url_ = '/v2/%s/%s'
+    assert m.url == '/v2/1/2'
+
+
+class CountCodec(codec.JsonCodec):
+    def __init__(self):
+        self.count = 0
+
+    def dumps(self, obj):
+        self.count += 1
+        return codec.JsonCodec.dumps(self, obj)
+
+
+@pytest.mark.asyncio
+async def test_body_encoded_per_request():
+    count_codec = CountCodec()
+    client = http.AsyncClient(unit.fake_url, codecs=codec.Codecs({codec.JSON: count_codec}))
+    session = unit.Session()
+    client._AsyncClient__session = session
+    m = unit.DataDict({'page': 0})
+    await client.request(m)
+    assert session.kwargs['data'] == '{"page": 0}'
+    m.body['page'] = 1
+    await client.request(m)
+    assert session.kwargs['data'] == '{"page": 1}'
+    assert count_codec.count == 2
+
+
+def test_plan_of_object_compiled_once(monkeypatch):
+    compiled = []
+    compile_plan = http.compile_plan
+    monkeypatch.setattr(http, 'compile_plan', lambda *args: compiled.append(args) or compile_plan(*args))
+    monkeypatch.setattr(http, 'requests', unit.Session())
+    client = http.Client(unit.fake_url)
+    m = unit.DataDict({'a': 1})
+    m.headers = {'Content-Type': 'application/json'}
+    for _ in range(3):
+        client.request(m)
+    assert m.plan.content_type == 'application/json'
+    assert len(compiled) == 1
+    m.headers = {}
+    assert m.plan.content_type is None
+    assert len(compiled) == 2
+
+
+class CompactGet(http.CompactMethod):
+    url_ = '/'
+    m_type = 'GET'
+
+
+class CompactDataDict(http.CompactMethod):
+    url_ = "/datadict"
+    m_type = "POST"
+    headers = {
+        'Content-Type': 'application/json',
+        'accept': 'application/json',
+    }
+
+    def __init__(self, data):
+        http.CompactMethod.__init__(self)
+        self.body = data
+
+
+def test_compact_method_slots():
+    class Page(CompactGet):
+        __slots__ = ('page',)
+
+        def __init__(self, page):
+            CompactGet.__init__(self)
+            self.page = page
+
+    assert Page(2).page == 2
+    with pytest.raises(AttributeError):
+        CompactGet().page = 2
+
+
+def test_compact_method():
+    m = CompactDataDict({'a': 1})
+    assert not hasattr(m, '__dict__')
+    assert m.headers is CompactDataDict.class_attr('headers')
+    assert m.params is None
+    assert m.url == '/datadict'
+    assert m.content_type == 'application/json'
+    assert m.body_ == '{"a": 1}'
+    with pytest.raises(AttributeError):
+        m.undefined = 1
+    m.headers = {'test': 'test'}
+    assert m.content_type is None
+    assert CompactDataDict({}).headers['accept'] == 'application/json'
+
+
+def test_compact_method_request():
+    # Mock requests
+    http.requests = MockRequests(resp=None, code=204, content='')
+
+    client = http.Client(unit.fake_url, mdws=[middleware])
+    m = CompactGet()
+    resp, status_code = client.request(m)
+    assert resp == {}
+    assert status_code == 204
+    assert m.headers is None
+
+    http.requests = req
+    client = http.Client(f"http://localhost:{port}")
+    resp, status_code = client.request(CompactDataDict({"data1": "data1", "data2": 12345, "data3": False}))
+    assert resp == {'success': True}
@@ -0,0 +1,110 @@
+import email.utils
+import time
+
+import aiohttp
+import pytest
+import requests
+
+from clients import http, retry
+from tests import unit
+
+
+def test_backoff_full_jitter():
+    policy = retry.Retry(backoff=0.1, max_backoff=0.5)
+    for i in range(5):
+        assert 0 <= policy.backoff_delay(i) <= min(0.5, 0.1 * 2 ** i)
+
+
+def test_retry_after():
+    policy = retry.Retry(max_retry_after=10)
+    assert policy.delay(0, 503, {'Retry-After': '2'}) == 2
+    date = email.utils.formatdate(time.time() + 5, usegmt=True)
+    assert 3 < policy.delay(0, 429, {'Retry-After': date}) <= 5
+    assert policy.delay(0, 429, {'Retry-After': '20'}) is None
+    assert policy.delay(0, 502, {'Retry-After': '20'}) <= 0.1
+
+
+def test_allows():
+    policy = retry.Retry()
+    assert policy.allows('get')
+    assert not policy.allows('POST')
+    assert not retry.NEVER.allows('GET')
+
+
+def test_budget():
+    budget = retry.RetryBudget(ratio=0.5, min_tokens=1, max_tokens=2)
+    assert budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    budget.deposit()
+    assert budget.withdraw()
+
+
+@pytest.mark.asyncio
+async def test_async_retry_error():
+    client = http.AsyncClient(unit.fake_url, retry=retry.Retry(backoff=0.01))
+    client._AsyncClient__session = unit.Session(aiohttp.ClientConnectionError(), unit.Response(200))
+    resp, status_code = await client.request(unit.Get())
+    assert status_code == 200
+    assert client.retry_stats == retry.RetryStats(attempts=2, retries=1, give_ups=0, budget_exhausted=0)
+
+
+@pytest.mark.asyncio
+async def test_async_retry_status():
+    client = http.AsyncClient(unit.fake_url, retry=retry.Retry(attempts=2))
+    first = unit.Response(503, {'Retry-After': '0'})
+    client._AsyncClient__session = unit.Session(first, unit.Response(503, {'Retry-After': '0'}))
+    resp, status_code = await client.request(unit.Get())
+    assert status_code == 503
+    assert first.released
+    assert client.retry_stats == retry.RetryStats(attempts=2, retries=1, give_ups=1, budget_exhausted=0)
+
+
+@pytest.mark.asyncio
+async def test_async_not_idempotent():
+    client = http.AsyncClient(unit.fake_url, retry=retry.Retry(backoff=0.01))
+    session = unit.Session(aiohttp.ClientConnectionError(), unit.Response(200))
+    client._AsyncClient__session = session
+    with pytest.raises(http.RequestException):
+        await client.request(unit.Post())
+    assert session.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_async_method_retry():
+    class NoRetry(unit.Get):
+        retry = retry.NEVER
+
+    client = http.AsyncClient(unit.fake_url, retry=retry.Retry(backoff=0.01))
+    client._AsyncClient__session = unit.Session(aiohttp.ClientConnectionError(), unit.Response(200))
+    with pytest.raises(http.RequestException):
+        await client.request(NoRetry())
+
+
+@pytest.mark.asyncio
+async def test_async_budget():
+    client = http.AsyncClient(unit.fake_url, retry=retry.Retry(backoff=0.01, attempts=5),
+                              retry_budget=retry.RetryBudget(ratio=0.1, min_tokens=1))
+    client._AsyncClient__session = unit.Session(aiohttp.ClientConnectionError())
+    with pytest.raises(http.RequestException):
+        await client.request(unit.Get())
+    assert client.retry_stats == retry.RetryStats(attempts=2, retries=1, give_ups=1, budget_exhausted=1)
+
+
+def test_sync_retry(monkeypatch):
+    session = unit.Session(requests.ConnectionError(), unit.Response(502), unit.Response(200))
+    monkeypatch.setattr(http, 'requests', session)
+    client = http.Client(unit.fake_url, retry=retry.Retry(backoff=0.01))
+    resp, status_code = client.request(unit.Get())
+    assert status_code == 200
+    assert session.calls == 3
+    assert client.retry_stats.retries == 2
+
+
+def test_sync_no_retry(monkeypatch):
+    session = unit.Session(requests.ConnectionError(), unit.Response(200))
+    monkeypatch.setattr(http, 'requests', session)
+    client = http.Client(unit.fake_url)
+    with pytest.raises(requests.ConnectionError):
+        client.request(unit.Get())
+    assert client.retry_stats == retry.RetryStats(attempts=1, retries=0, give_ups=0, budget_exhausted=0)
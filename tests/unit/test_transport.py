@@ -0,0 +1,124 @@
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+import tests
+from clients import compression, deadline, http, metrics, retry, transport
+from tests.server import client
+
+pytestmark = pytest.mark.skipif(transport.httpx is None, reason='httpx is not installed')
+
+ENDPOINT = f'http://localhost:{tests.port}'
+
+
+@pytest.mark.asyncio
+async def test_async():
+    metrics_ = metrics.Metrics()
+    client_ = http.AsyncClient(ENDPOINT, transport=transport.Http2AsyncTransport(), metrics=metrics_)
+    assert await client_.request(client.Get()) == ({'success': True}, 200)
+    resp, status_code = await client_.request(client.Upload(b'0' * 1000))
+    assert resp['size'] == 1000
+    resp, status_code = await client_.request(client.Raise())
+    assert status_code == 400
+    resp, status_code = await client_.request(client.Download(100000))
+    async with resp:
+        size = sum([len(chunk) async for chunk in resp])
+    assert size == 100000
+    with pytest.raises(http.RequestTimeoutException):
+        with deadline.deadline(0.1):
+            await client_.request(client.Flaky(delay=0.5))
+    assert f'http_client_sent_bytes_total{{endpoint="{ENDPOINT}",method="Upload"}} 1000' in metrics_.render()
+    await client_.resolve()
+    # transport is opened again after resolve
+    assert await client_.request(client.Get()) == ({'success': True}, 200)
+    await client_.resolve()
+
+
+@pytest.mark.asyncio
+async def test_async_compression():
+    transport_ = transport.Http2AsyncTransport()
+    client_ = http.AsyncClient(ENDPOINT, transport=transport_, compression=compression.Compression())
+    resp, status_code = await client_.request(client.Compressed(1000, stream=True))
+    assert resp.headers['Content-Encoding'] == transport_.encodings[0]
+    assert len(json.loads(b''.join([chunk async for chunk in resp]))) == 1000
+    await client_.resolve()
+
+
+@pytest.mark.asyncio
+async def test_async_errors():
+    client_ = http.AsyncClient('http://localhost:1', transport=transport.Http2AsyncTransport(),
+                               retry=retry.Retry(attempts=2, backoff=0.))
+    with pytest.raises(http.RequestException):
+        await client_.request(client.Get())
+    assert client_.retry_stats.retries == 1
+    with pytest.raises(http.RequestException, match='multipart'):
+        await client_.request(client.AsyncFileRequest(b'0'))
+    await client_.resolve()
+
+
+def test_sync():
+    metrics_ = metrics.Metrics()
+    client_ = http.Client(ENDPOINT, transport=transport.Http2Transport(), metrics=metrics_, thread_safe=True)
+    assert client_.request(client.Get()) == ({'success': True}, 200)
+    resp, status_code = client_.request(client.Upload(b'0' * 1000))
+    assert resp['size'] == 1000
+    resp, status_code = client_.request(client.Download(100000))
+    with resp:
+        assert sum(len(chunk) for chunk in resp.iter_content()) == 100000
+    assert client_.request_many([client.Get()] * 4, workers=4) == [({'success': True}, 200)] * 4
+    timed = http.Client(ENDPOINT, transport=client_.transport, timeout=deadline.Timeout(read=0.1))
+    with pytest.raises(http.RequestTimeoutException):
+        timed.request(client.Flaky(delay=0.5))
+    assert f'http_client_requests_total{{endpoint="{ENDPOINT}",method="Get",status="200"}} 5' in metrics_.render()
+    client_.close()
+    assert client_.request(client.Get()) == ({'success': True}, 200)
+    client_.close()
+
+
+@pytest.fixture(scope='module')
+def h2c_endpoint():
+    pytest.importorskip('hypercorn')
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.getcwd(), os.environ.get('PYTHONPATH')])))
+    process = subprocess.Popen([sys.executable, '-m', 'hypercorn', 'tests.server.mock_server:app', '--bind',
+                                f'127.0.0.1:{port}'], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        for _ in range(100):
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        yield f'http://127.0.0.1:{port}'
+    finally:
+        process.terminate()
+        process.wait()
+
+
+@pytest.mark.asyncio
+async def test_async_h2c(h2c_endpoint):
+    transport_ = transport.Http2AsyncTransport(prior_knowledge=True, max_connections=1)
+    resp = await transport_.request('get', f'{h2c_endpoint}/method')
+    assert resp.http_version == 'HTTP/2'
+    assert await resp.read() == b'{"success":true}'
+    client_ = http.AsyncClient(h2c_endpoint, transport=transport_)
+    results = await asyncio.gather(*(client_.request(client.Json(2)) for _ in range(20)))
+    assert {status_code for _, status_code in results} == {200}
+    await client_.resolve()
+
+
+def test_sync_h2c(h2c_endpoint):
+    transport_ = transport.Http2Transport(prior_knowledge=True)
+    resp = transport_.get(url=f'{h2c_endpoint}/method')
+    assert resp.http_version == 'HTTP/2'
+    client_ = http.Client(h2c_endpoint, transport=transport_)
+    assert client_.request(client.Get()) == ({'success': True}, 200)
+    client_.close()
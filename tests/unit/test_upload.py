@@ -0,0 +1,36 @@
+import io
+
+from clients import upload
+
+
+def test_size_of(tmp_path):
+    path = tmp_path / 'file.bin'
+    path.write_bytes(b'12345')
+    assert upload.size_of(path) == 5
+    assert upload.size_of(b'123') == 3
+    assert upload.size_of('ы') == 2
+    with open(path, 'rb') as f:
+        f.read(2)
+        assert upload.size_of(f) == 3
+    assert upload.size_of(io.BytesIO(b'1234')) == 4
+    assert upload.size_of(io.StringIO('1234')) is None
+    assert upload.size_of(iter([b'1'])) is None
+
+
+def test_multipart_encoder(tmp_path):
+    path = tmp_path / 'file.bin'
+    path.write_bytes(b'12345')
+    encoder = upload.MultipartEncoder([('a', path), ('b', ('name.txt', io.BytesIO(b'678'), 'text/plain'))],
+                                      fields={'c': 1}, chunk_size=2)
+    body = b''.join(encoder)
+    assert encoder.len == len(body)
+    assert f'--{encoder.boundary}--\r\n'.encode() == body[-len(encoder.boundary) - 6:]
+    assert b'name="a"; filename="file.bin"\r\n\r\n12345\r\n' in body
+    assert b'name="b"; filename="name.txt"\r\nContent-Type: text/plain\r\n\r\n678\r\n' in body
+    assert b'name="c"\r\n\r\n1\r\n' in body
+
+
+def test_multipart_encoder_unknown_size():
+    encoder = upload.MultipartEncoder({'a': iter([b'1', '2'])})
+    assert encoder.len is None
+    assert b'\r\n\r\n12\r\n' in b''.join(encoder)